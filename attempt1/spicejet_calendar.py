@@ -0,0 +1,336 @@
+"""
+SpiceJet Calendar Sweep
+Cheapest fare per day over a 30-60 day window from SpiceJet's lowfare endpoint, in one browser session.
+Optionally runs full availability for the N cheapest days in the same session.
+
+Usage:
+    python spicejet_calendar.py DEL BOM 18-12-2025 [--days 30] [--full 3] [--json]
+"""
+
+import sys
+import json
+import re
+import argparse
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta
+from spicejet_scraper import SpiceJetScraper
+from utils import normalize_city_input, parse_date
+from shared.search_budget import SearchBudget
+from shared.retry import replay_request_in_page
+from shared.debug_artifacts import DebugArtifacts
+from shared.fare_history import record_day_fares
+from shared.rate_limit import acquire_token
+from shared.circuit_breaker import record_search_outcome
+
+
+MIN_DAYS = 1
+MAX_DAYS = 60
+DEFAULT_DAYS = 30
+
+# The sweep only needs API responses, so it runs on the fast profile with a longer deadline
+DEFAULT_PROFILE = 'fast'
+DEFAULT_DEADLINE = 180
+
+DATE_PATTERN = re.compile(r'(\d{4}-\d{2}-\d{2})')
+
+# Keys that hold a fare amount in lowfare payloads (compared lower-case)
+PRICE_KEYS = {
+    'fareamount', 'totalfare', 'lowestfare', 'lowfare', 'minfare', 'minimumfare',
+    'price', 'amount', 'fare', 'totalprice', 'totalamount', 'basefare',
+}
+
+
+def _find_price(node, depth=0):
+    """Lowest fare amount in a lowfare entry (searches a couple of levels of nesting)"""
+    prices = []
+    if isinstance(node, dict):
+        for key, value in node.items():
+            key_lower = str(key).lower()
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                if key_lower in PRICE_KEYS and value > 0:
+                    prices.append(value)
+            elif isinstance(value, (dict, list)) and depth < 2 and ('fare' in key_lower or 'price' in key_lower):
+                nested = _find_price(value, depth + 1)
+                if nested is not None:
+                    prices.append(nested)
+    elif isinstance(node, list) and depth < 2:
+        for item in node:
+            nested = _find_price(item, depth + 1)
+            if nested is not None:
+                prices.append(nested)
+    return min(prices) if prices else None
+
+
+def _find_date(node):
+    """Departure date (YYYY-MM-DD) of a lowfare entry, if it has one"""
+    for key, value in node.items():
+        if isinstance(value, str) and ('date' in str(key).lower() or str(key).lower() in ('departure', 'std')):
+            match = DATE_PATTERN.match(value)
+            if match:
+                return match.group(1)
+    return None
+
+
+def parse_lowfare_response(data):
+    """
+    Tolerant lowfare parser. Returns {YYYY-MM-DD: lowest fare}.
+    Handles lists of {date, price} entries (at any depth, with nested fare objects)
+    and dicts keyed by date.
+    """
+    fares = {}
+
+    def add(day, price):
+        if price and (day not in fares or price < fares[day]):
+            fares[day] = price
+
+    def visit(node):
+        if isinstance(node, dict):
+            day = _find_date(node)
+            if day:
+                add(day, _find_price(node))
+
+            for key, value in node.items():
+                key_match = DATE_PATTERN.match(str(key))
+                if key_match:
+                    if isinstance(value, (int, float)) and not isinstance(value, bool):
+                        add(key_match.group(1), value)
+                    elif isinstance(value, (dict, list)):
+                        add(key_match.group(1), _find_price(value))
+                if isinstance(value, (dict, list)):
+                    visit(value)
+        elif isinstance(node, list):
+            for item in node:
+                visit(item)
+
+    visit(data)
+    return fares
+
+
+def _shift_request_dates(snapshot, replacements):
+    """Copy of a captured request with its dates swapped ({old YYYY-MM-DD: new YYYY-MM-DD})"""
+    def swap(text):
+        if not text:
+            return text
+        return DATE_PATTERN.sub(lambda m: replacements.get(m.group(1), m.group(1)), text)
+
+    shifted = dict(snapshot)
+    shifted['url'] = swap(snapshot['url'])
+    shifted['body'] = swap(snapshot.get('body'))
+    return shifted
+
+
+def _request_dates(snapshot):
+    """Sorted unique dates that appear in a captured request"""
+    return sorted(set(DATE_PATTERN.findall(snapshot['url'] + (snapshot.get('body') or ''))))
+
+
+class SpiceJetCalendarScraper(SpiceJetScraper):
+    """Calendar (flexible date) search on top of the SpiceJet scraper session"""
+
+    def sweep_calendar(self, origin, destination, start_date, days=DEFAULT_DAYS, full_days=0,
+                       profile=DEFAULT_PROFILE, deadline=DEFAULT_DEADLINE):
+        """
+        Cheapest fare for each day from start_date over `days` days (one browser session).
+        full_days: run full availability for this many of the cheapest days.
+        Returns {'fares': [...], 'cheapest_days': [...]}
+        """
+        days = max(MIN_DAYS, min(MAX_DAYS, int(days)))
+        start = datetime.strptime(start_date, '%Y-%m-%d').date()
+        window = [(start + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(days)]
+
+        self.budget = SearchBudget(profile, deadline)
+        self.debug = DebugArtifacts('spicejet-calendar', origin, destination)
+        result = {'fares': [], 'cheapest_days': []}
+
+        try:
+            if not self.setup_driver():
+                return result
+
+            # One page load establishes the session and fires both lowfare and availability calls
+            self.load_search_page(origin, destination, start_date)
+            self.budget.wait_for(lambda: self.lowfare_request is not None, 5, pause=self._pause)
+
+            fares = {}
+            for captured in self.capture.all('lowfare'):
+                self._merge_fares(fares, parse_lowfare_response(captured.data))
+
+            if self.lowfare_request:
+                self._sweep_lowfare(window, fares)
+            elif self.availability_request:
+                print("⚠ No lowfare request seen - falling back to one availability call per day")
+                self._sweep_availability(window, fares)
+            else:
+                print("⚠ No lowfare or availability request captured - calendar limited to captured data")
+
+            result['fares'] = [
+                {'date': day, 'price_inr': f"₹{int(fares[day]):,}", 'price_value': int(fares[day])}
+                for day in window if day in fares
+            ]
+            print(f"Calendar: found fares for {len(result['fares'])}/{len(window)} day(s)")
+            record_day_fares('spicejet', origin, destination,
+                             {entry['date']: entry['price_value'] * 100 for entry in result['fares']})
+
+            if full_days > 0 and result['fares']:
+                cheapest = sorted(result['fares'], key=lambda f: f['price_value'])[:int(full_days)]
+                for entry in cheapest:
+                    if self.budget.expired():
+                        print("⚠ Search deadline reached - skipping remaining availability searches")
+                        break
+                    result['cheapest_days'].append({
+                        'date': entry['date'],
+                        'price_inr': entry['price_inr'],
+                        'flights': self._availability_for_day(origin, destination, start_date, entry['date']),
+                    })
+
+            return result
+
+        except Exception as e:
+            print(f"Error during calendar sweep: {e}")
+            import traceback
+            traceback.print_exc()
+            return result
+        finally:
+            self.close()
+
+    def _merge_fares(self, fares, new_fares):
+        """Keep the lowest fare seen for each day"""
+        for day, price in new_fares.items():
+            if day not in fares or price < fares[day]:
+                fares[day] = price
+
+    def _sweep_lowfare(self, window, fares):
+        """Re-issue the captured lowfare request from the page, shifting its date range across the window"""
+        request_dates = _request_dates(self.lowfare_request)
+        if not request_dates:
+            print("⚠ Lowfare request has no dates to shift")
+            return
+
+        begin = datetime.strptime(request_dates[0], '%Y-%m-%d').date()
+        end = datetime.strptime(request_dates[-1], '%Y-%m-%d').date()
+        span = (end - begin).days + 1
+        print(f"Sweeping lowfare endpoint in {span}-day windows")
+
+        index = 0
+        while index < len(window):
+            if self.budget.expired():
+                print("⚠ Search deadline reached - returning partial calendar")
+                break
+
+            chunk = window[index:index + span]
+            index += span
+            if all(day in fares for day in chunk):
+                continue
+
+            replacements = {request_dates[0]: chunk[0]}
+            if len(request_dates) > 1:
+                chunk_end = datetime.strptime(chunk[0], '%Y-%m-%d').date() + timedelta(days=span - 1)
+                replacements[request_dates[-1]] = chunk_end.strftime('%Y-%m-%d')
+
+            acquire_token('spicejet', 'low-fare replay', self.budget)
+            data = replay_request_in_page(self.page, _shift_request_dates(self.lowfare_request, replacements),
+                                          self.budget.timeout_ms(20000))
+            record_search_outcome('spicejet', 'api', 'ok' if data else 'error', self.budget)
+            if data:
+                self._merge_fares(fares, parse_lowfare_response(data))
+
+    def _sweep_availability(self, window, fares):
+        """Slower fallback: one in-page availability call per day, keeping the cheapest fare"""
+        original_date = self._availability_date()
+        if not original_date:
+            return
+
+        for day in window:
+            if self.budget.expired():
+                print("⚠ Search deadline reached - returning partial calendar")
+                break
+            if day in fares:
+                continue
+
+            flights = self._replay_availability(original_date, day)
+            prices = [int(digits) for digits in (re.sub(r'[^\d]', '', str(f.get('price_inr', ''))) for f in flights) if digits]
+            if prices:
+                fares[day] = min(prices)
+
+    def _availability_date(self):
+        """The departure date baked into the captured availability request"""
+        dates = _request_dates(self.availability_request) if self.availability_request else []
+        return dates[0] if dates else None
+
+    def _replay_availability(self, original_date, day):
+        """Availability for another day, re-issued from the loaded page"""
+        acquire_token('spicejet', 'availability replay', self.budget)
+        data = replay_request_in_page(self.page, _shift_request_dates(self.availability_request, {original_date: day}),
+                                      self.budget.timeout_ms(30000))
+        record_search_outcome('spicejet', 'api', 'ok' if data else 'error', self.budget)
+        return self._parse_api_response(data) if data else []
+
+    def _availability_for_day(self, origin, destination, start_date, day):
+        """Full availability (all fare families) for one day, reusing the open session"""
+        print(f"Running full availability for {day}...")
+        if day == start_date and self.flight_data:
+            return self._parse_api_response(self.flight_data)
+
+        original_date = self._availability_date()
+        if original_date:
+            flights = self._replay_availability(original_date, day)
+            if flights:
+                return flights
+
+        # No replayable request - load the search page for that day in the same browser
+        self.load_search_page(origin, destination, day)
+        return self._parse_api_response(self.flight_data) if self.flight_data else []
+
+
+def main():
+    """Run a calendar sweep from the command line"""
+    parser = argparse.ArgumentParser(description="SpiceJet cheapest fare per day (calendar sweep)")
+    parser.add_argument('origin')
+    parser.add_argument('destination')
+    parser.add_argument('start_date', help="DD-MM-YYYY or YYYY-MM-DD")
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help=f"Days to sweep ({MIN_DAYS}-{MAX_DAYS})")
+    parser.add_argument('--full', type=int, default=0, help="Run full availability for the N cheapest days")
+    parser.add_argument('--deadline', type=float, default=DEFAULT_DEADLINE, help="Total seconds for the sweep")
+    parser.add_argument('--json', action='store_true', help="Print JSON only")
+    args = parser.parse_args()
+
+    origin = normalize_city_input(args.origin)
+    destination = normalize_city_input(args.destination)
+    start_date = parse_date(args.start_date)
+
+    if not origin or not destination or not start_date:
+        error = f"Invalid input: {args.origin} {args.destination} {args.start_date}"
+        if args.json:
+            sys.stderr.write(json.dumps({"error": error}) + "\n")
+        else:
+            print(f"Error: {error}")
+        sys.exit(1)
+
+    if not MIN_DAYS <= args.days <= MAX_DAYS:
+        print(f"Error: --days must be between {MIN_DAYS} and {MAX_DAYS}")
+        sys.exit(1)
+
+    # In JSON mode progress messages go to stderr so stdout stays parseable
+    with redirect_stdout(sys.stderr if args.json else sys.stdout):
+        scraper = SpiceJetCalendarScraper()
+        result = scraper.sweep_calendar(origin, destination, start_date, days=args.days,
+                                        full_days=args.full, deadline=args.deadline)
+
+    if args.json:
+        print(json.dumps({"success": True, "origin": origin, "destination": destination, **result},
+                         indent=2, ensure_ascii=True))
+        return
+
+    print("\n" + "=" * 60)
+    print(f"CHEAPEST FARE PER DAY: {origin} -> {destination}")
+    print("=" * 60)
+    for entry in result['fares']:
+        print(f"  {entry['date']}  {entry['price_inr']}")
+
+    for day in result['cheapest_days']:
+        print(f"\n{day['date']} ({day['price_inr']}): {len(day['flights'])} flight(s)")
+        for flight in day['flights']:
+            print(f"  {flight['flight_number']}  {flight['departure_time']}-{flight['arrival_time']}  {flight['price_inr']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,17 @@
 from datetime import datetime
+import os
 import re
-import config
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared.airports import resolve_airport
 
 def normalize_city_input(city_input):
     """
-    Normalize city input (name or code) to a 3-letter airport code.
-    Uses a predefined mapping in config.py.
+    Normalize city input (name, code, alias or a near miss like 'banglore') to a 3-letter
+    airport code using the shared airport index (shared/airports.py).
     """
-    if not city_input:
-        return None
-    
-    normalized = city_input.strip().lower()
-    
-    # Check if it's already an airport code
-    if len(normalized) == 3 and normalized.upper() in config.CODE_TO_CITY:
-        return normalized.upper()
-    
-    # Check if it's a city name
-    if normalized in config.AIRPORT_CODES:
-        return config.AIRPORT_CODES[normalized]
-    
-    return None
+    return resolve_airport(city_input)
 
 def parse_date(date_string):
     """
@@ -19,109 +19,15 @@ USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTM
 ACTION_DELAY = 3
 AFTER_SEARCH_DELAY = 20  # Wait longer for redirect and API to respond
 
-# Airport code mappings (city names to airport codes)
-# Etihad primarily serves international routes
-AIRPORT_CODES = {
-    # Major Indian cities
-    "delhi": "DEL",
-    "new delhi": "DEL",
-    "mumbai": "BOM",
-    "bombay": "BOM",
-    "bangalore": "BLR",
-    "bengaluru": "BLR",
-    "chennai": "MAA",
-    "madras": "MAA",
-    "kolkata": "CCU",
-    "calcutta": "CCU",
-    "hyderabad": "HYD",
-    "kochi": "COK",
-    "cochin": "COK",
-    "trivandrum": "TRV",
-    "thiruvananthapuram": "TRV",
-    # Middle East (Etihad's hub region)
-    "abu dhabi": "AUH",
-    "dubai": "DXB",
-    "doha": "DOH",
-    "riyadh": "RUH",
-    "jeddah": "JED",
-    "dammam": "DMM",
-    "kuwait": "KWI",
-    "muscat": "MCT",
-    "bahrain": "BAH",
-    "manama": "BAH",
-    # Asia
-    "singapore": "SIN",
-    "bangkok": "BKK",
-    "kuala lumpur": "KUL",
-    "jakarta": "CGK",
-    "manila": "MNL",
-    "hong kong": "HKG",
-    "tokyo": "NRT",
-    "osaka": "KIX",
-    "seoul": "ICN",
-    "beijing": "PEK",
-    "shanghai": "PVG",
-    "guangzhou": "CAN",
-    "shenzhen": "SZX",
-    "chengdu": "CTU",
-    "mumbai": "BOM",
-    "delhi": "DEL",
-    "bangalore": "BLR",
-    "chennai": "MAA",
-    "kolkata": "CCU",
-    "hyderabad": "HYD",
-    "kochi": "COK",
-    "colombo": "CMB",
-    "dhaka": "DAC",
-    "kathmandu": "KTM",
-    "islamabad": "ISB",
-    "karachi": "KHI",
-    "lahore": "LHE",
-    # Europe
-    "london": "LHR",
-    "manchester": "MAN",
-    "edinburgh": "EDI",
-    "paris": "CDG",
-    "frankfurt": "FRA",
-    "munich": "MUC",
-    "amsterdam": "AMS",
-    "rome": "FCO",
-    "milan": "MXP",
-    "madrid": "MAD",
-    "barcelona": "BCN",
-    "zurich": "ZRH",
-    "vienna": "VIE",
-    "brussels": "BRU",
-    "istanbul": "IST",
-    "athens": "ATH",
-    "moscow": "SVO",
-    "dublin": "DUB",
-    # North America
-    "new york": "JFK",
-    "newark": "EWR",
-    "washington": "IAD",
-    "chicago": "ORD",
-    "los angeles": "LAX",
-    "san francisco": "SFO",
-    "toronto": "YYZ",
-    "vancouver": "YVR",
-    "montreal": "YUL",
-    # Africa
-    "cairo": "CAI",
-    "casablanca": "CMN",
-    "johannesburg": "JNB",
-    "cape town": "CPT",
-    "nairobi": "NBO",
-    "lagos": "LOS",
-    "accra": "ACC",
-    # Australia/Oceania
-    "sydney": "SYD",
-    "melbourne": "MEL",
-    "perth": "PER",
-    "brisbane": "BNE",
-    "auckland": "AKL",
+# API responses the scraper keeps (regex on the URL) - no other response body is read
+CAPTURE_ENDPOINTS = {
+    'flights': r'etihad.*(search|availability|flight|booking|offer|fare)',
 }
 
-# Reverse mapping (airport codes to city names)
-CODE_TO_CITY = {code: city for city, code in AIRPORT_CODES.items()}
+# Words in a bound list's header (div.header-left on the results page) that give its direction.
+# "Outbound flight" is on the captured page (etihad_page_source.html); no round-trip page has been
+# captured yet, so the return list's wording is an assumption - a header matching neither fails the search
+RETURN_HEADER_WORDS = ('return', 'inbound')
+OUTBOUND_HEADER_WORDS = ('outbound',)
 
+# Airport codes, names and aliases live in the shared airport index (shared/airports.csv)
@@ -6,6 +6,7 @@ Works for international routes
 
 import time
 import sys
+import os
 import json
 import re
 import undetected_chromedriver as uc
@@ -17,6 +18,23 @@ from bs4 import BeautifulSoup
 import config
 from utils import normalize_city_input, parse_date, format_date_for_etihad, format_flight_data
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared.search_budget import SearchBudget
+from shared.flight_merge import merge_flights
+from shared.capture import ResponseCapture
+from shared.debug_artifacts import DebugArtifacts
+from shared.capture_archive import archive_captures
+from shared.fare_history import record_fares
+from shared.change_feed import publish_changes
+from shared.result_store import store_results
+from shared.serviceability import record_outcome
+from shared.rate_limit import acquire_token
+from shared.circuit_breaker import record_search_outcome
+
+
+class BoundDirectionError(Exception):
+    """A round-trip results page whose bound cards cannot all be placed as outbound or return"""
+
 
 class EtihadScraper:
     """Scraper class for Etihad Airways flight data using undetected-chromedriver"""
@@ -25,7 +43,13 @@ class EtihadScraper:
         self.driver = None
         self.wait = None
         self.flight_data = None
-        self.all_responses = []
+        self.capture = ResponseCapture(config.CAPTURE_ENDPOINTS)
+        self.debug = DebugArtifacts('etihad')
+        self.page_source = None
+        self.budget = SearchBudget()
+        self.session_established = False
+        self.return_date = None
+        self.blocked = False
     
     def setup_driver(self):
         """Initialize and configure Chrome WebDriver using undetected-chromedriver"""
@@ -73,7 +97,7 @@ class EtihadScraper:
                             pass
                     
                     # Give browser a moment to fully start (after minimizing)
-                    time.sleep(1)
+                    self.budget.sleep(1)
                     
                     # Verify browser is actually open
                     handles = self.driver.window_handles
@@ -87,17 +111,17 @@ class EtihadScraper:
                     if attempt < max_retries - 1:
                         print(f"Attempt {attempt + 1} failed: {init_error}")
                         print("Retrying browser initialization...")
-                        time.sleep(3)
+                        self.budget.sleep(3)
                     else:
                         raise Exception(f"Failed to open browser after {max_retries} attempts: {init_error}")
             
-            # Set up waits
-            self.driver.implicitly_wait(config.IMPLICIT_WAIT)
-            self.driver.set_page_load_timeout(config.PAGE_LOAD_TIMEOUT)
-            self.wait = WebDriverWait(self.driver, config.EXPLICIT_WAIT_TIMEOUT)
+            # Set up waits (capped by the search deadline; missing-element lookups scale with the profile)
+            self.driver.implicitly_wait(config.IMPLICIT_WAIT * self.budget.settle_scale)
+            self.driver.set_page_load_timeout(self.budget.timeout(config.PAGE_LOAD_TIMEOUT))
+            self.wait = WebDriverWait(self.driver, self.budget.timeout(config.EXPLICIT_WAIT_TIMEOUT))
             
             # Give browser additional time to fully initialize
-            time.sleep(2)
+            self.budget.sleep(2)
             
             # Keep browser alive
             try:
@@ -114,16 +138,12 @@ class EtihadScraper:
             return False
     
     def close(self):
-        """Close the browser driver and save captured responses"""
+        """Close the browser driver and save captured responses (when debug artifacts are enabled)"""
         try:
-            # Save all responses for analysis
-            if self.all_responses:
-                try:
-                    with open('etihad_all_responses.json', 'w', encoding='utf-8') as f:
-                        json.dump(self.all_responses, f, indent=2, ensure_ascii=False)
-                    print(f"\n  Saved {len(self.all_responses)} total API responses to etihad_all_responses.json")
-                except:
-                    pass
+            captured = self.capture.all()
+            if self.debug.enabled and captured:
+                self.debug.json('all_responses', [{'url': c.url, 'data': c.data} for c in captured])
+            self.debug.close()
             
             if self.driver:
                 try:
@@ -136,8 +156,8 @@ class EtihadScraper:
         except:
             pass
     
-    def build_search_url(self, origin, destination, date):
-        """Build Etihad search URL with parameters"""
+    def build_search_url(self, origin, destination, date, return_date=None):
+        """Build Etihad search URL with parameters (TRIP_TYPE=R with DATE_2 for round trips)"""
         # Format: https://digital.etihad.com/book/search?LANGUAGE=EN&CHANNEL=DESKTOP&B_LOCATION=CCU&E_LOCATION=AUH&TRIP_TYPE=O&CABIN=E&TRAVELERS=ADT&TRIP_FLOW_TYPE=AVAILABILITY&...&DATE_1=202511300000
         
         # Convert date to Etihad format (YYYYMMDD0000)
@@ -145,6 +165,13 @@ class EtihadScraper:
         if not etihad_date:
             return None
         
+        return_param = ""
+        if return_date:
+            etihad_return_date = format_date_for_etihad(return_date)
+            if not etihad_return_date:
+                return None
+            return_param = f"DATE_2={etihad_return_date}&"
+        
         # Build URL with Etihad's parameter structure
         url = (
             f"{config.ETIHAD_SEARCH_URL}?"
@@ -152,7 +179,7 @@ class EtihadScraper:
             f"CHANNEL=DESKTOP&"
             f"B_LOCATION={origin}&"
             f"E_LOCATION={destination}&"
-            f"TRIP_TYPE=O&"  # O = One-way
+            f"TRIP_TYPE={'R' if return_date else 'O'}&"  # O = One-way, R = Round trip
             f"CABIN=E&"  # E = Economy
             f"TRAVELERS=ADT&"  # ADT = Adult
             f"TRIP_FLOW_TYPE=AVAILABILITY&"
@@ -164,6 +191,7 @@ class EtihadScraper:
             f"WDS_ELIGIBLE_FLAGSHIP_LIST=A380-800&"
             f"WDS_ENABLE_KOREAN_AMOP=TRUE&"
             f"DATE_1={etihad_date}&"
+            f"{return_param}"
             f"FLOW=REVENUE&"
             f"WDS_MAX_FLIGHTS_ISDIRECT=TRUE"
         )
@@ -181,36 +209,21 @@ class EtihadScraper:
                     url = response.get('response', {}).get('url', '')
                     status = response.get('response', {}).get('status', 0)
                     
-                    if status == 200 and url:
-                        # Check if it's a JSON response
-                        content_type = response.get('response', {}).get('headers', {}).get('content-type', '')
-                        if 'json' in content_type.lower() or 'etihad' in url.lower():
-                            # Get response body
-                            try:
-                                request_id = response.get('requestId')
-                                if request_id:
-                                    # Get response body
-                                    body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
-                                    if body and 'body' in body:
-                                        try:
-                                            data = json.loads(body['body'])
-                                            self.all_responses.append({'url': url, 'data': data})
-                                            
-                                            # Look for flight data
-                                            if any(keyword in url.lower() for keyword in ['search', 'availability', 'flight', 'booking', 'offer', 'fare']):
-                                                if not self.flight_data:
-                                                    self.flight_data = data
-                                                    print(f"✓ Captured flight data from: {url}")
-                                                    try:
-                                                        with open('etihad_api_response.json', 'w', encoding='utf-8') as f:
-                                                            json.dump(data, f, indent=2, ensure_ascii=False)
-                                                        print("  Saved API response to etihad_api_response.json")
-                                                    except:
-                                                        pass
-                                        except:
-                                            pass
-                            except:
-                                pass
+                    # Only declared endpoints (config.CAPTURE_ENDPOINTS) have their body fetched
+                    endpoint = self.capture.match(url) if status == 200 else None
+                    request_id = response.get('requestId')
+                    if endpoint and request_id:
+                        # Get response body
+                        body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+                        if body and 'body' in body:
+                            captured = self.capture.add(endpoint, url, body['body'])
+                            data = captured.data if captured else None
+                            
+                            # Look for flight data
+                            if isinstance(data, (dict, list)) and not self.flight_data:
+                                self.flight_data = data
+                                print(f"✓ Captured flight data from: {url}")
+                                self.debug.json('api_response', data)
                 except:
                     pass
             
@@ -222,15 +235,16 @@ class EtihadScraper:
             print("Will use HTML parsing instead")
             return False
     
-    def load_search_page(self, origin, destination, date, retry_count=0):
+    def load_search_page(self, origin, destination, date, retry_count=0, return_date=None):
         """Load Etihad search page and wait for redirect and API calls"""
         try:
-            url = self.build_search_url(origin, destination, date)
+            url = self.build_search_url(origin, destination, date, return_date)
             if not url:
                 print("Error: Could not build search URL")
                 return False
             
-            print(f"Loading Etihad search page: {origin} -> {destination} on {date}")
+            trip = f" returning {return_date}" if return_date else ""
+            print(f"Loading Etihad search page: {origin} -> {destination} on {date}{trip}")
             print(f"URL: {url}")
             
             # Check if driver is still valid
@@ -240,40 +254,49 @@ class EtihadScraper:
                     raise Exception("Browser window is closed")
             except Exception as e:
                 print(f"Browser window appears to be closed: {e}")
+                self.session_established = False
                 if not self.setup_driver():
                     return False
             
             # Strategy: Visit homepage first to get cookies and establish session
             try:
-                print("  Step 1: Visiting Etihad homepage to establish session...")
-                self.driver.get(config.ETIHAD_BASE_URL)
-                time.sleep(5)  # Wait for page to fully load
-                
-                # Wait a bit more for any security checks
-                time.sleep(3)
+                if not self.session_established:
+                    print("  Step 1: Visiting Etihad homepage to establish session...")
+                    acquire_token('etihad', 'homepage', self.budget)
+                    self.driver.get(config.ETIHAD_BASE_URL)
+                    self.budget.sleep(5)  # Wait for page to fully load
+                    
+                    # Wait a bit more for any security checks
+                    self.budget.sleep(3)
+                    self.session_established = True
+                else:
+                    # Retry: the browser already holds the session cookies, skip the homepage visit
+                    print("  Step 1: Reusing established session")
                 
                 print("  Step 2: Navigating to search page...")
-                # Now navigate to the search URL (it will redirect automatically)
-                self.driver.get(url)
+                if retry_count > 0 and '/book/' in self.driver.current_url:
+                    # Retry in place: reload the booking page instead of redoing the whole flow
+                    acquire_token('etihad', 'search page reload', self.budget)
+                    self.driver.refresh()
+                else:
+                    # Now navigate to the search URL (it will redirect automatically)
+                    acquire_token('etihad', 'search page', self.budget)
+                    self.driver.get(url)
                 
                 # Wait for page to load
-                time.sleep(5)
+                self.budget.sleep(5)
                 
                 # Check if we got blocked
                 page_source = self.driver.page_source
                 if "error code 15" in page_source.lower() or "security system" in page_source.lower() or "flown away" in page_source.lower():
                     print("  ⚠ Security system blocked the request!")
+                    self.blocked = True
                     print("  This might be due to:")
                     print("    - IP-based blocking")
                     print("    - Browser fingerprint detection")
                     print("    - Missing cookies/session")
                     # Save page for debugging
-                    try:
-                        with open('etihad_blocked_page.html', 'w', encoding='utf-8') as f:
-                            f.write(page_source)
-                        print("  Saved blocked page to etihad_blocked_page.html")
-                    except:
-                        pass
+                    self.debug.text('blocked_page', page_source)
                     return False
                 
                 # Check final URL after redirect
@@ -283,7 +306,11 @@ class EtihadScraper:
                 
                 # Wait for API calls and page to fully load
                 print("  Waiting for page to fully load and API calls...")
-                time.sleep(config.AFTER_SEARCH_DELAY)
+                if self.budget.exhaustive_selectors:
+                    self.budget.sleep(config.AFTER_SEARCH_DELAY)
+                else:
+                    # Stop waiting as soon as the flight cards are rendered
+                    self.budget.wait_for(self._results_rendered, config.AFTER_SEARCH_DELAY, interval=1)
                 
                 # Try to wait for specific elements that indicate page loaded
                 try:
@@ -293,7 +320,7 @@ class EtihadScraper:
                     pass
                 
                 # Additional wait for any delayed API calls
-                time.sleep(5)
+                self.budget.sleep(5)
                 
                 # Try to extract JSON data from page scripts
                 try:
@@ -345,12 +372,7 @@ class EtihadScraper:
                     if json_data:
                         print("  Found JSON data in window object")
                         self.flight_data = json_data
-                        try:
-                            with open('etihad_api_response.json', 'w', encoding='utf-8') as f:
-                                json.dump(json_data, f, indent=2, ensure_ascii=False)
-                            print("  Saved window data to etihad_api_response.json")
-                        except:
-                            pass
+                        self.debug.json('window_data', json_data)
                 except Exception as e:
                     print(f"  Error extracting window data: {e}")
                 
@@ -361,7 +383,7 @@ class EtihadScraper:
                 else:
                     print("⚠ No API response captured yet")
                     # Wait a bit more
-                    time.sleep(5)
+                    self.budget.sleep(5)
                     if self.flight_data:
                         print("✓ API response captured after additional wait")
                         return True
@@ -372,15 +394,17 @@ class EtihadScraper:
                     
             except TimeoutException:
                 print(f"⚠ Page load timeout. Retry count: {retry_count}")
-                if retry_count < 2:
-                    time.sleep(5)
-                    return self.load_search_page(origin, destination, date, retry_count + 1)
-                return False
+                if self.budget.can_retry(retry_count):
+                    self.budget.sleep(5)
+                    return self.load_search_page(origin, destination, date, retry_count + 1, return_date)
+                # Out of retries or time - parse whatever has rendered so far
+                print("Continuing with partially loaded page...")
+                return True
             except Exception as e:
                 print(f"Error loading page: {e}")
-                if retry_count < 2:
-                    time.sleep(5)
-                    return self.load_search_page(origin, destination, date, retry_count + 1)
+                if self.budget.can_retry(retry_count):
+                    self.budget.sleep(5)
+                    return self.load_search_page(origin, destination, date, retry_count + 1, return_date)
                 return False
                 
         except Exception as e:
@@ -389,6 +413,15 @@ class EtihadScraper:
             traceback.print_exc()
             return False
     
+    def _results_rendered(self):
+        """Check whether Etihad has rendered any flight result cards yet"""
+        try:
+            return self.driver.execute_script(
+                "return document.querySelectorAll('ey-bound-card-new, [class*=\"bound-card\"]').length"
+            ) > 0
+        except:
+            return False
+    
     def _parse_api_response(self, data):
         """Parse flight data from Etihad API response"""
         flights = []
@@ -417,24 +450,15 @@ class EtihadScraper:
     
     def _parse_html(self):
         """Parse flight data from HTML (fallback method)"""
-        flights = []
-        
         try:
             print("Parsing HTML for flight data...")
             
             # Get page source
             page_source = self.driver.page_source
             
-            # Save page source for debugging
-            try:
-                with open('etihad_page_source.html', 'w', encoding='utf-8') as f:
-                    f.write(page_source)
-                print("  Saved page source to etihad_page_source.html")
-            except:
-                pass
-            
-            # Parse with BeautifulSoup
-            soup = BeautifulSoup(page_source, 'lxml')
+            # Save page source for debugging (and keep it for the capture archive)
+            self.page_source = page_source
+            self.debug.text('page_source', page_source)
             
             # Check if we're on the right page (not upsell page)
             current_url = self.driver.current_url
@@ -443,7 +467,7 @@ class EtihadScraper:
                 # Try to find and click "Continue" or skip upsell
                 try:
                     # Wait a bit for page to load
-                    time.sleep(3)
+                    self.budget.sleep(3)
                     
                     # Try multiple selectors for continue/skip button
                     continue_selectors = [
@@ -471,10 +495,10 @@ class EtihadScraper:
                     if continue_btn:
                         print("  Clicking continue button...")
                         self.driver.execute_script("arguments[0].click();", continue_btn)
-                        time.sleep(10)  # Wait for navigation
+                        self.budget.sleep(10)  # Wait for navigation
                         # Re-parse after navigation
                         page_source = self.driver.page_source
-                        soup = BeautifulSoup(page_source, 'lxml')
+                        self.page_source = page_source
                         current_url = self.driver.current_url
                         print(f"  Navigated to: {current_url}")
                     else:
@@ -483,6 +507,21 @@ class EtihadScraper:
                     print(f"  Could not navigate from upsell page: {e}")
                     print("  Will try to parse current page anyway")
             
+            return self.parse_page_source(page_source)
+            
+        except Exception as e:
+            print(f"Error parsing HTML: {e}")
+            import traceback
+            traceback.print_exc()
+            return []
+    
+    def parse_page_source(self, page_source):
+        """Parse flights from a results page source (also used offline by shared/reprocess.py)"""
+        flights = []
+        
+        try:
+            soup = BeautifulSoup(page_source, 'lxml')
+            
             # Look for flight containers - Etihad uses Angular components
             # Common selectors: ey-bound-card-new, ey-fare-card, fare-card
             
@@ -552,7 +591,16 @@ class EtihadScraper:
             bound_cards = soup.find_all('ey-bound-card-new', limit=20)
             if bound_cards:
                 print(f"  Found {len(bound_cards)} bound card(s) (flight container(s))")
-                for card in bound_cards:
+                directions = [self._bound_direction(card) for card in bound_cards]
+                if self.return_date:
+                    # Guessing would label every return flight outbound - refuse the page instead
+                    if None in directions:
+                        raise BoundDirectionError(
+                            f"{directions.count(None)} of {len(bound_cards)} bound card(s) on the round-trip page "
+                            f"have no outbound/return header - cannot tell outbound from return flights")
+                    if 'return' not in directions:
+                        print("  ⚠ Round-trip page lists no return flights - only outbound flights returned")
+                for card, direction in zip(bound_cards, directions):
                     try:
                         flight = {
                             'airline': 'Etihad Airways',
@@ -561,7 +609,8 @@ class EtihadScraper:
                             'arrival_time': 'N/A',
                             'duration': 'N/A',
                             'price': 'N/A',
-                            'award_points': 'N/A'
+                            'award_points': 'N/A',
+                            'direction': direction if self.return_date else 'outbound'
                         }
                         
                         # Extract flight numbers - can be multiple for connecting flights
@@ -619,28 +668,62 @@ class EtihadScraper:
                         print(f"    Error extracting from bound card: {e}")
                         continue
             
-            # Remove duplicates based on flight number
-            seen = set()
-            unique_flights = []
+            # Methods 1 and 2 cannot tell which bound a flight is on, so a round trip keeps only bound cards
+            if self.return_date:
+                flights = [flight for flight in flights if 'direction' in flight]
+            # Remove duplicates (the methods overlap) - same flight number(s) and times, per direction
             for flight in flights:
-                key = flight.get('flight_number', '')
-                if key and key not in seen:
-                    seen.add(key)
-                    unique_flights.append(flight)
-                elif not key:
-                    # Keep flights without flight numbers if they have prices
-                    if flight.get('price', 'N/A') != 'N/A':
-                        unique_flights.append(flight)
+                flight.setdefault('direction', 'outbound')
+            # Keep flights without flight numbers only if they have prices
+            flights = [flight for flight in flights
+                       if flight.get('flight_number', 'N/A') != 'N/A' or flight.get('price', 'N/A') != 'N/A']
+            unique_flights = merge_flights([('html', flights)], group_by=('direction',))
             
             print(f"  Extracted {len(unique_flights)} unique flight(s)")
             return unique_flights
             
+        except BoundDirectionError:
+            raise
         except Exception as e:
             print(f"Error parsing HTML: {e}")
             import traceback
             traceback.print_exc()
             return []
     
+    def _bound_direction(self, card):
+        """'return' or 'outbound' from the header of the bound list a card sits under, or None"""
+        header = card.find_previous('div', class_='header-left')
+        text = header.get_text(' ', strip=True).lower() if header else ''
+        if any(word in text for word in config.RETURN_HEADER_WORDS):
+            return 'return'
+        if any(word in text for word in config.OUTBOUND_HEADER_WORDS):
+            return 'outbound'
+        return None
+    
+    def _answered_empty(self, flights):
+        """
+        True when the search found no flights, at least one captured response holds an empty offer
+        list and none holds a non-empty one. The capture pattern matches more than the availability
+        call and the response layout is not mapped yet (see _parse_api_response), so only the known
+        list keys count - anything else is treated as unknown, not as "no flights".
+        """
+        if flights:
+            return False
+        answered_empty = False
+        for captured in self.capture.all('flights'):
+            data = captured.data
+            if not isinstance(data, dict):
+                continue
+            for container in (data, data.get('data')):
+                if not isinstance(container, dict):
+                    continue
+                for key in ('airBoundGroups', 'offers', 'flights'):
+                    if isinstance(container.get(key), list):
+                        if container[key]:
+                            return False
+                        answered_empty = True
+        return answered_empty
+    
     def extract_flights_from_data(self):
         """Extract flight data from captured API response or page"""
         flights = []
@@ -661,29 +744,59 @@ class EtihadScraper:
             
             return flights
             
+        except BoundDirectionError:
+            raise
         except Exception as e:
             print(f"Error extracting flights: {e}")
             import traceback
             traceback.print_exc()
             return []
     
-    def scrape_flights(self, origin, destination, date):
-        """Main method to scrape flights"""
+    def scrape_flights(self, origin, destination, date, profile='thorough', deadline=None, return_date=None,
+                       budget=None):
+        """
+        Main method to scrape flights (one-way, or round trip when return_date is given)
+        profile: 'fast', 'balanced' or 'thorough' (see shared/search_budget.py)
+        deadline: optional total seconds for the search (defaults to the profile's deadline)
+        budget: a SearchBudget to use instead of one built from profile/deadline (hedged_search passes
+                each attempt its own, so cancelling it always reaches this search)
+        """
+        self.budget = budget or SearchBudget(profile, deadline)
+        self.debug = DebugArtifacts('etihad', origin, destination)
+        self.return_date = return_date
+        self.blocked = False
         try:
             # Setup driver
             if not self.setup_driver():
                 return []
             
             # Load search page
-            if not self.load_search_page(origin, destination, date):
+            if not self.load_search_page(origin, destination, date, return_date=return_date):
+                record_search_outcome('etihad', 'browser', 'blocked' if self.blocked else 'error', self.budget)
                 return []
             
             # Extract flight data
             flights = self.extract_flights_from_data()
             
+            captures = [(captured.endpoint, captured.body, captured.url) for captured in self.capture.all()]
+            # A hedged attempt that lost persists nothing (not even its raw captures); a search cut off
+            # by its deadline keeps its fares but does not replace the route's stored results
+            if not self.budget.cancelled:
+                # Keep the raw captures and results page in the capture archive
+                if self.page_source:
+                    captures.append(('page', self.page_source, self.driver.current_url))
+                archive_captures('etihad', captures, origin, destination, date)
+                truncated = self.budget.expired()
+                record_fares('etihad', flights, origin, destination, date, return_date)
+                publish_changes('etihad', flights, origin, destination, date, return_date, budget=self.budget)
+                store_results('etihad', flights, origin, destination, date, return_date, truncated=truncated)
+                record_outcome('etihad', origin, destination, flights, self._answered_empty(flights), self.budget)
+            record_search_outcome('etihad', 'browser', 'ok' if flights or captures else 'error', self.budget)
+            
             return flights
             
         except Exception as e:
+            record_search_outcome('etihad', 'browser', 'error', self.budget)
             print(f"Error during scraping: {e}")
             import traceback
             traceback.print_exc()
@@ -747,7 +860,7 @@ def main():
         print("2. API structure needs to be discovered")
         print("3. Network interception didn't capture the data")
         print("4. Security system blocked the request")
-        print("\nTip: Check etihad_api_response.json and etihad_page_source.html for debugging.")
+        print("\nTip: Set FLYPOINTS_DEBUG_ARTIFACTS=1 to keep API responses and page sources in data/debug/ for debugging.")
 
 
 if __name__ == "__main__":
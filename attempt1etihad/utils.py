@@ -1,28 +1,18 @@
 from datetime import datetime
+import os
 import re
-import config
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared.airports import resolve_airport
 
 def normalize_city_input(city_input):
     """
-    Normalize city input (name or code) to a 3-letter airport code.
-    Uses a predefined mapping in config.py.
-    Works for international airports (Etihad primarily serves international routes).
+    Normalize city input (name, code, alias or a near miss like 'banglore') to a 3-letter
+    airport code using the shared airport index (shared/airports.py).
+    A 3-letter code missing from the index is passed through uppercased (it may still be valid).
     """
-    if not city_input:
-        return None
-    
-    normalized = city_input.strip().lower()
-    
-    # Check if it's already an airport code (3 letters)
-    if len(normalized) == 3 and normalized.upper() in config.CODE_TO_CITY:
-        return normalized.upper()
-    
-    # Check if it's a city name
-    if normalized in config.AIRPORT_CODES:
-        return config.AIRPORT_CODES[normalized]
-    
-    # If not found, return the uppercase version (might be a valid airport code not in our list)
-    return normalized.upper() if len(normalized) == 3 else None
+    return resolve_airport(city_input, allow_unknown_codes=True)
 
 def parse_date(date_string):
     """
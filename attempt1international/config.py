@@ -19,94 +19,25 @@ USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTM
 ACTION_DELAY = 2
 AFTER_SEARCH_DELAY = 10  # Wait longer for API to respond
 
-# Airport code mappings (city names to airport codes)
-# Includes both domestic and international airports
-AIRPORT_CODES = {
-    # Major Indian cities
-    "delhi": "DEL",
-    "new delhi": "DEL",
-    "mumbai": "BOM",
-    "bombay": "BOM",
-    "bangalore": "BLR",
-    "bengaluru": "BLR",
-    "chennai": "MAA",
-    "madras": "MAA",
-    "kolkata": "CCU",
-    "calcutta": "CCU",
-    "hyderabad": "HYD",
-    "pune": "PNQ",
-    "ahmedabad": "AMD",
-    "goa": "GOI",
-    "kochi": "COK",
-    "cochin": "COK",
-    "jaipur": "JAI",
-    "lucknow": "LKO",
-    "varanasi": "VNS",
-    "patna": "PAT",
-    "guwahati": "GAU",
-    "srinagar": "SXR",
-    "amritsar": "ATQ",
-    "chandigarh": "IXC",
-    "dehradun": "DED",
-    "indore": "IDR",
-    "bhopal": "BHO",
-    "nagpur": "NAG",
-    "visakhapatnam": "VTZ",
-    "vizag": "VTZ",
-    "coimbatore": "CJB",
-    "madurai": "IXM",
-    "trivandrum": "TRV",
-    "thiruvananthapuram": "TRV",
-    "mangalore": "IXE",
-    "surat": "STV",
-    "rajkot": "RAJ",
-    "vadodara": "BDQ",
-    "baroda": "BDQ",
-    "udaipur": "UDR",
-    "jodhpur": "JDH",
-    "bhubaneswar": "BBI",
-    "raipur": "RPR",
-    "ranchi": "IXR",
-    "imphal": "IMF",
-    "agartala": "IXA",
-    "aizawl": "AJL",
-    "dimapur": "DMU",
-    "port blair": "IXZ",
-    "leh": "IXL",
-    # International airports (common destinations)
-    "dubai": "DXB",
-    "abu dhabi": "AUH",
-    "doha": "DOH",
-    "singapore": "SIN",
-    "bangkok": "BKK",
-    "kuala lumpur": "KUL",
-    "colombo": "CMB",
-    "kathmandu": "KTM",
-    "dhaka": "DAC",
-    "muscat": "MCT",
-    "riyadh": "RUH",
-    "jeddah": "JED",
-    "dammam": "DMM",
-    "london": "LHR",
-    "frankfurt": "FRA",
-    "paris": "CDG",
-    "amsterdam": "AMS",
-    "istanbul": "IST",
-    "new york": "JFK",
-    "los angeles": "LAX",
-    "san francisco": "SFO",
-    "chicago": "ORD",
-    "toronto": "YYZ",
-    "vancouver": "YVR",
-    "sydney": "SYD",
-    "melbourne": "MEL",
-    "hong kong": "HKG",
-    "tokyo": "NRT",
-    "seoul": "ICN",
-    "beijing": "PEK",
-    "shanghai": "PVG",
+# SpiceJet fare families by API productClass (data.faresAvailable[key].productClass)
+FARE_FAMILY_BY_PRODUCT_CLASS = {
+    'RS': 'spicesaver',
+    'SF': 'spiceflex',
+    'SC': 'spicemax',
 }
 
-# Reverse mapping (airport codes to city names)
-CODE_TO_CITY = {code: city for city, code in AIRPORT_CODES.items()}
+# API responses the scraper keeps (regex on the URL) - no other response body is read
+CAPTURE_ENDPOINTS = {
+    'availability': r'spicejet.*api.*search.*availability',
+    'lowfare': r'spicejet.*api.*lowfare',
+}
+
+# Merging API and HTML flights: the API wins for schedule fields, the page for what it displays
+MERGE_FIELD_PRIORITY = {
+    field: ['html', 'api'] for field in (
+        'price_inr', 'spicesaver_price', 'spiceflex_price', 'spicemax_price',
+        'award_points', 'spicesaver_points', 'spiceflex_points', 'spicemax_points',
+    )
+}
 
+# Airport codes, names and aliases live in the shared airport index (shared/airports.csv)
@@ -6,6 +6,7 @@ Works for international routes (e.g., DEL to DXB, BOM to SIN, etc.)
 
 import time
 import sys
+import os
 import json
 import re
 from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
@@ -13,6 +14,22 @@ from datetime import datetime
 import config
 from utils import normalize_city_input, parse_date, format_flight_data
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared.search_budget import SearchBudget
+from shared.retry import request_snapshot, replay_request_in_page
+from shared.fare_calculator import SINGLE_ADULT, passenger_query, is_single_adult, journey_fare_components
+from shared.points import points_from_fare_components, points_conflict
+from shared.flight_merge import merge_flights
+from shared.capture import ResponseCapture
+from shared.debug_artifacts import DebugArtifacts
+from shared.capture_archive import archive_captures
+from shared.fare_history import record_fares
+from shared.change_feed import publish_changes
+from shared.result_store import store_results
+from shared.serviceability import record_outcome
+from shared.rate_limit import acquire_token
+from shared.circuit_breaker import breaker_allows, record_search_outcome
+
 
 class SpiceJetScraper:
     """Scraper class for SpiceJet international flight data using Playwright with network interception"""
@@ -22,7 +39,12 @@ class SpiceJetScraper:
         self.browser = None
         self.page = None
         self.flight_data = None
-        self.all_responses = []
+        self.availability_request = None
+        self.capture = ResponseCapture(config.CAPTURE_ENDPOINTS)
+        self.debug = DebugArtifacts('spicejet')
+        self.return_date = None
+        self.passengers = dict(SINGLE_ADULT)
+        self.budget = SearchBudget()
     
     def setup_driver(self):
         """Initialize and configure browser using Playwright in headless mode"""
@@ -40,45 +62,42 @@ class SpiceJetScraper:
             self.page = self.browser.new_page()
             
             # Set up response interception BEFORE creating page context
+            # Only declared endpoints (config.CAPTURE_ENDPOINTS) have their body read and kept
             def handle_response(response):
                 try:
-                    if response.status == 200:
-                        url = response.url
-                        # Look for SpiceJet API endpoints
-                        if 'spicejet' in url.lower() and 'api' in url.lower():
-                            # Check if response contains JSON
-                            content_type = response.headers.get('content-type', '')
-                            if 'json' in content_type.lower() or response.status == 200:
-                                try:
-                                    data = response.json()
-                                    # Store all API responses
-                                    self.all_responses.append({'url': url, 'data': data})
-                                    
-                                    # Prioritize search/availability endpoints
-                                    if 'search' in url.lower() and ('availability' in url.lower() or 'lowfare' in url.lower()):
-                                        # Check if this looks like flight data
-                                        if isinstance(data, dict) or isinstance(data, list):
-                                            # Store the response data (prioritize availability endpoint)
-                                            if 'availability' in url.lower():
-                                                self.flight_data = data
-                                                print(f"✓ Captured flight data from: {url}")
-                                                # Save for debugging
-                                                try:
-                                                    with open('spicejet_api_response.json', 'w', encoding='utf-8') as f:
-                                                        json.dump(data, f, indent=2, ensure_ascii=False)
-                                                    print("  Saved API response to spicejet_api_response.json")
-                                                except:
-                                                    pass
-                                            elif not self.flight_data and 'lowfare' in url.lower():
-                                                self.flight_data = data
-                                                print(f"✓ Captured flight data from: {url}")
-                                except Exception as e:
-                                    # Not JSON or error parsing
-                                    pass
+                    if response.status != 200:
+                        return
+                    url = response.url
+                    endpoint = self.capture.match(url)
+                    if not endpoint:
+                        return
+                    captured = self.capture.add(endpoint, url, response.body())
+                    if not captured:
+                        return
+                    
+                    # Availability is the flight data; a search lowfare response stands in until it arrives
+                    if endpoint == 'availability' or (endpoint == 'lowfare' and not self.flight_data and 'search' in url.lower()):
+                        data = captured.data
+                        if isinstance(data, (dict, list)):
+                            self.flight_data = data
+                            print(f"✓ Captured flight data from: {url}")
+                            if endpoint == 'availability':
+                                # Save for debugging (only when debug artifacts are enabled)
+                                self.debug.json('availability', data)
+                except:
+                    pass
+            
+            # Remember the availability request so a retry can re-issue it from the loaded page
+            def handle_request(request):
+                try:
+                    url = request.url.lower()
+                    if 'spicejet' in url and 'api' in url and 'search' in url and 'availability' in url:
+                        self.availability_request = request_snapshot(request)
                 except:
                     pass
             
-            # Listen for responses - MUST be before navigation
+            # Listen for requests/responses - MUST be before navigation
+            self.page.on("request", handle_request)
             self.page.on("response", handle_response)
             
             print("Browser initialized successfully (headless mode)!")
@@ -90,7 +109,8 @@ class SpiceJetScraper:
             return False
     
     def close(self):
-        """Close the browser"""
+        """Close the browser and finish writing debug artifacts"""
+        self.debug.close()
         try:
             if self.browser:
                 self.browser.close()
@@ -99,53 +119,119 @@ class SpiceJetScraper:
         except:
             pass
     
-    def build_search_url(self, origin, destination, date):
+    def _archive_captures(self, origin, destination, date):
+        """Keep the raw API captures (and the results page when it was parsed) in the capture archive"""
+        captures = [(captured.endpoint, captured.body, captured.url) for captured in self.capture.all()]
+        if self.budget.html_enrichment and captures:
+            try:
+                captures.append(('page', self.page.content(), self.page.url))
+            except:
+                pass
+        archive_captures('spicejet-international', captures, origin, destination, date)
+    
+    def _pause(self, seconds):
+        """Wait without blocking Playwright's event loop (so responses keep being captured)"""
+        try:
+            self.page.wait_for_timeout(seconds * 1000)
+        except:
+            time.sleep(seconds)
+    
+    def build_search_url(self, origin, destination, date, return_date=None):
         """Build SpiceJet search URL with parameters (works for both domestic and international)"""
         # Format: https://www.spicejet.com/search?from=DEL&to=DXB&tripType=1&departure=2025-12-31&adult=1&child=0&srCitizen=0&infant=0&currency=INR&redirectTo=/
         
-        # Format date as YYYY-MM-DD
-        date_parts = date.split('-')
-        if len(date_parts) == 3:
-            if len(date_parts[0]) == 4:  # YYYY-MM-DD
-                formatted_date = date
-            else:  # DD-MM-YYYY
-                formatted_date = f"{date_parts[2]}-{date_parts[1]}-{date_parts[0]}"
-        else:
-            formatted_date = date
+        # Round trips (tripType=2) add &return=YYYY-MM-DD and get both directions in one availability response
+        
+        def format_url_date(value):
+            """Format date as YYYY-MM-DD"""
+            date_parts = value.split('-')
+            if len(date_parts) == 3:
+                if len(date_parts[0]) == 4:  # YYYY-MM-DD
+                    return value
+                return f"{date_parts[2]}-{date_parts[1]}-{date_parts[0]}"  # DD-MM-YYYY
+            return value
         
-        url = f"https://www.spicejet.com/search?from={origin}&to={destination}&tripType=1&departure={formatted_date}&adult=1&child=0&srCitizen=0&infant=0&currency=INR&redirectTo=/"
+        formatted_date = format_url_date(date)
+        trip = "tripType=1"
+        if return_date:
+            trip = f"tripType=2&return={format_url_date(return_date)}"
+        
+        url = f"https://www.spicejet.com/search?from={origin}&to={destination}&{trip}&departure={formatted_date}&{passenger_query(self.passengers)}&currency=INR&redirectTo=/"
         return url
     
-    def load_search_page(self, origin, destination, date, retry_count=0):
-        """Load SpiceJet search page and wait for API calls"""
-        max_retries = 2  # Try up to 3 times total (initial + 2 retries)
+    def load_search_page(self, origin, destination, date, return_date=None):
+        """
+        Load SpiceJet search page and wait for API calls.
+        Retries re-issue just the availability request from the loaded page before falling back
+        to a full page reload.
+        """
+        max_retries = self.budget.max_retries  # Retries allowed by the search profile
         
-        try:
-            if retry_count > 0:
-                print(f"\nRetry attempt {retry_count}/{max_retries} - Reloading page...")
-                time.sleep(2)  # Brief pause before retry
-            
-            print(f"Loading SpiceJet search page: {origin} -> {destination} on {date}")
-            
-            url = self.build_search_url(origin, destination, date)
-            print(f"URL: {url}")
+        trip = f" returning {return_date}" if return_date else ""
+        print(f"Loading SpiceJet search page: {origin} -> {destination} on {date}{trip}")
+        url = self.build_search_url(origin, destination, date, return_date)
+        print(f"URL: {url}")
+        
+        page_loaded = self._open_search_page(url)
+        
+        retry_count = 0
+        while not self.flight_data and self.budget.can_retry(retry_count):
+            retry_count += 1
+            print(f"\n⚠ API response not captured. Retrying... (Attempt {retry_count}/{max_retries})")
             
-            # Reset flight_data for this attempt
-            if retry_count > 0:
-                self.flight_data = None
+            # Cheap retry: the page is already loaded with cookies/session, so only re-run the API call
+            # (unless replays keep failing and their circuit breaker is open)
+            if page_loaded and self.availability_request and breaker_allows('spicejet', 'api')[0]:
+                print("Re-issuing availability request from the loaded page...")
+                acquire_token('spicejet', 'availability replay', self.budget)
+                data = replay_request_in_page(self.page, self.availability_request, self.budget.timeout_ms(30000))
+                record_search_outcome('spicejet', 'api', 'ok' if data else 'error', self.budget)
+                if data:
+                    self.flight_data = data
+                    print("✓ Captured flight data from in-page retry")
+                    break
             
+            # Full reload only if the request never fired or the replay failed
+            print(f"Retry attempt {retry_count}/{max_retries} - Reloading page...")
+            self.budget.sleep(2)  # Brief pause before retry
+            page_loaded = self._open_search_page(url)
+        
+        if not self.flight_data and self.budget.expired():
+            print(f"\n⚠ API response not captured before the {self.budget.deadline_seconds:.0f}s deadline. Will extract from HTML only.")
+        elif not self.flight_data:
+            print("\n⚠ API response not captured after all retries. Will extract from HTML only.")
+        
+        # Still return the best partial result if the API response was captured
+        return page_loaded or self.flight_data is not None
+    
+    def _open_search_page(self, url):
+        """Navigate to the search URL and wait for the availability response. Returns True if the page loaded."""
+        self.flight_data = None
+        
+        try:
             # Navigate to the page
-            self.page.goto(url, wait_until='networkidle', timeout=60000)
-            time.sleep(10)  # Wait longer for API calls and page rendering
-            
-            # Also wait for specific elements that indicate page loaded
             try:
-                self.page.wait_for_selector("body", timeout=10000)
-                # Wait for flight results to appear (SG for SpiceJet flights)
-                self.page.wait_for_selector("*:has-text('SG')", timeout=15000)
-                time.sleep(5)  # Additional wait for dynamic content and prices to load
-            except:
-                time.sleep(5)  # Fallback wait
+                acquire_token('spicejet', 'search page', self.budget)
+                self.page.goto(url, wait_until=self.budget.wait_until, timeout=self.budget.timeout_ms(60000))
+            except PlaywrightTimeout:
+                # Keep whatever the page managed to load before the deadline
+                print("⚠ Page load timed out, continuing with captured data")
+            
+            if self.budget.html_enrichment:
+                self.budget.sleep(10)  # Wait longer for API calls and page rendering
+            else:
+                # API-only profile: stop waiting as soon as the availability response arrives
+                self.budget.wait_for(lambda: self.flight_data is not None, 10, pause=self._pause)
+            
+            # Also wait for specific elements that indicate page loaded (only needed for HTML parsing)
+            if self.budget.html_enrichment:
+                try:
+                    self.page.wait_for_selector("body", timeout=self.budget.timeout_ms(10000))
+                    # Wait for flight results to appear (SG for SpiceJet flights)
+                    self.page.wait_for_selector("*:has-text('SG')", timeout=self.budget.timeout_ms(15000))
+                    self.budget.sleep(5)  # Additional wait for dynamic content and prices to load
+                except:
+                    self.budget.sleep(5)  # Fallback wait
             
             # Debug: Print what we captured
             if self.flight_data:
@@ -191,21 +277,9 @@ class SpiceJetScraper:
                 except:
                     pass
             
-            # Check if we still don't have API data and should retry
-            if not self.flight_data and retry_count < max_retries:
-                print(f"\n⚠ API response not captured. Retrying... (Attempt {retry_count + 1}/{max_retries})")
-                return self.load_search_page(origin, destination, date, retry_count + 1)
-            elif not self.flight_data:
-                print("\n⚠ API response not captured after all retries. Will extract from HTML only.")
-            
             return True
         except Exception as e:
             print(f"Error loading search page: {e}")
-            # Retry on error if we haven't exceeded max retries
-            if retry_count < max_retries:
-                print(f"\n⚠ Error occurred. Retrying... (Attempt {retry_count + 1}/{max_retries})")
-                time.sleep(3)
-                return self.load_search_page(origin, destination, date, retry_count + 1)
             import traceback
             traceback.print_exc()
             return False
@@ -215,94 +289,26 @@ class SpiceJetScraper:
         flights = []
         
         try:
-            # Always parse HTML to get prices and points (API doesn't have prices)
+            # API-only profiles (or an exhausted deadline) skip the slow HTML pass;
+            # prices come from the API's faresAvailable section. Multi-passenger searches
+            # also skip it - the page shows totals for the whole party, the API per passenger
+            if self.flight_data and (not self.budget.html_enrichment or self.budget.expired()
+                                     or not is_single_adult(self.passengers)):
+                print(f"Using API data only (profile: {self.budget.profile}, {self.budget.elapsed():.1f}s elapsed)")
+                return self._tag_directions(self._parse_api_response(self.flight_data))
+            
+            # Parse HTML for prices and points as shown on the page (checked against the API-derived points)
             print("Extracting flights from HTML (for prices and points)...")
             html_flights = self._parse_html()
             
-            # If we have API response data, merge with HTML data
+            # Merge with the API flights (indexed once by flight number(s) and times)
+            sources = [('html', html_flights)]
             if self.flight_data:
                 print("Merging API data with HTML data...")
-                api_flights = self._parse_api_response(self.flight_data)
-                
-                # Create a dictionary to track merged flights (avoid duplicates)
-                merged_flights_dict = {}
-                
-                # First, add all HTML flights (they have prices/points)
-                for html_flight in html_flights:
-                    flight_num = html_flight.get('flight_number', '')
-                    if flight_num and flight_num != 'N/A':
-                        # Use flight number as key, but also check times to avoid duplicates
-                        key = f"{flight_num}_{html_flight.get('departure_time', 'N/A')}_{html_flight.get('arrival_time', 'N/A')}"
-                        if key not in merged_flights_dict:
-                            merged_flights_dict[key] = html_flight.copy()
-                
-                # Now merge API flights with HTML flights by flight number and times
-                for api_flight in api_flights:
-                    flight_num = api_flight.get('flight_number', '')
-                    if not flight_num or flight_num == 'N/A':
-                        continue
-                    
-                    # Try to find matching HTML flight by flight number and times
-                    matched = False
-                    for key, html_flight in merged_flights_dict.items():
-                        if html_flight.get('flight_number') == flight_num:
-                            # Check if times match (within reasonable tolerance)
-                            api_dep = api_flight.get('departure_time', '')
-                            api_arr = api_flight.get('arrival_time', '')
-                            html_dep = html_flight.get('departure_time', '')
-                            html_arr = html_flight.get('arrival_time', '')
-                            
-                            # If times match or HTML doesn't have times, merge
-                            if (api_dep == html_dep or html_dep == 'N/A') and (api_arr == html_arr or html_arr == 'N/A'):
-                                # Merge: use API for basic info, keep HTML for prices/points
-                                merged_flights_dict[key].update({
-                                    'departure_time': api_dep if api_dep != 'N/A' else html_dep,
-                                    'arrival_time': api_arr if api_arr != 'N/A' else html_arr,
-                                    'duration': api_flight.get('duration', html_flight.get('duration')),
-                                })
-                                matched = True
-                                break
-                    
-                    # If no match found, add API flight (but it won't have prices)
-                    if not matched:
-                        key = f"{flight_num}_{api_flight.get('departure_time', 'N/A')}_{api_flight.get('arrival_time', 'N/A')}"
-                        if key not in merged_flights_dict:
-                            merged_flights_dict[key] = api_flight.copy()
-                
-                # Final deduplication: remove any remaining duplicates
-                # Use full flight number + times to ensure uniqueness
-                final_flights = []
-                seen_keys = set()
-                for flight in merged_flights_dict.values():
-                    flight_num = flight.get('flight_number', '')
-                    dep_time = flight.get('departure_time', 'N/A')
-                    arr_time = flight.get('arrival_time', 'N/A')
-                    # Use full flight number (not just first) to distinguish connecting flights
-                    key = f"{flight_num}_{dep_time}_{arr_time}"
-                    
-                    if key not in seen_keys:
-                        seen_keys.add(key)
-                        final_flights.append(flight)
-                
-                flights = final_flights
-            else:
-                # No API data, just use HTML flights
-                # Remove duplicates
-                seen = set()
-                unique_flights = []
-                for flight in html_flights:
-                    flight_num = flight.get('flight_number', '')
-                    dep_time = flight.get('departure_time', 'N/A')
-                    arr_time = flight.get('arrival_time', 'N/A')
-                    # Use first flight number for connecting flights
-                    first_num = flight_num.split(',')[0].strip() if ',' in flight_num else flight_num
-                    key = f"{first_num}_{dep_time}_{arr_time}"
-                    if key not in seen:
-                        seen.add(key)
-                        unique_flights.append(flight)
-                flights = unique_flights
+                sources.insert(0, ('api', self._parse_api_response(self.flight_data)))
+            flights = merge_flights(sources, config.MERGE_FIELD_PRIORITY, on_conflict=points_conflict)
             
-            return flights
+            return self._tag_directions(flights)
             
         except Exception as e:
             print(f"Error extracting flights: {e}")
@@ -310,6 +316,18 @@ class SpiceJetScraper:
             traceback.print_exc()
             return []
     
+    def _tag_directions(self, flights):
+        """
+        One-way results are all outbound. On round trips only the API knows which trip a flight
+        belongs to, so HTML-only flights (no direction) are dropped.
+        """
+        if self.return_date:
+            return [flight for flight in flights if flight.get('direction')]
+        for flight in flights:
+            if not flight.get('direction'):
+                flight['direction'] = 'outbound'
+        return flights
+    
     def _parse_api_response(self, data):
         """Parse flight data from API JSON response"""
         flights = []
@@ -385,6 +403,7 @@ class SpiceJetScraper:
                 data_content = data['data']
                 if isinstance(data_content, dict) and 'trips' in data_content:
                     trips = data_content['trips']
+                    fares_available = data_content.get('faresAvailable', {})
                     if isinstance(trips, list) and len(trips) > 0:
                         print(f"Found flight data dict with keys: {list(data_content.keys())}")
                         print(f"  Processing {len(trips)} trip(s)")
@@ -394,8 +413,10 @@ class SpiceJetScraper:
                                 print(f"      Found {len(trip['journeysAvailable'])} item(s) in 'journeysAvailable'")
                                 for journey_idx, journey in enumerate(trip['journeysAvailable']):
                                     print(f"        Item {journey_idx} keys: {list(journey.keys())}")
-                                    flight = self._extract_flight_from_item(journey)
+                                    flight = self._extract_flight_from_item(journey, fares_available)
                                     if flight:
+                                        # trips[0] is the outbound journey, trips[1] the return (round trips)
+                                        flight['direction'] = 'return' if trip_idx == 1 else 'outbound'
                                         flights.append(flight)
                             else:
                                 print(f"      No 'journeysAvailable' found in trip {trip_idx}")
@@ -411,7 +432,7 @@ class SpiceJetScraper:
         
         return flights
     
-    def _extract_flight_from_item(self, item):
+    def _extract_flight_from_item(self, item, fares_available=None):
         """Extract flight information from a single item in API response"""
         if not isinstance(item, dict):
             return None
@@ -534,11 +555,20 @@ class SpiceJetScraper:
             if 'fares' in item:
                 fares = item['fares']
                 if isinstance(fares, dict):
-                    # Fares is a dict with fare codes as keys
-                    # We need to find the actual price - might need to check faresAvailable in parent
-                    # For now, mark as available but price needs separate lookup
+                    # Fares is a dict keyed by fareAvailabilityKey - prices live in data.faresAvailable
+                    fare_prices = self._get_fare_family_prices(fares, fares_available)
                     fare_codes = list(fares.keys())
-                    if fare_codes:
+                    # Per-passenger-type fares so other passenger mixes can be priced without a re-scrape
+                    fare_components = journey_fare_components(fares, fares_available, config.FARE_FAMILY_BY_PRODUCT_CLASS)
+                    if fare_components:
+                        flight['fare_components'] = fare_components
+                        # Points from the earn rules (or the API's loyaltyPoints) - no HTML pass needed
+                        flight.update(points_from_fare_components('spicejet', fare_components))
+                    if fare_prices:
+                        flight.update(fare_prices)
+                        cheapest = min(fare_prices.values(), key=lambda p: int(re.sub(r'[^\d]', '', p)))
+                        flight['price_inr'] = fare_prices.get('spicesaver_price', cheapest)
+                    elif fare_codes:
                         # At least one fare is available
                         flight['price_inr'] = 'Check website'  # Placeholder
                 elif isinstance(fares, list) and len(fares) > 0:
@@ -579,6 +609,31 @@ class SpiceJetScraper:
         
         return flight if flight['flight_number'] != 'N/A' else None
     
+    def _get_fare_family_prices(self, fares, fares_available):
+        """Map a journey's fare keys to SpiceSaver / SpiceFlex / SpiceMax prices (adult, incl. taxes)"""
+        prices = {}
+        if not isinstance(fares_available, dict):
+            return prices
+        
+        for fare_key in fares:
+            fare_info = fares_available.get(fare_key)
+            if not isinstance(fare_info, dict):
+                continue
+            
+            fare_family = config.FARE_FAMILY_BY_PRODUCT_CLASS.get(fare_info.get('productClass'))
+            if not fare_family:
+                continue
+            
+            for passenger_fare in fare_info.get('passengerFares') or []:
+                if passenger_fare.get('passengerType') == 'ADT' and isinstance(passenger_fare.get('fareAmount'), (int, float)):
+                    price_key = f'{fare_family}_price'
+                    amount = int(passenger_fare['fareAmount'])
+                    if price_key not in prices or amount < int(re.sub(r'[^\d]', '', prices[price_key])):
+                        prices[price_key] = f"₹{amount:,}"
+                    break
+        
+        return prices
+    
     def _format_time(self, time_str):
         """Format time string to HH:MM format"""
         try:
@@ -622,21 +677,21 @@ class SpiceJetScraper:
             print("Parsing HTML for prices and points...")
             
             # Wait a bit more for page to fully render and prices to load
-            time.sleep(5)
+            self.budget.sleep(5)
             
             # Scroll page to load all content
             try:
                 self.page.evaluate("window.scrollTo(0, document.body.scrollHeight)")
-                time.sleep(3)
+                self.budget.sleep(3)
                 self.page.evaluate("window.scrollTo(0, 0)")
-                time.sleep(3)
+                self.budget.sleep(3)
             except:
                 pass
             
             # Wait for fare bundles to be visible
             try:
-                self.page.wait_for_selector("#fare-bundle-val, [id='fare-bundle-val']", timeout=10000)
-                time.sleep(2)
+                self.page.wait_for_selector("#fare-bundle-val, [id='fare-bundle-val']", timeout=self.budget.timeout_ms(10000))
+                self.budget.sleep(2)
             except:
                 pass
             
@@ -684,7 +739,8 @@ class SpiceJetScraper:
                     containers_to_check.append(elem)
             
             # Strategy 3: Fallback - find containers with both flight number and prices
-            if not containers_to_check:
+            # (scans every div, so only the thorough profile pays for it)
+            if not containers_to_check and self.budget.exhaustive_selectors:
                 all_divs = self.page.query_selector_all("div")
                 for div in all_divs:
                     try:
@@ -701,6 +757,10 @@ class SpiceJetScraper:
             
             for container in containers_to_check:
                 try:
+                    if self.budget.expired():
+                        print(f"⚠ Search deadline reached - returning {len(flights)} flight(s) parsed so far")
+                        break
+                    
                     # Get the flight container that contains both aircraft-no and this fare bundle
                     flight_container_data = container.evaluate("""
                         el => {
@@ -862,7 +922,7 @@ class SpiceJetScraper:
                                 pass
                             
                             # If not found, search within the same fare bundle only
-                            if not fare_button:
+                            if not fare_button and self.budget.exhaustive_selectors:
                                 try:
                                     # Get the fare bundle container for this flight
                                     fare_bundle_container = container.evaluate("""
@@ -1135,23 +1195,56 @@ class SpiceJetScraper:
         
         return flights
     
-    def scrape_flights(self, origin, destination, date):
-        """Main method to scrape flights"""
+    def _answered_empty(self):
+        """True when the captured availability response lists trips but no journeys on any of them"""
+        data = self.flight_data.get('data') if isinstance(self.flight_data, dict) else None
+        trips = data.get('trips') if isinstance(data, dict) else None
+        if not isinstance(trips, list) or not trips:
+            return False
+        return all(isinstance(trip, dict) and trip.get('journeysAvailable') == [] for trip in trips)
+    
+    def scrape_flights(self, origin, destination, date, profile='thorough', deadline=None, return_date=None,
+                       passengers=None, budget=None):
+        """
+        Main method to scrape flights (one-way, or round trip when return_date is given)
+        profile: 'fast' / 'balanced' (API only) or 'thorough' (API plus HTML verification)
+        deadline: optional total seconds for the search (defaults to the profile's deadline)
+        passengers: passenger mix to search with (see shared/fare_calculator.py); defaults to one adult
+        budget: a SearchBudget to use instead of one built from profile/deadline (hedged_search passes
+                each attempt its own, so cancelling it always reaches this search)
+        """
+        self.budget = budget or SearchBudget(profile, deadline)
+        self.debug = DebugArtifacts('spicejet', origin, destination)
+        self.return_date = return_date
+        self.passengers = passengers or dict(SINGLE_ADULT)
         try:
             # Setup driver
             if not self.setup_driver():
                 return []
             
             # Load search page
-            if not self.load_search_page(origin, destination, date):
+            if not self.load_search_page(origin, destination, date, return_date):
+                record_search_outcome('spicejet', 'browser', 'error', self.budget)
                 return []
             
             # Extract flight data
             flights = self.extract_flights_from_data()
+            # A hedged attempt that lost persists nothing (not even its raw captures); a search cut off
+            # by its deadline keeps its fares but does not replace the route's stored results
+            if not self.budget.cancelled:
+                self._archive_captures(origin, destination, date)
+                truncated = self.budget.expired()
+                record_fares('spicejet', flights, origin, destination, date, return_date)
+                publish_changes('spicejet', flights, origin, destination, date, return_date, budget=self.budget)
+                store_results('spicejet', flights, origin, destination, date, return_date, truncated=truncated)
+                record_outcome('spicejet', origin, destination, flights, self._answered_empty(), self.budget)
+            # A loaded page that yielded neither the availability response nor flights counts as a failure
+            record_search_outcome('spicejet', 'browser', 'ok' if self.flight_data or flights else 'error', self.budget)
             
             return flights
             
         except Exception as e:
+            record_search_outcome('spicejet', 'browser', 'error', self.budget)
             print(f"Error during scraping: {e}")
             import traceback
             traceback.print_exc()
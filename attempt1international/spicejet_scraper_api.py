@@ -44,13 +44,25 @@ class SuppressOutput:
 def main():
     if len(sys.argv) < 4:
         # Write to stderr for errors, stdout only for JSON
-        sys.stderr.write(json.dumps({"error": "Missing arguments: origin destination date"}) + "\n")
+        sys.stderr.write(json.dumps({"error": "Missing arguments: origin destination date [--return DATE] [--passengers all|adult=N,child=N,infant=N]"}) + "\n")
         sys.exit(1)
     
     origin_input = sys.argv[1]
     destination_input = sys.argv[2]
     date_input = sys.argv[3]
     
+    # Optional flags after the positional arguments (profile, deadline, hedging, return date, passengers)
+    sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+    from shared.search_budget import parse_search_options
+    from shared.fare_calculator import SINGLE_ADULT
+    from shared.retry import hedged_search, silence_attempts
+    from shared.flight_record import flight_records
+    try:
+        options = parse_search_options(sys.argv[4:])
+    except ValueError as e:
+        sys.stderr.write(json.dumps({"error": str(e)}) + "\n")
+        sys.exit(1)
+    
     # Import after setting up suppression
     from spicejet_scraper import SpiceJetScraper
     from utils import normalize_city_input, parse_date
@@ -73,11 +85,23 @@ def main():
         sys.stderr.write(json.dumps({"error": f"Invalid date: {date_input}"}) + "\n")
         sys.exit(1)
     
+    # Round trip: both directions come back from one search
+    return_date = None
+    if options['return_date']:
+        return_date = parse_date(options['return_date'])
+        if not return_date or return_date < date:
+            sys.stderr.write(json.dumps({"error": f"Invalid return date: {options['return_date']}"}) + "\n")
+            sys.exit(1)
+    
     # Create scraper and scrape (suppress all print output)
+    # A losing hedged attempt can outlive the search - keep its output off stdout/stderr for good
+    silence_attempts()
     try:
         with SuppressOutput():
-            scraper = SpiceJetScraper()
-            flights = scraper.scrape_flights(origin, destination, date)
+            flights = hedged_search(SpiceJetScraper, origin, destination, date, airline='spicejet',
+                                    profile=options['profile'], deadline=options['deadline'],
+                                    hedge=options['hedge'], return_date=return_date,
+                                    passengers=options['passengers'])
     except Exception as e:
         # Write error to stderr, not stdout
         sys.stderr.write(json.dumps({"error": f"Scraping failed: {str(e)}"}) + "\n")
@@ -86,8 +110,13 @@ def main():
     # Output JSON to stdout only (this is the only thing that should be in stdout)
     result = {
         "success": True,
-        "flights": flights,
-        "count": len(flights)
+        # Typed records (prices in paise, minutes, ISO datetimes) - the frontend formats them for display
+        "flights": flight_records(flights, origin, destination, date, return_date),
+        "count": len(flights),
+        "profile": options['profile'],
+        "trip_type": "round_trip" if return_date else "one_way",
+        # Each flight's fare_components can price any mix of the passenger types searched here
+        "passengers": options['passengers'] or SINGLE_ADULT
     }
     
     # Use ensure_ascii=True to escape Unicode characters (like ₹) as \u20b9
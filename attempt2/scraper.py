@@ -5,6 +5,7 @@ Using undetected-chromedriver for better stealth
 
 import time
 import sys
+import os
 import re
 import undetected_chromedriver as uc
 from selenium.webdriver.common.by import By
@@ -16,6 +17,15 @@ from bs4 import BeautifulSoup
 import config
 from utils import normalize_city_input, parse_date, format_flight_data
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+from shared.search_budget import SearchBudget
+from shared.fare_history import record_fares
+from shared.change_feed import publish_changes
+from shared.result_store import store_results
+from shared.serviceability import record_outcome
+from shared.rate_limit import acquire_token
+from shared.circuit_breaker import record_search_outcome
+
 
 class IndiGoScraper:
     """Scraper class for IndiGo flight data using undetected-chromedriver"""
@@ -23,6 +33,7 @@ class IndiGoScraper:
     def __init__(self):
         self.driver = None
         self.wait = None
+        self.budget = SearchBudget()
     
     def setup_driver(self):
         """Initialize and configure Chrome WebDriver using undetected-chromedriver"""
@@ -61,7 +72,7 @@ class IndiGoScraper:
                     self.driver = uc.Chrome(options=options, version_main=None, keep_alive=True)
                     
                     # Give browser a moment to fully start
-                    time.sleep(3)
+                    self.budget.sleep(3)
                     
                     # Verify browser is actually open by checking window handles
                     handles = self.driver.window_handles
@@ -75,18 +86,19 @@ class IndiGoScraper:
                     if attempt < max_retries - 1:
                         print(f"Attempt {attempt + 1} failed: {init_error}")
                         print("Retrying browser initialization...")
-                        time.sleep(3)
+                        self.budget.sleep(3)
                     else:
                         raise Exception(f"Failed to open browser after {max_retries} attempts: {init_error}")
             
             # Set up waits - but use longer timeouts to prevent browser from closing
-            self.driver.implicitly_wait(config.IMPLICIT_WAIT)
+            # (missing-element lookups scale with the search profile, timeouts are capped by the deadline)
+            self.driver.implicitly_wait(config.IMPLICIT_WAIT * self.budget.settle_scale)
             # Don't set page_load_timeout too short - it might cause browser to close
-            self.driver.set_page_load_timeout(60)  # Increased timeout
-            self.wait = WebDriverWait(self.driver, config.EXPLICIT_WAIT_TIMEOUT)
+            self.driver.set_page_load_timeout(self.budget.timeout(60))  # Increased timeout
+            self.wait = WebDriverWait(self.driver, self.budget.timeout(config.EXPLICIT_WAIT_TIMEOUT))
             
             # Give browser additional time to fully initialize
-            time.sleep(2)
+            self.budget.sleep(2)
             
             # Keep browser alive by accessing it
             try:
@@ -138,7 +150,7 @@ class IndiGoScraper:
             print(f"Loading URL: {config.FLIGHT_SEARCH_URL}")
             
             navigation_success = False
-            max_nav_retries = 3
+            max_nav_retries = self.budget.max_retries + 1
             
             for nav_attempt in range(max_nav_retries):
                 try:
@@ -152,13 +164,14 @@ class IndiGoScraper:
                     try:
                         # First, ensure browser is responsive
                         _ = self.driver.current_url
-                        time.sleep(1)
+                        self.budget.sleep(1)
                         
                         # Navigate - use execute_script as fallback if get() fails
                         try:
+                            acquire_token('indigo', 'search page', self.budget)
                             # Set a longer timeout for this specific navigation
                             original_timeout = self.driver.timeouts.page_load
-                            self.driver.set_page_load_timeout(60)
+                            self.driver.set_page_load_timeout(self.budget.timeout(60))
                             
                             self.driver.get(config.FLIGHT_SEARCH_URL)
                             
@@ -168,8 +181,9 @@ class IndiGoScraper:
                             # If direct get() fails, try JavaScript navigation
                             print("Direct navigation failed, trying JavaScript navigation...")
                             try:
+                                acquire_token('indigo', 'search page', self.budget)
                                 self.driver.execute_script(f"window.location.href = '{config.FLIGHT_SEARCH_URL}';")
-                                time.sleep(5)  # Wait longer for navigation
+                                self.budget.sleep(5)  # Wait longer for navigation
                             except Exception as js_error:
                                 raise direct_get_error  # Raise original error
                     except Exception as get_error:
@@ -194,7 +208,7 @@ class IndiGoScraper:
                         # If it's a timeout but browser is open, continue
                         if "timeout" in str(get_error).lower() or "timed out" in str(get_error).lower():
                             print(f"Navigation timeout, but browser is still open. Continuing...")
-                            time.sleep(2)
+                            self.budget.sleep(2)
                             try:
                                 current_url = self.driver.current_url
                                 if 'goindigo' in current_url.lower():
@@ -206,7 +220,7 @@ class IndiGoScraper:
                             raise get_error
                     
                     # Wait for page to start loading
-                    time.sleep(3)
+                    self.budget.sleep(3)
                     
                     # Verify navigation was successful
                     try:
@@ -244,7 +258,7 @@ class IndiGoScraper:
                             if not self.setup_driver():
                                 return False
                         
-                        time.sleep(3)
+                        self.budget.sleep(3)
                     else:
                         print(f"Failed to navigate after {max_nav_retries} attempts: {nav_error}")
                         return False
@@ -252,7 +266,7 @@ class IndiGoScraper:
             if not navigation_success:
                 return False
             
-            time.sleep(config.ACTION_DELAY)
+            self.budget.sleep(config.ACTION_DELAY)
             
             # Handle cookie consent if present
             try:
@@ -261,7 +275,7 @@ class IndiGoScraper:
                         "//button[contains(text(), 'Accept') or contains(text(), 'OK') or contains(@class, 'cookie')]"))
                 )
                 cookie_button.click()
-                time.sleep(config.ACTION_DELAY)
+                self.budget.sleep(config.ACTION_DELAY)
                 print("Handled cookie consent.")
             except TimeoutException:
                 pass  # No cookie popup
@@ -273,7 +287,7 @@ class IndiGoScraper:
                 for btn in close_buttons:
                     if btn.is_displayed():
                         btn.click()
-                        time.sleep(0.5)
+                        self.budget.sleep(0.5)
             except:
                 pass
             
@@ -286,11 +300,11 @@ class IndiGoScraper:
         """Fill the flight search form"""
         try:
             print(f"Filling search form: {origin} -> {destination} on {date}")
-            time.sleep(2)  # Wait for page to fully load
+            self.budget.sleep(2)  # Wait for page to fully load
             
             # Wait for the form to be visible
             self.wait.until(EC.presence_of_element_located((By.CLASS_NAME, "search-widget-form")))
-            time.sleep(1)
+            self.budget.sleep(1)
             
             # Fill Origin field
             print("Filling origin field...")
@@ -300,7 +314,7 @@ class IndiGoScraper:
                         "//div[@aria-label='sourceCity' or contains(@class, 'search-widget-form-body__from')]"))
                 )
                 origin_container.click()
-                time.sleep(1)
+                self.budget.sleep(1)
                 
                 origin_input = self.driver.find_element(By.XPATH, 
                     "//div[@aria-label='sourceCity']//input[@placeholder='Start typing..']")
@@ -309,25 +323,25 @@ class IndiGoScraper:
                 self.driver.execute_script("arguments[0].value = '';", origin_input)
                 for char in origin:
                     origin_input.send_keys(char)
-                    time.sleep(0.5)
+                    self.budget.sleep(0.5)
                 
-                time.sleep(0.5)  # Wait before selecting dropdown
+                self.budget.sleep(0.5)  # Wait before selecting dropdown
                 
                 # Select from dropdown
                 try:
                     self.wait.until(EC.presence_of_element_located((By.CLASS_NAME, "city-selection")))
-                    time.sleep(1.5)
+                    self.budget.sleep(1.5)
                     
                     dropdown_option = self.wait.until(
                         EC.element_to_be_clickable((By.XPATH, 
                             f"//div[contains(@class, 'city-selection__list-item-wrapper')]//div[contains(@class, 'city-selection__list-item--info__right')]//div[normalize-space(text())='{origin}']/ancestor::div[contains(@class, 'city-selection__list-item-wrapper')]"))
                     )
                     dropdown_option.click()
-                    time.sleep(1)
+                    self.budget.sleep(1)
                     print(f"Selected origin: {origin}")
                 except TimeoutException:
                     origin_input.send_keys(Keys.ENTER)
-                    time.sleep(1)
+                    self.budget.sleep(1)
                     print(f"Used Enter for origin: {origin}")
             except Exception as e:
                 print(f"Error filling origin: {e}")
@@ -341,7 +355,7 @@ class IndiGoScraper:
                         "//div[@aria-label='destinationCity' or contains(@class, 'search-widget-form-body__to')]"))
                 )
                 dest_container.click()
-                time.sleep(1)
+                self.budget.sleep(1)
                 
                 dest_input = self.driver.find_element(By.XPATH,
                     "//div[@aria-label='destinationCity']//input[@placeholder='Start typing..']")
@@ -350,25 +364,25 @@ class IndiGoScraper:
                 self.driver.execute_script("arguments[0].value = '';", dest_input)
                 for char in destination:
                     dest_input.send_keys(char)
-                    time.sleep(0.5)
+                    self.budget.sleep(0.5)
                 
-                time.sleep(0.5)
+                self.budget.sleep(0.5)
                 
                 # Select from dropdown
                 try:
                     self.wait.until(EC.presence_of_element_located((By.CLASS_NAME, "city-selection")))
-                    time.sleep(1.5)
+                    self.budget.sleep(1.5)
                     
                     dropdown_option = self.wait.until(
                         EC.element_to_be_clickable((By.XPATH,
                             f"//div[contains(@class, 'city-selection__list-item-wrapper')]//div[contains(@class, 'city-selection__list-item--info__right')]//div[normalize-space(text())='{destination}']/ancestor::div[contains(@class, 'city-selection__list-item-wrapper')]"))
                     )
                     dropdown_option.click()
-                    time.sleep(1)
+                    self.budget.sleep(1)
                     print(f"Selected destination: {destination}")
                 except TimeoutException:
                     dest_input.send_keys(Keys.ENTER)
-                    time.sleep(1)
+                    self.budget.sleep(1)
                     print(f"Used Enter for destination: {destination}")
             except Exception as e:
                 print(f"Error filling destination: {e}")
@@ -397,12 +411,12 @@ class IndiGoScraper:
                         "//div[@aria-label='departureDate' or contains(@class, 'search-widget-form-body__departure')]"))
                 )
                 date_container.click()
-                time.sleep(2)
+                self.budget.sleep(2)
                 
                 # Wait for calendar to appear
                 try:
                     self.wait.until(EC.presence_of_element_located((By.CLASS_NAME, "rdrCalendarWrapper")))
-                    time.sleep(1)
+                    self.budget.sleep(1)
                     print("Calendar opened successfully")
                 except TimeoutException:
                     print("Warning: Calendar did not appear, trying alternative method...")
@@ -418,7 +432,7 @@ class IndiGoScraper:
                         input.dispatchEvent(new Event('change', {{ bubbles: true }}));
                         """
                         self.driver.execute_script(js_code, date_input)
-                        time.sleep(1)
+                        self.budget.sleep(1)
                         print(f"Set date via input (fallback): {formatted_date}")
                         return  # Exit early if using fallback
                     except:
@@ -458,13 +472,13 @@ class IndiGoScraper:
                                 # Need to go forward
                                 next_button = self.driver.find_element(By.CLASS_NAME, "rdrNextButton")
                                 next_button.click()
-                                time.sleep(0.5)
+                                self.budget.sleep(0.5)
                                 print(f"Navigated forward to month {current_month_num + 1}")
                             elif months_diff < 0:
                                 # Need to go backward
                                 prev_button = self.driver.find_element(By.CLASS_NAME, "rdrPprevButton")
                                 prev_button.click()
-                                time.sleep(0.5)
+                                self.budget.sleep(0.5)
                                 print(f"Navigated backward to month {current_month_num - 1}")
                             else:
                                 # Already on correct month
@@ -475,7 +489,7 @@ class IndiGoScraper:
                         break
                 
                 # Now find and click the day button
-                time.sleep(1)
+                self.budget.sleep(1)
                 
                 day_found = False
                 try:
@@ -508,19 +522,19 @@ class IndiGoScraper:
                                             print(f"Found date button for {day_int}, clicking...")
                                             # Scroll into view first
                                             self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", day_button)
-                                            time.sleep(0.5)
+                                            self.budget.sleep(0.5)
                                             
                                             # Try regular click first
                                             try:
                                                 day_button.click()
-                                                time.sleep(0.5)
+                                                self.budget.sleep(0.5)
                                             except:
                                                 # If regular click fails, use JavaScript
                                                 self.driver.execute_script("arguments[0].click();", day_button)
-                                                time.sleep(0.5)
+                                                self.budget.sleep(0.5)
                                             
                                             # Wait for calendar to close or date to be set
-                                            time.sleep(2)
+                                            self.budget.sleep(2)
                                             
                                             # Verify date was set by checking input
                                             try:
@@ -535,7 +549,7 @@ class IndiGoScraper:
                                                     # Date not set yet, try clicking again
                                                     print("Date not set, trying click again...")
                                                     self.driver.execute_script("arguments[0].click();", day_button)
-                                                    time.sleep(2)
+                                                    self.budget.sleep(2)
                                                     selected_date = date_input.get_attribute('value')
                                                     if selected_date:
                                                         print(f"✓ Date selected on retry: {selected_date}")
@@ -572,18 +586,18 @@ class IndiGoScraper:
                                     if day_button.is_displayed():
                                         print(f"Found date button for {day_int}, clicking (method 2)...")
                                         self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", day_button)
-                                        time.sleep(0.5)
+                                        self.budget.sleep(0.5)
                                         
                                         # Try regular click first
                                         try:
                                             day_button.click()
-                                            time.sleep(0.5)
+                                            self.budget.sleep(0.5)
                                         except:
                                             self.driver.execute_script("arguments[0].click();", day_button)
-                                            time.sleep(0.5)
+                                            self.budget.sleep(0.5)
                                         
                                         # Wait and verify
-                                        time.sleep(2)
+                                        self.budget.sleep(2)
                                         try:
                                             date_input = self.driver.find_element(By.XPATH,
                                                 "//div[@aria-label='departureDate']//input")
@@ -609,18 +623,18 @@ class IndiGoScraper:
                             if day_button.is_displayed():
                                 print(f"Found date button via XPath for {day_int}, clicking (method 3)...")
                                 self.driver.execute_script("arguments[0].scrollIntoView({block: 'center'});", day_button)
-                                time.sleep(0.5)
+                                self.budget.sleep(0.5)
                                 
                                 # Try regular click first
                                 try:
                                     day_button.click()
-                                    time.sleep(0.5)
+                                    self.budget.sleep(0.5)
                                 except:
                                     self.driver.execute_script("arguments[0].click();", day_button)
-                                    time.sleep(0.5)
+                                    self.budget.sleep(0.5)
                                 
                                 # Wait and verify
-                                time.sleep(2)
+                                self.budget.sleep(2)
                                 try:
                                     date_input = self.driver.find_element(By.XPATH,
                                         "//div[@aria-label='departureDate']//input")
@@ -635,7 +649,7 @@ class IndiGoScraper:
                             print(f"Method 3 failed: {e}")
                     
                     # Always verify the date was selected
-                    time.sleep(1)
+                    self.budget.sleep(1)
                     date_verified = False
                     try:
                         date_input = self.driver.find_element(By.XPATH,
@@ -654,7 +668,7 @@ class IndiGoScraper:
                                     day_button = self.driver.find_element(By.XPATH,
                                         f"//button[contains(@class, 'rdrDay') and not(contains(@class, 'rdrDayDisabled'))]//span[@class='date' and normalize-space(text())='{day_int}']/ancestor::button[1]")
                                     day_button.click()
-                                    time.sleep(2)
+                                    self.budget.sleep(2)
                                     selected_date_value = date_input.get_attribute('value')
                                     if selected_date_value:
                                         print(f"✓ Date set on retry: '{selected_date_value}'")
@@ -672,12 +686,12 @@ class IndiGoScraper:
                             try:
                                 close_button = self.driver.find_element(By.XPATH, "//button[contains(@class, 'rdrCloseButton') or contains(@aria-label, 'close')]")
                                 close_button.click()
-                                time.sleep(0.5)
+                                self.budget.sleep(0.5)
                             except:
                                 # Click outside calendar to close it
                                 try:
                                     self.driver.find_element(By.TAG_NAME, "body").click()
-                                    time.sleep(0.5)
+                                    self.budget.sleep(0.5)
                                 except:
                                     pass
                             
@@ -689,7 +703,7 @@ class IndiGoScraper:
                             try:
                                 # Method 1: Direct value setting
                                 self.driver.execute_script(f"arguments[0].value = '{formatted_date}';", date_input)
-                                time.sleep(0.5)
+                                self.budget.sleep(0.5)
                                 
                                 # Method 2: Trigger events
                                 self.driver.execute_script("""
@@ -698,7 +712,7 @@ class IndiGoScraper:
                                     input.dispatchEvent(new Event('change', { bubbles: true }));
                                     input.dispatchEvent(new Event('blur', { bubbles: true }));
                                 """, date_input)
-                                time.sleep(1)
+                                self.budget.sleep(1)
                                 
                                 # Verify
                                 selected_date_value = date_input.get_attribute('value')
@@ -725,7 +739,7 @@ class IndiGoScraper:
                         input.dispatchEvent(new Event('change', {{ bubbles: true }}));
                         """
                         self.driver.execute_script(js_code, date_input)
-                        time.sleep(1)
+                        self.budget.sleep(1)
                         print(f"Set date via input (fallback): {formatted_date}")
                     except:
                         pass
@@ -737,7 +751,7 @@ class IndiGoScraper:
             
             # Submit the form
             print("Submitting search...")
-            time.sleep(1)
+            self.budget.sleep(1)
             try:
                 search_button = self.wait.until(
                     EC.element_to_be_clickable((By.XPATH, 
@@ -746,13 +760,13 @@ class IndiGoScraper:
                 )
                 
                 if search_button.get_attribute('disabled'):
-                    time.sleep(2)
+                    self.budget.sleep(2)
                     self.driver.execute_script("arguments[0].click();", search_button)
                 else:
                     search_button.click()
                 
                 print("Search submitted. Waiting for results...")
-                time.sleep(config.AFTER_SEARCH_DELAY)
+                self.budget.sleep(config.AFTER_SEARCH_DELAY)
                 
                 return True
             except Exception as e:
@@ -775,7 +789,7 @@ class IndiGoScraper:
                 self.wait.until(lambda driver: 'booking' in driver.current_url.lower() or 
                                'search' in driver.current_url.lower() or 
                                'result' in driver.current_url.lower())
-                time.sleep(3)
+                self.budget.sleep(3)
             except:
                 pass
             
@@ -784,11 +798,11 @@ class IndiGoScraper:
             
             # Wait for flight results to appear
             print("Waiting for flight results to appear...")
-            max_wait_time = 30
+            max_wait_time = self.budget.timeout(30)
             wait_interval = 2
             waited = 0
             
-            while waited < max_wait_time:
+            while waited < max_wait_time and not self.budget.expired():
                 try:
                     # Check for flight containers
                     flight_containers = self.driver.find_elements(By.CSS_SELECTOR, 
@@ -796,7 +810,7 @@ class IndiGoScraper:
                     
                     if len(flight_containers) > 0:
                         print(f"Found {len(flight_containers)} flight containers!")
-                        time.sleep(5)
+                        self.budget.sleep(5)
                         break
                     
                     # Check for flight numbers
@@ -814,7 +828,7 @@ class IndiGoScraper:
                     
                     if len(valid_flights) > 0 and len(price_elements) > 2:
                         print(f"Flight results detected! Found {len(valid_flights)} flights, {len(price_elements)} prices")
-                        time.sleep(5)
+                        self.budget.sleep(5)
                         break
                     else:
                         if waited % 5 == 0:
@@ -862,7 +876,8 @@ class IndiGoScraper:
                 except:
                     continue
             
-            if not flight_elements:
+            # Scanning every element on the page is slow, so only the thorough profile pays for it
+            if not flight_elements and self.budget.exhaustive_selectors:
                 print("No flight containers found. Searching page for flight data...")
                 # Search for elements containing flight numbers
                 all_elements = self.driver.find_elements(By.XPATH, "//*")
@@ -884,6 +899,10 @@ class IndiGoScraper:
             seen_flights = set()  # Track seen flights to avoid duplicates
             for idx, element in enumerate(flight_elements[:20]):
                 try:
+                    if self.budget.expired():
+                        print(f"⚠ Search deadline reached - returning {len(flights)} flight(s) parsed so far")
+                        break
+                    
                     flight_data = {
                         'airline': 'IndiGo',
                         'flight_number': 'N/A',
@@ -961,7 +980,7 @@ class IndiGoScraper:
                         pass
                     
                     # If Economy price not found, try Business class price as fallback
-                    if not price_found:
+                    if not price_found and self.budget.exhaustive_selectors:
                         try:
                             business_price_elems = element.find_elements(By.CSS_SELECTOR, 
                                 ".business-class-item .selected-fare__fare-price")
@@ -1114,7 +1133,7 @@ class IndiGoScraper:
                         pass
                     
                     # If Economy points not found, try Business class points as fallback
-                    if flight_data['award_points'] == 'N/A':
+                    if flight_data['award_points'] == 'N/A' and self.budget.exhaustive_selectors:
                         try:
                             business_points_elems = element.find_elements(By.CSS_SELECTOR, 
                                 ".business-class-item .loyalty-points.loyalty-starts-at-points")
@@ -1168,8 +1187,13 @@ class IndiGoScraper:
             print(f"Error in Selenium extraction: {e}")
             return []
 
-    def scrape_flights(self, origin, destination, date):
-        """Main method to scrape flights"""
+    def scrape_flights(self, origin, destination, date, profile='thorough', deadline=None):
+        """
+        Main method to scrape flights
+        profile: 'fast', 'balanced' or 'thorough' (see shared/search_budget.py)
+        deadline: optional total seconds for the search (defaults to the profile's deadline)
+        """
+        self.budget = SearchBudget(profile, deadline)
         try:
             # Setup driver
             if not self.setup_driver():
@@ -1177,18 +1201,31 @@ class IndiGoScraper:
             
             # Navigate to search page
             if not self.navigate_to_search_page():
+                record_search_outcome('indigo', 'browser', 'error', self.budget)
                 return []
             
             # Fill search form
             if not self.fill_search_form(origin, destination, date):
+                record_search_outcome('indigo', 'browser', 'error', self.budget)
                 return []
             
             # Extract flight data
             flights = self.extract_flight_data()
+            # A hedged attempt that lost persists nothing; a search cut off by its deadline keeps its
+            # fares but does not replace the route's stored results
+            if not self.budget.cancelled:
+                truncated = self.budget.expired()
+                record_fares('indigo', flights, origin, destination, date)
+                publish_changes('indigo', flights, origin, destination, date, budget=self.budget)
+                store_results('indigo', flights, origin, destination, date, truncated=truncated)
+                # IndiGo results come from the page, which cannot tell "no flights" from a parse miss
+                record_outcome('indigo', origin, destination, flights, budget=self.budget)
+            record_search_outcome('indigo', 'browser', 'ok', self.budget)
             
             return flights
             
         except Exception as e:
+            record_search_outcome('indigo', 'browser', 'error', self.budget)
             print(f"Error during scraping: {e}")
             import traceback
             traceback.print_exc()
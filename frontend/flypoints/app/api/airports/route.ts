@@ -0,0 +1,30 @@
+import { NextResponse } from 'next/server'
+import { AIRLINES, airportIndex } from '@/lib/airports'
+
+// Airport autocomplete with typo tolerance (lib/airports.ts, built once per server process)
+// GET /api/airports?q=banglore&limit=10&airline=spicejet -> { airports: [{ code, name, city, country, airlines }] }
+
+const DEFAULT_LIMIT = 10
+const MAX_LIMIT = 50
+
+export async function GET(request: Request) {
+  const { searchParams } = new URL(request.url)
+  const q = searchParams.get('q') || ''
+  const limit = parseInt(searchParams.get('limit') || String(DEFAULT_LIMIT))
+  const airline = searchParams.get('airline') || undefined
+
+  if (isNaN(limit) || limit < 1 || limit > MAX_LIMIT) {
+    return NextResponse.json({ error: `Invalid limit: use 1-${MAX_LIMIT}` }, { status: 400 })
+  }
+
+  if (airline && !AIRLINES.includes(airline)) {
+    return NextResponse.json({ error: `Invalid airline: ${airline}. Use one of: ${AIRLINES.join(', ')}` }, { status: 400 })
+  }
+
+  try {
+    return NextResponse.json({ airports: airportIndex().search(q.slice(0, 100), limit, airline) })
+  } catch (error: any) {
+    console.error('Error in airports API:', error)
+    return NextResponse.json({ error: 'Failed to search airports', details: error.message }, { status: 500 })
+  }
+}
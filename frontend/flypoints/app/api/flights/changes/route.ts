@@ -0,0 +1,78 @@
+import { NextResponse } from 'next/server'
+import fs from 'fs'
+import path from 'path'
+
+// Tails the fare change feed written by shared/change_feed.py
+// GET /api/flights/changes?offset=0&limit=500 -> { events, nextOffset }
+// Pass nextOffset back as offset to resume where the last read stopped
+
+const DEFAULT_LIMIT = 500
+const MAX_LIMIT = 5000
+const CHUNK_SIZE = 256 * 1024
+
+function feedPath(): string {
+  const dataDir = process.env.FLYPOINTS_DATA_DIR || path.join(process.cwd(), '..', '..', 'data')
+  return path.join(dataDir, 'change_feed', 'feed.ndjson')
+}
+
+// Complete lines from a byte offset (a line still being written is left for the next read)
+function readFeed(offset: number, limit: number): { events: any[]; nextOffset: number } {
+  const events: any[] = []
+  let nextOffset = offset
+
+  let fd: number
+  try {
+    fd = fs.openSync(feedPath(), 'r')
+  } catch {
+    return { events, nextOffset }
+  }
+
+  try {
+    let pending = Buffer.alloc(0)
+    let position = offset
+    const chunk = Buffer.alloc(CHUNK_SIZE)
+
+    while (events.length < limit) {
+      const bytesRead = fs.readSync(fd, chunk, 0, CHUNK_SIZE, position)
+      if (bytesRead === 0) break
+      position += bytesRead
+      pending = Buffer.concat([pending, chunk.subarray(0, bytesRead)])
+
+      let newline
+      while (events.length < limit && (newline = pending.indexOf(0x0a)) !== -1) {
+        const line = pending.subarray(0, newline)
+        pending = pending.subarray(newline + 1)
+        nextOffset += newline + 1
+        try {
+          events.push(JSON.parse(line.toString('utf-8')))
+        } catch {
+          // Skip a corrupt line rather than stalling the consumer
+        }
+      }
+    }
+  } finally {
+    fs.closeSync(fd)
+  }
+
+  return { events, nextOffset }
+}
+
+export async function GET(request: Request) {
+  const { searchParams } = new URL(request.url)
+  const offset = parseInt(searchParams.get('offset') || '0')
+  const limit = parseInt(searchParams.get('limit') || String(DEFAULT_LIMIT))
+
+  if (isNaN(offset) || offset < 0) {
+    return NextResponse.json({ error: 'Invalid offset: use a nextOffset from a previous response' }, { status: 400 })
+  }
+  if (isNaN(limit) || limit < 1 || limit > MAX_LIMIT) {
+    return NextResponse.json({ error: `Invalid limit: use 1-${MAX_LIMIT}` }, { status: 400 })
+  }
+
+  try {
+    return NextResponse.json(readFeed(offset, limit))
+  } catch (error: any) {
+    console.error('Error reading change feed:', error)
+    return NextResponse.json({ error: 'Failed to read change feed', details: error.message }, { status: 500 })
+  }
+}
@@ -0,0 +1,55 @@
+import { NextResponse } from 'next/server'
+import { runPythonModule } from '@/lib/pythonModule'
+
+// Cheapest stored fares for a route in a departure date window (shared/fare_window.py)
+// GET /api/flights/cheapest-days?from=DEL&to=DXB&start=2025-12-10&end=2026-01-05&top=5
+// -> { days: [{ date, airline, price_paise, flight_number, fare_family, captured_at }] }
+
+const DEFAULT_TOP = 5
+const MAX_TOP = 60
+const DATE_PATTERN = /^\d{4}-\d{2}-\d{2}$/
+const AIRPORT_PATTERN = /^[A-Za-z]{3}$/
+
+export async function GET(request: Request) {
+  const { searchParams } = new URL(request.url)
+  const from = searchParams.get('from')
+  const to = searchParams.get('to')
+  const start = searchParams.get('start')
+  const end = searchParams.get('end')
+  const top = parseInt(searchParams.get('top') || String(DEFAULT_TOP))
+
+  if (!from || !to || !start || !end) {
+    return NextResponse.json(
+      { error: 'Missing required parameters: from, to, start, end' },
+      { status: 400 }
+    )
+  }
+
+  if (!AIRPORT_PATTERN.test(from) || !AIRPORT_PATTERN.test(to)) {
+    return NextResponse.json({ error: 'Invalid airport: use 3-letter codes' }, { status: 400 })
+  }
+
+  if (!DATE_PATTERN.test(start) || !DATE_PATTERN.test(end) || end < start) {
+    return NextResponse.json(
+      { error: 'Invalid window: use YYYY-MM-DD with end on or after start' },
+      { status: 400 }
+    )
+  }
+
+  if (isNaN(top) || top < 1 || top > MAX_TOP) {
+    return NextResponse.json({ error: `Invalid top: use 1-${MAX_TOP}` }, { status: 400 })
+  }
+
+  try {
+    const result = await runPythonModule('shared.fare_window', [
+      from.toUpperCase(), to.toUpperCase(), start, end, '--top', String(top),
+    ])
+    return NextResponse.json({ days: result.days || [] })
+  } catch (error: any) {
+    console.error('Error in cheapest-days API:', error)
+    return NextResponse.json(
+      { error: 'Failed to query cheapest days', details: error.message },
+      { status: 500 }
+    )
+  }
+}
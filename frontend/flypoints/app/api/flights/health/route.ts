@@ -0,0 +1,20 @@
+import { NextResponse } from 'next/server'
+import { runPythonModule } from '@/lib/pythonModule'
+
+// Scraper health from the circuit breakers (shared/circuit_breaker.py)
+// GET /api/flights/health -> { breakers: [{ airline, path, state, reason, retry_after, ... }], unavailable: ['etihad'] }
+// unavailable lists the airlines whose live searches are held back (browser breaker open or probing)
+
+export async function GET() {
+  try {
+    const result = await runPythonModule('shared.circuit_breaker', ['status'], 10 * 1000)
+    const breakers: any[] = result.breakers || []
+    const unavailable = breakers
+      .filter((breaker) => breaker.path === 'browser' && breaker.state !== 'closed')
+      .map((breaker) => breaker.airline)
+    return NextResponse.json({ breakers, unavailable })
+  } catch (error: any) {
+    console.error('Error in health API:', error)
+    return NextResponse.json({ error: 'Failed to read scraper health', details: error.message }, { status: 500 })
+  }
+}
@@ -0,0 +1,78 @@
+import { NextResponse } from 'next/server'
+import { runPythonModule } from '@/lib/pythonModule'
+
+// Filtered, sorted, paginated stored search results (shared/result_store.py)
+// GET /api/flights/results?from=DEL&to=BOM&start=2025-12-18&end=2025-12-25&sort=price&maxStops=0&limit=20
+// -> { results, nextCursor } - pass nextCursor back as cursor for the next page
+
+const SORTS = ['price', 'duration', 'departure', 'points']
+const MAX_LIMIT = 500
+const DATE_PATTERN = /^\d{4}-\d{2}-\d{2}$/
+const TIME_PATTERN = /^\d{2}:\d{2}$/
+const AIRPORT_PATTERN = /^[A-Za-z]{3}$/
+
+// Query parameter -> [CLI flag, validation pattern]
+const FILTERS: Record<string, [string, RegExp]> = {
+  start: ['--from', DATE_PATTERN],
+  end: ['--to', DATE_PATTERN],
+  departAfter: ['--depart-after', TIME_PATTERN],
+  departBefore: ['--depart-before', TIME_PATTERN],
+  maxPrice: ['--max-price', /^\d+(\.\d+)?$/],
+  maxDuration: ['--max-duration', /^\d+$/],
+  maxStops: ['--max-stops', /^\d+$/],
+  fareFamily: ['--fare-family', /^[a-z]+$/i],
+  minPoints: ['--min-points', /^\d+$/],
+  limit: ['--limit', /^\d+$/],
+  cursor: ['--cursor', /^[A-Za-z0-9_-]+$/],
+}
+
+export async function GET(request: Request) {
+  const { searchParams } = new URL(request.url)
+  const from = searchParams.get('from')
+  const to = searchParams.get('to')
+  const sort = searchParams.get('sort') || 'price'
+
+  if (!from || !to || !AIRPORT_PATTERN.test(from) || !AIRPORT_PATTERN.test(to)) {
+    return NextResponse.json({ error: 'Missing or invalid from/to: use 3-letter codes' }, { status: 400 })
+  }
+
+  if (!SORTS.includes(sort)) {
+    return NextResponse.json({ error: `Invalid sort: ${sort}. Use one of: ${SORTS.join(', ')}` }, { status: 400 })
+  }
+
+  const args = [from.toUpperCase(), to.toUpperCase(), '--sort', sort]
+  if (searchParams.get('order') === 'desc') {
+    args.push('--desc')
+  }
+
+  for (const [param, [flag, pattern]] of Object.entries(FILTERS)) {
+    const value = searchParams.get(param)
+    if (value === null) continue
+    if (!pattern.test(value)) {
+      return NextResponse.json({ error: `Invalid ${param}: ${value}` }, { status: 400 })
+    }
+    args.push(flag, value)
+  }
+
+  const limit = searchParams.get('limit')
+  if (limit && (parseInt(limit) < 1 || parseInt(limit) > MAX_LIMIT)) {
+    return NextResponse.json({ error: `Invalid limit: use 1-${MAX_LIMIT}` }, { status: 400 })
+  }
+
+  for (const airline of searchParams.getAll('airline')) {
+    if (!['spicejet', 'indigo', 'etihad'].includes(airline)) {
+      return NextResponse.json({ error: `Invalid airline: ${airline}` }, { status: 400 })
+    }
+    args.push('--airline', airline)
+  }
+
+  try {
+    const result = await runPythonModule('shared.result_store', args)
+    return NextResponse.json({ results: result.results || [], nextCursor: result.nextCursor ?? null })
+  } catch (error: any) {
+    // A cursor issued for a different sort order is the caller's mistake
+    const status = /cursor/i.test(error.message) ? 400 : 500
+    console.error('Error in results API:', error)
+    return NextResponse.json({ error: 'Failed to query stored results', details: error.message }, { status })
+  }
+}
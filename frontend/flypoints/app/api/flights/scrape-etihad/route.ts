@@ -1,102 +1,30 @@
 import { NextResponse } from 'next/server'
 import { spawn } from 'child_process'
 import path from 'path'
+import { type FlightData, type FlightRecord, recordsToFlightData, compareByPrice } from '@/lib/flightRecord'
+import { searchGate } from '@/lib/searchGate'
+import { recordSearch } from '@/lib/popularity'
 
-export interface FlightData {
-  airline: string
-  flightNumber: string
-  departureTime: string
-  arrivalTime: string
-  duration: string
-  cashPrice: string
-  pointsPrice: string
-}
-
-// Helper function to clean price string (handles both ₹ and \u20b9)
-function cleanPrice(priceStr: string): string {
-  if (!priceStr || priceStr === 'N/A') return 'N/A'
-  // Remove ₹ symbol (both Unicode and escaped), commas, and whitespace
-  return priceStr.replace(/[₹\u20b9,\s]/g, '')
-}
-
-// Format number with Indian number system (commas every 2 digits after first 3)
-function formatIndianNumber(num: number | string): string {
-  const numStr = typeof num === 'string' ? num.replace(/[^\d]/g, '') : num.toString()
-  if (!numStr || numStr === '0') return '0'
-  
-  const numValue = parseInt(numStr)
-  if (isNaN(numValue)) return numStr
-  
-  const str = numValue.toString()
-  const len = str.length
-  
-  if (len <= 3) {
-    return str
-  }
-  
-  let result = str.slice(-3)
-  let remaining = str.slice(0, -3)
-  
-  while (remaining.length > 0) {
-    if (remaining.length >= 2) {
-      result = remaining.slice(-2) + ',' + result
-      remaining = remaining.slice(0, -2)
-    } else {
-      result = remaining + ',' + result
-      remaining = ''
-    }
-  }
-  
-  return result
-}
-
-// Convert Python scraper output to frontend format
-function convertToFrontendFormat(pythonFlights: any[]): FlightData[] {
-  return pythonFlights
-    .map((flight) => {
-      let cashPrice = 'N/A'
-      let priceValue = 0
-      
-      // Etihad uses 'price' field
-      if (flight.price && flight.price !== 'N/A') {
-        const cleaned = cleanPrice(flight.price)
-        if (cleaned !== 'N/A') {
-          priceValue = parseInt(cleaned) || 0
-          cashPrice = priceValue > 0 ? `₹${formatIndianNumber(cleaned)}` : 'N/A'
-        }
-      }
-
-      // Filter out flights with no price or 0 price
-      if (cashPrice === 'N/A' || priceValue === 0) {
-        return null
-      }
-
-      const pointsPrice = flight.award_points && flight.award_points !== 'N/A'
-        ? `${formatIndianNumber(flight.award_points)} points`
-        : 'N/A'
-
-      return {
-        airline: flight.airline || 'Etihad Airways',
-        flightNumber: flight.flight_number || 'N/A',
-        departureTime: flight.departure_time || 'N/A',
-        arrivalTime: flight.arrival_time || 'N/A',
-        duration: flight.duration || 'N/A',
-        cashPrice,
-        pointsPrice,
-      }
-    })
-    .filter((flight): flight is FlightData => flight !== null) // Remove null entries
-}
+// Search profiles understood by the Python scrapers (see shared/search_budget.py)
+const SEARCH_PROFILES = ['fast', 'balanced', 'thorough']
 
 // Run Python scraper with timeout
-function runScraper(origin: string, destination: string, date: string): Promise<any[]> {
+function runScraper(origin: string, destination: string, date: string, profile?: string, returnDate?: string): Promise<FlightRecord[]> {
   return new Promise((resolve, reject) => {
     // Use the API wrapper script that outputs JSON
     // Path from frontend/flypoints/app/api/flights/scrape-etihad/route.ts to attempt1etihad/etihad_scraper_api.py
     const scraperPath = path.join(process.cwd(), '..', '..', 'attempt1etihad', 'etihad_scraper_api.py')
     const pythonCommand = process.platform === 'win32' ? 'python' : 'python3'
     
-    const pythonProcess = spawn(pythonCommand, [scraperPath, origin, destination, date], {
+    const args = [scraperPath, origin, destination, date]
+    if (profile) {
+      args.push('--profile', profile)
+    }
+    if (returnDate) {
+      args.push('--return', returnDate)
+    }
+
+    const pythonProcess = spawn(pythonCommand, args, {
       cwd: path.dirname(scraperPath),
       stdio: ['pipe', 'pipe', 'pipe'],
     })
@@ -229,6 +157,8 @@ export async function GET(request: Request) {
     const from = searchParams.get('from')
     const to = searchParams.get('to')
     const date = searchParams.get('date')
+    const profile = searchParams.get('profile') || undefined // fast | balanced | thorough
+    const returnDate = searchParams.get('returnDate') || undefined // YYYY-MM-DD, round trip when set
 
     if (!from || !to || !date) {
       return NextResponse.json(
@@ -237,6 +167,21 @@ export async function GET(request: Request) {
       )
     }
 
+    if (profile && !SEARCH_PROFILES.includes(profile)) {
+      return NextResponse.json(
+        { error: `Invalid profile: ${profile}. Use one of: ${SEARCH_PROFILES.join(', ')}` },
+        { status: 400 }
+      )
+    }
+
+    if (returnDate && (!/^\d{4}-\d{2}-\d{2}$/.test(returnDate) || returnDate < date)) {
+      return NextResponse.json(
+        { error: `Invalid returnDate: ${returnDate}. Use YYYY-MM-DD on or after date` },
+        { status: 400 }
+      )
+    }
+    const formattedReturnDate = returnDate ? returnDate.split('-').reverse().join('-') : undefined // DD-MM-YYYY
+
     // Format date as DD-MM-YYYY for the scraper (frontend sends YYYY-MM-DD)
     const dateParts = date.split('-')
     const formattedDate = dateParts.length === 3 
@@ -245,32 +190,49 @@ export async function GET(request: Request) {
 
     let scrapedFlights: FlightData[] = []
 
-    try {
-      console.log(`Starting Etihad scrape for ${from} -> ${to} on ${formattedDate}`)
-      const pythonFlights = await runScraper(from, to, formattedDate)
+    recordSearch('etihad', from, to, date)
+
+    // Popular one-way searches are kept fresh in the result store by the background crawler;
+    // skip airline/route pairs the serviceability index knows return nothing (?force=1 for a live scrape).
+    // While the airline's circuit breaker is open, answer at once with its last good stored result
+    // instead of a scrape that keeps failing
+    const force = searchParams.get('force') === '1'
+    const { hot, skipped, breaker, stored } = await searchGate('etihad', from, to, date, force, !returnDate)
+    if (hot) {
+      scrapedFlights = recordsToFlightData(hot.flights, 'Etihad Airways')
+      console.log(`Serving ${scrapedFlights.length} stored Etihad flights for ${from} -> ${to} from ${hot.capturedAt}`)
+    } else if (skipped) {
+      console.log(`Skipping Etihad scrape for ${from} -> ${to}: ${skipped}`)
+    } else if (breaker) {
+      if (stored) scrapedFlights = recordsToFlightData(stored.flights, 'Etihad Airways')
+      console.log(`Etihad circuit breaker open (${breaker.reason}): serving ${scrapedFlights.length} stored flights for ${from} -> ${to}`)
+    } else {
+      try {
+        console.log(`Starting Etihad scrape for ${from} -> ${to} on ${formattedDate}`)
+        const pythonFlights = await runScraper(from, to, formattedDate, profile, formattedReturnDate)
       
-      if (pythonFlights && pythonFlights.length > 0) {
-        scrapedFlights = convertToFrontendFormat(pythonFlights)
-        console.log(`Successfully scraped ${scrapedFlights.length} Etihad flights`)
-      } else {
-        console.log('No flights returned from Etihad scraper')
+        if (pythonFlights && pythonFlights.length > 0) {
+          scrapedFlights = recordsToFlightData(pythonFlights, 'Etihad Airways')
+          console.log(`Successfully scraped ${scrapedFlights.length} Etihad flights`)
+        } else {
+          console.log('No flights returned from Etihad scraper')
+        }
+      } catch (error: any) {
+        console.error('Etihad scraping failed:', error.message)
+        // Return empty array on error - frontend will handle it
       }
-    } catch (error: any) {
-      console.error('Etihad scraping failed:', error.message)
-      // Return empty array on error - frontend will handle it
     }
 
     // Sort flights by price (low to high)
     const sortFlights = (flights: FlightData[]) => {
-      return [...flights].sort((a, b) => {
-        const priceA = parseInt(cleanPrice(a.cashPrice)) || Infinity
-        const priceB = parseInt(cleanPrice(b.cashPrice)) || Infinity
-        return priceA - priceB
-      })
+      return [...flights].sort(compareByPrice)
     }
 
     return NextResponse.json({ 
-      scrapedFlights: sortFlights(scrapedFlights)
+      scrapedFlights: sortFlights(scrapedFlights),
+      skipped,
+      breaker,
+      storedAt: (hot || stored)?.capturedAt ?? null
     })
   } catch (error: any) {
     console.error('Error in Etihad scrape API:', error)
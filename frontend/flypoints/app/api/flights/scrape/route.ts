@@ -2,6 +2,9 @@ import { NextResponse } from 'next/server'
 import { spawn } from 'child_process'
 import path from 'path'
 import fs from 'fs'
+import { type FlightData, type FlightRecord, recordsToFlightData, compareByPrice } from '@/lib/flightRecord'
+import { searchGate } from '@/lib/searchGate'
+import { recordSearch } from '@/lib/popularity'
 
 // Import HTML parsing functions from the existing route
 function parseIndigoFlights(htmlContent: string): FlightData[] {
@@ -93,138 +96,12 @@ function getHTMLSnapshotData(from: string, to: string): FlightData[] {
   return []
 }
 
-export interface FlightData {
-  airline: string
-  flightNumber: string
-  departureTime: string
-  arrivalTime: string
-  duration: string
-  cashPrice: string
-  pointsPrice: string
-  spicesaverPrice?: string
-  spiceflexPrice?: string
-  spicemaxPrice?: string
-  spicesaverPoints?: string
-  spiceflexPoints?: string
-  spicemaxPoints?: string
-}
-
-
-// Helper function to clean price string (handles both ₹ and \u20b9)
-function cleanPrice(priceStr: string): string {
-  if (!priceStr || priceStr === 'N/A') return 'N/A'
-  // Remove ₹ symbol (both Unicode and escaped), commas, and whitespace
-  return priceStr.replace(/[₹\u20b9,\s]/g, '')
-}
-
-// Format number with Indian number system (commas every 2 digits after first 3)
-function formatIndianNumber(num: number | string): string {
-  const numStr = typeof num === 'string' ? num.replace(/[^\d]/g, '') : num.toString()
-  if (!numStr || numStr === '0') return '0'
-  
-  const numValue = parseInt(numStr)
-  if (isNaN(numValue)) return numStr
-  
-  // Indian numbering: first comma after 3 digits from right, then every 2 digits
-  // Examples: 
-  // 8338 → 8,338
-  // 123456 → 1,23,456
-  // 1234567 → 12,34,567
-  // 12345678 → 1,23,45,678
-  
-  const str = numValue.toString()
-  const len = str.length
-  
-  if (len <= 3) {
-    return str
-  }
-  
-  // First 3 digits from right (no comma before them)
-  let result = str.slice(-3)
-  let remaining = str.slice(0, -3)
-  
-  // Then add commas every 2 digits
-  while (remaining.length > 0) {
-    if (remaining.length >= 2) {
-      result = remaining.slice(-2) + ',' + result
-      remaining = remaining.slice(0, -2)
-    } else {
-      result = remaining + ',' + result
-      remaining = ''
-    }
-  }
-  
-  return result
-}
 
-// Convert Python scraper output to frontend format
-function convertToFrontendFormat(pythonFlights: any[]): FlightData[] {
-  return pythonFlights
-    .map((flight) => {
-      // Use SpiceSaver price as default cash price, or fallback to price_inr
-      // JSON.parse will decode \u20b9 to ₹ automatically
-      let cashPrice = 'N/A'
-      let priceValue = 0
-      
-      if (flight.spicesaver_price && flight.spicesaver_price !== 'N/A') {
-        const cleaned = cleanPrice(flight.spicesaver_price)
-        if (cleaned !== 'N/A') {
-          priceValue = parseInt(cleaned) || 0
-          cashPrice = priceValue > 0 ? `₹${formatIndianNumber(cleaned)}` : 'N/A'
-        }
-      } else if (flight.price_inr && flight.price_inr !== 'N/A') {
-        const cleaned = cleanPrice(flight.price_inr)
-        if (cleaned !== 'N/A') {
-          priceValue = parseInt(cleaned) || 0
-          cashPrice = priceValue > 0 ? `₹${formatIndianNumber(cleaned)}` : 'N/A'
-        }
-      }
-
-      // Filter out flights with no price or 0 price
-      if (cashPrice === 'N/A' || priceValue === 0) {
-        return null
-      }
-
-      // Format points
-      const pointsPrice = flight.spicesaver_points && flight.spicesaver_points !== 'N/A'
-        ? `${formatIndianNumber(flight.spicesaver_points)} points`
-        : flight.award_points && flight.award_points !== 'N/A'
-        ? `${formatIndianNumber(flight.award_points)} points`
-        : 'N/A'
-
-      return {
-        airline: flight.airline || 'SpiceJet',
-        flightNumber: flight.flight_number || 'N/A',
-        departureTime: flight.departure_time || 'N/A',
-        arrivalTime: flight.arrival_time || 'N/A',
-        duration: flight.duration || 'N/A',
-        cashPrice,
-        pointsPrice,
-        spicesaverPrice: flight.spicesaver_price && flight.spicesaver_price !== 'N/A' 
-          ? `₹${formatIndianNumber(cleanPrice(flight.spicesaver_price))}` 
-          : undefined,
-        spiceflexPrice: flight.spiceflex_price && flight.spiceflex_price !== 'N/A' 
-          ? `₹${formatIndianNumber(cleanPrice(flight.spiceflex_price))}` 
-          : undefined,
-        spicemaxPrice: flight.spicemax_price && flight.spicemax_price !== 'N/A' 
-          ? `₹${formatIndianNumber(cleanPrice(flight.spicemax_price))}` 
-          : undefined,
-        spicesaverPoints: flight.spicesaver_points && flight.spicesaver_points !== 'N/A' 
-          ? formatIndianNumber(flight.spicesaver_points)
-          : undefined,
-        spiceflexPoints: flight.spiceflex_points && flight.spiceflex_points !== 'N/A' 
-          ? formatIndianNumber(flight.spiceflex_points)
-          : undefined,
-        spicemaxPoints: flight.spicemax_points && flight.spicemax_points !== 'N/A' 
-          ? formatIndianNumber(flight.spicemax_points)
-          : undefined,
-      }
-    })
-    .filter((flight): flight is FlightData => flight !== null) // Remove null entries (flights with 0 price)
-}
+// Search profiles understood by the Python scrapers (see shared/search_budget.py)
+const SEARCH_PROFILES = ['fast', 'balanced', 'thorough']
 
 // Run Python scraper with timeout
-function runScraper(origin: string, destination: string, date: string): Promise<any[]> {
+function runScraper(origin: string, destination: string, date: string, profile?: string, returnDate?: string, passengers?: string): Promise<FlightRecord[]> {
   return new Promise((resolve, reject) => {
     // Use the API wrapper script that outputs JSON
     // Path from frontend/flypoints/app/api/flights/scrape/route.ts to attempt1/spicejet_scraper_api.py
@@ -232,7 +109,18 @@ function runScraper(origin: string, destination: string, date: string): Promise<
     const scraperPath = path.join(process.cwd(), '..', '..', 'attempt1', 'spicejet_scraper_api.py')
     const pythonCommand = process.platform === 'win32' ? 'python' : 'python3'
     
-    const pythonProcess = spawn(pythonCommand, [scraperPath, origin, destination, date], {
+    const args = [scraperPath, origin, destination, date]
+    if (profile) {
+      args.push('--profile', profile)
+    }
+    if (returnDate) {
+      args.push('--return', returnDate)
+    }
+    if (passengers) {
+      args.push('--passengers', passengers)
+    }
+
+    const pythonProcess = spawn(pythonCommand, args, {
       cwd: path.dirname(scraperPath),
       stdio: ['pipe', 'pipe', 'pipe'],
     })
@@ -378,6 +266,9 @@ export async function GET(request: Request) {
     const from = searchParams.get('from')
     const to = searchParams.get('to')
     const date = searchParams.get('date') // Format: YYYY-MM-DD
+    const profile = searchParams.get('profile') || undefined // fast | balanced | thorough
+    const returnDate = searchParams.get('returnDate') || undefined // YYYY-MM-DD, round trip when set
+    const passengers = searchParams.get('passengers') || undefined // 'all' or adult=2,child=1,infant=0
 
     if (!from || !to || !date) {
       return NextResponse.json(
@@ -386,6 +277,28 @@ export async function GET(request: Request) {
       )
     }
 
+    if (profile && !SEARCH_PROFILES.includes(profile)) {
+      return NextResponse.json(
+        { error: `Invalid profile: ${profile}. Use one of: ${SEARCH_PROFILES.join(', ')}` },
+        { status: 400 }
+      )
+    }
+
+    if (returnDate && (!/^\d{4}-\d{2}-\d{2}$/.test(returnDate) || returnDate < date)) {
+      return NextResponse.json(
+        { error: `Invalid returnDate: ${returnDate}. Use YYYY-MM-DD on or after date` },
+        { status: 400 }
+      )
+    }
+    const formattedReturnDate = returnDate ? returnDate.split('-').reverse().join('-') : undefined // DD-MM-YYYY
+
+    if (passengers && !/^(all|[a-zA-Z]+=\d+(,[a-zA-Z]+=\d+)*)$/.test(passengers)) {
+      return NextResponse.json(
+        { error: `Invalid passengers: ${passengers}. Use 'all' or e.g. adult=2,child=1` },
+        { status: 400 }
+      )
+    }
+
     // Convert date format if needed (frontend sends YYYY-MM-DD, scraper expects DD-MM-YYYY)
     const dateParts = date.split('-')
     const formattedDate = `${dateParts[2]}-${dateParts[1]}-${dateParts[0]}` // DD-MM-YYYY
@@ -396,37 +309,52 @@ export async function GET(request: Request) {
     // Always get fallback data (if available)
     fallbackFlights = getHTMLSnapshotData(from, to)
 
-    try {
-      // Try to scrape with 5 minute timeout
-      console.log(`Starting scrape for ${from} -> ${to} on ${formattedDate}`)
-      const pythonFlights = await runScraper(from, to, formattedDate)
+    recordSearch('spicejet', from, to, date)
+
+    // Popular one-way searches are kept fresh in the result store by the background crawler;
+    // skip airline/route pairs the serviceability index knows return nothing (?force=1 for a live scrape).
+    // While the airline's circuit breaker is open, answer at once with its last good stored result
+    // instead of a scrape that keeps failing
+    const force = searchParams.get('force') === '1'
+    const { hot, skipped, breaker, stored } = await searchGate('spicejet', from, to, date, force, !returnDate && !passengers)
+    if (hot) {
+      scrapedFlights = recordsToFlightData(hot.flights, 'SpiceJet')
+      console.log(`Serving ${scrapedFlights.length} stored SpiceJet flights for ${from} -> ${to} from ${hot.capturedAt}`)
+    } else if (skipped) {
+      console.log(`Skipping SpiceJet scrape for ${from} -> ${to}: ${skipped}`)
+    } else if (breaker) {
+      if (stored) scrapedFlights = recordsToFlightData(stored.flights, 'SpiceJet')
+      console.log(`SpiceJet circuit breaker open (${breaker.reason}): serving ${scrapedFlights.length} stored flights for ${from} -> ${to}`)
+    } else {
+      try {
+        // Try to scrape with 5 minute timeout
+        console.log(`Starting scrape for ${from} -> ${to} on ${formattedDate}`)
+        const pythonFlights = await runScraper(from, to, formattedDate, profile, formattedReturnDate, passengers)
       
-      if (pythonFlights && pythonFlights.length > 0) {
-        scrapedFlights = convertToFrontendFormat(pythonFlights)
-        console.log(`Successfully scraped ${scrapedFlights.length} flights`)
-      } else {
-        console.log('No flights returned from scraper')
+        if (pythonFlights && pythonFlights.length > 0) {
+          scrapedFlights = recordsToFlightData(pythonFlights, 'SpiceJet')
+          console.log(`Successfully scraped ${scrapedFlights.length} flights`)
+        } else {
+          console.log('No flights returned from scraper')
+        }
+      } catch (error: any) {
+        console.error('Scraping failed:', error.message)
+        // Scraping failed, but we'll still return fallback if available
       }
-    } catch (error: any) {
-      console.error('Scraping failed:', error.message)
-      // Scraping failed, but we'll still return fallback if available
     }
 
     // Sort both by price (low to high)
-    const sortByPrice = (a: FlightData, b: FlightData) => {
-      const priceA = parseInt(a.cashPrice.replace(/[₹,\s]/g, '')) || 999999999
-      const priceB = parseInt(b.cashPrice.replace(/[₹,\s]/g, '')) || 999999999
-      return priceA - priceB
-    }
-
-    scrapedFlights.sort(sortByPrice)
-    fallbackFlights.sort(sortByPrice)
+    scrapedFlights.sort(compareByPrice)
+    fallbackFlights.sort(compareByPrice)
 
     return NextResponse.json({ 
       scrapedFlights,
       fallbackFlights,
       hasScrapedData: scrapedFlights.length > 0,
-      hasFallbackData: fallbackFlights.length > 0
+      hasFallbackData: fallbackFlights.length > 0,
+      skipped,
+      breaker,
+      storedAt: (hot || stored)?.capturedAt ?? null
     })
   } catch (error: any) {
     console.error('Error in scrape API:', error)
@@ -0,0 +1,42 @@
+import { NextResponse } from 'next/server'
+import { popularityTracker } from '@/lib/popularity'
+
+// Search popularity (lib/popularity.ts): decayed search counts, halving every 3 days
+// GET /api/popularity?top=20 -> { top: [{ scraper, from, to, date, score }] }
+// GET /api/popularity?scraper=etihad&from=DEL&to=AUH&date=2025-12-18 -> { score }
+
+const DEFAULT_TOP = 20
+const MAX_TOP = 100
+const SCRAPERS = ['spicejet', 'spicejet-international', 'etihad']
+
+export async function GET(request: Request) {
+  const { searchParams } = new URL(request.url)
+  const scraper = searchParams.get('scraper')
+  const from = searchParams.get('from')
+  const to = searchParams.get('to')
+  const date = searchParams.get('date')
+
+  try {
+    if (scraper || from || to || date) {
+      if (!scraper || !SCRAPERS.includes(scraper)) {
+        return NextResponse.json({ error: `Invalid scraper: use one of ${SCRAPERS.join(', ')}` }, { status: 400 })
+      }
+      if (!from || !to || !/^[A-Za-z]{3}$/.test(from) || !/^[A-Za-z]{3}$/.test(to)) {
+        return NextResponse.json({ error: 'Missing or invalid from/to: use 3-letter codes' }, { status: 400 })
+      }
+      if (!date || !/^\d{4}-\d{2}-\d{2}$/.test(date)) {
+        return NextResponse.json({ error: 'Missing or invalid date: use YYYY-MM-DD' }, { status: 400 })
+      }
+      return NextResponse.json({ score: popularityTracker().score(scraper, from, to, date) })
+    }
+
+    const top = parseInt(searchParams.get('top') || String(DEFAULT_TOP))
+    if (isNaN(top) || top < 1 || top > MAX_TOP) {
+      return NextResponse.json({ error: `Invalid top: use 1-${MAX_TOP}` }, { status: 400 })
+    }
+    return NextResponse.json({ top: popularityTracker().top(top) })
+  } catch (error: any) {
+    console.error('Error in popularity API:', error)
+    return NextResponse.json({ error: 'Failed to read search popularity', details: error.message }, { status: 500 })
+  }
+}
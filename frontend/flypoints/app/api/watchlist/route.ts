@@ -0,0 +1,84 @@
+import { NextResponse } from 'next/server'
+import { runPythonModule } from '@/lib/pythonModule'
+
+// Price watches (shared/watchlist.py) - `python -m shared.watchlist run` scrapes and alerts
+// GET    /api/watchlist?owner=me@example.com -> { watches: [{ id, ..., alerts: [...] }] }
+// POST   /api/watchlist { owner, scraper, from, to, start, end, maxPrice?, minPoints? } -> { id }
+// DELETE /api/watchlist?id=3&owner=me@example.com
+
+const SCRAPERS = ['spicejet', 'spicejet-international', 'etihad']
+const DATE_PATTERN = /^\d{4}-\d{2}-\d{2}$/
+const AIRPORT_PATTERN = /^[A-Za-z]{3}$/
+
+export async function GET(request: Request) {
+  const { searchParams } = new URL(request.url)
+  const owner = searchParams.get('owner')
+  if (!owner) {
+    return NextResponse.json({ error: 'Missing required parameter: owner' }, { status: 400 })
+  }
+
+  try {
+    const result = await runPythonModule('shared.watchlist', ['list', '--owner', owner])
+    return NextResponse.json({ watches: result.watches || [] })
+  } catch (error: any) {
+    console.error('Error in watchlist API:', error)
+    return NextResponse.json({ error: 'Failed to list watches', details: error.message }, { status: 500 })
+  }
+}
+
+export async function POST(request: Request) {
+  let body: any
+  try {
+    body = await request.json()
+  } catch {
+    return NextResponse.json({ error: 'Invalid JSON body' }, { status: 400 })
+  }
+  const { owner, scraper, from, to, start, end, maxPrice, minPoints } = body || {}
+
+  if (!owner || typeof owner !== 'string') {
+    return NextResponse.json({ error: 'Missing required field: owner' }, { status: 400 })
+  }
+  if (!SCRAPERS.includes(scraper)) {
+    return NextResponse.json({ error: `Invalid scraper: use one of ${SCRAPERS.join(', ')}` }, { status: 400 })
+  }
+  if (!AIRPORT_PATTERN.test(from || '') || !AIRPORT_PATTERN.test(to || '')) {
+    return NextResponse.json({ error: 'Missing or invalid from/to: use 3-letter codes' }, { status: 400 })
+  }
+  if (!DATE_PATTERN.test(start || '') || !DATE_PATTERN.test(end || '')) {
+    return NextResponse.json({ error: 'Missing or invalid start/end: use YYYY-MM-DD' }, { status: 400 })
+  }
+  if ((maxPrice != null && !(Number(maxPrice) > 0)) || (minPoints != null && !Number.isInteger(minPoints))) {
+    return NextResponse.json({ error: 'Invalid maxPrice/minPoints' }, { status: 400 })
+  }
+
+  const args = ['add', owner, scraper, from.toUpperCase(), to.toUpperCase(), start, end]
+  if (maxPrice != null) args.push('--max-price', String(maxPrice))
+  if (minPoints != null) args.push('--min-points', String(minPoints))
+
+  try {
+    const result = await runPythonModule('shared.watchlist', args)
+    return NextResponse.json({ id: result.id })
+  } catch (error: any) {
+    // Validation errors from the watchlist (no threshold, dates in the past, range too long)
+    console.error('Error in watchlist API:', error)
+    return NextResponse.json({ error: error.message }, { status: 400 })
+  }
+}
+
+export async function DELETE(request: Request) {
+  const { searchParams } = new URL(request.url)
+  const id = searchParams.get('id')
+  const owner = searchParams.get('owner')
+  if (!id || !/^\d+$/.test(id) || !owner) {
+    return NextResponse.json({ error: 'Missing or invalid parameters: id, owner' }, { status: 400 })
+  }
+
+  try {
+    await runPythonModule('shared.watchlist', ['remove', id, '--owner', owner])
+    return NextResponse.json({ success: true })
+  } catch (error: any) {
+    const status = /no watch/.test(error.message) ? 404 : 500
+    console.error('Error in watchlist API:', error)
+    return NextResponse.json({ error: error.message }, { status })
+  }
+}
@@ -11,6 +11,7 @@ import { Calendar } from "@/components/ui/calendar"
 import { Popover, PopoverContent, PopoverTrigger } from "@/components/ui/popover"
 import { Command, CommandEmpty, CommandGroup, CommandInput, CommandItem, CommandList } from "@/components/ui/command"
 import { cn } from "@/lib/utils"
+import { type PassengerCounts, SINGLE_ADULT, isSingleAdult, priceForPassengers } from "@/lib/fareCalculator"
 
 // Top 7 busiest airports in India
 const domesticAirports = [
@@ -63,6 +64,13 @@ interface Airport {
   name: string
 }
 
+// Airlines searched per flight type, for the live data banner (keys match /api/flights/health)
+const AIRLINE_NAMES: Record<string, string> = { spicejet: "SpiceJet", etihad: "Etihad" }
+const SEARCHED_AIRLINES: Record<string, string[]> = {
+  domestic: ["spicejet"],
+  international: ["spicejet", "etihad"],
+}
+
 export default function Home() {
   const [flightType, setFlightType] = useState<string>("domestic")
   const [from, setFrom] = useState<Airport | null>(null)
@@ -84,6 +92,27 @@ export default function Home() {
   const [airlineFilter, setAirlineFilter] = useState<'all' | 'spicejet' | 'etihad'>('all')
   const [loadingProgress, setLoadingProgress] = useState(0)
   const [currentFunFact, setCurrentFunFact] = useState(0)
+  const [passengers, setPassengers] = useState<PassengerCounts>(SINGLE_ADULT)
+  // Whether the current results were searched with every passenger type priced (passengers=all)
+  const [passengerTypesPriced, setPassengerTypesPriced] = useState(false)
+  const [unavailableAirlines, setUnavailableAirlines] = useState<string[]>([])
+
+  // Airlines whose circuit breaker is holding live searches back (results come from stored data)
+  const refreshHealth = async () => {
+    try {
+      const response = await fetch('/api/flights/health')
+      if (response.ok) {
+        const health = await response.json()
+        setUnavailableAirlines(health.unavailable || [])
+      }
+    } catch (error) {
+      console.error('Error fetching scraper health:', error)
+    }
+  }
+
+  useEffect(() => {
+    refreshHealth()
+  }, [])
 
   // Fun facts about flights and travel
   const funFacts = [
@@ -214,6 +243,10 @@ export default function Home() {
     setShowAllFallback(false)
     setHasSearched(false) // Reset search status 
 
+    // Multi-passenger searches capture every passenger type once; later count changes are priced locally
+    const passengerParam = isSingleAdult(passengers) ? '' : '&passengers=all'
+    setPassengerTypesPriced(passengerParam !== '')
+
     try {
       // For domestic flights
       if (flightType === 'domestic') {
@@ -221,7 +254,7 @@ export default function Home() {
         const formattedDate = format(date, 'yyyy-MM-dd')
         
         try {
-          const response = await fetch(`/api/flights/scrape?from=${from.code}&to=${to.code}&date=${formattedDate}`)
+          const response = await fetch(`/api/flights/scrape?from=${from.code}&to=${to.code}&date=${formattedDate}${passengerParam}`)
           const data = await response.json()
           
           // Logic: scrapedFlights + fallbackFlights (both if available)
@@ -255,7 +288,7 @@ export default function Home() {
         if (advancedSearch) {
           // Advanced Search ON: Etihad + SpiceJet + HTML Snapshot
           const [spicejetResponse, etihadResponse] = await Promise.allSettled([
-            fetch(`/api/flights/scrape-international?from=${from.code}&to=${to.code}&date=${formattedDate}`),
+            fetch(`/api/flights/scrape-international?from=${from.code}&to=${to.code}&date=${formattedDate}${passengerParam}`),
             fetch(`/api/flights/scrape-etihad?from=${from.code}&to=${to.code}&date=${formattedDate}`)
           ])
           
@@ -310,7 +343,7 @@ export default function Home() {
         } else {
           // Advanced Search OFF: SpiceJet + HTML Snapshot only
           try {
-            const spicejetResponse = await fetch(`/api/flights/scrape-international?from=${from.code}&to=${to.code}&date=${formattedDate}`)
+            const spicejetResponse = await fetch(`/api/flights/scrape-international?from=${from.code}&to=${to.code}&date=${formattedDate}${passengerParam}`)
             const spicejetData = await spicejetResponse.json()
             
             const scraped = spicejetData.scrapedFlights || []
@@ -343,6 +376,7 @@ export default function Home() {
       console.error('Error fetching flights:', error)
       alert('Oops! Something went wrong while searching for flights. Please try again.')
     } finally {
+      refreshHealth()
       // Complete the progress bar
       setLoadingProgress(100)
       // Wait a moment to show 100%, then hide loading
@@ -353,12 +387,35 @@ export default function Home() {
     }
   }
 
-  // Helper function to extract price number for sorting
+  // Results searched for one adult carry no per-passenger fares: the first change to a group
+  // re-searches once with every passenger type priced, and later changes are priced locally
+  useEffect(() => {
+    if (hasSearched && !loading && !passengerTypesPriced && !isSingleAdult(passengers)) {
+      handleSearch()
+    }
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [passengers])
+
+  // Scraped flights carry numeric price/durationMinutes; these parse the display strings of
+  // HTML snapshot flights, which only have those
   const getPriceValue = (price: string): number => {
     return parseInt(price.replace(/[₹,\s]/g, '')) || 999999999
   }
 
-  // Helper function to extract duration in minutes for sorting
+  // Cash price (₹) for the selected passengers, computed from the flight's captured per-passenger
+  // fares - null when the flight cannot be priced for the group
+  const groupCashPrice = (flight: any): number | null => {
+    if (isSingleAdult(passengers)) return flight.price ?? getPriceValue(flight.cashPrice)
+    return priceForPassengers(flight.fareComponents, passengers)
+  }
+
+  // A one-adult fare is never shown as a group's price
+  const displayCashPrice = (flight: any): string => {
+    if (isSingleAdult(passengers)) return flight.cashPrice
+    const total = groupCashPrice(flight)
+    return total !== null ? `₹${total.toLocaleString('en-IN')}` : 'Not priced for this group'
+  }
+
   const getDurationMinutes = (duration: string): number => {
     const match = duration.match(/(\d+)h\s*(\d+)?m?/i)
     if (match) {
@@ -374,10 +431,11 @@ export default function Home() {
     const sorted = [...flightsToSort]
     switch (sortBy) {
       case 'price':
-        sorted.sort((a, b) => getPriceValue(a.cashPrice) - getPriceValue(b.cashPrice))
+        // The price shown for the selected passengers; flights that cannot be priced go last
+        sorted.sort((a, b) => (groupCashPrice(a) ?? Infinity) - (groupCashPrice(b) ?? Infinity))
         break
       case 'duration':
-        sorted.sort((a, b) => getDurationMinutes(a.duration) - getDurationMinutes(b.duration))
+        sorted.sort((a, b) => (a.durationMinutes ?? getDurationMinutes(a.duration)) - (b.durationMinutes ?? getDurationMinutes(b.duration)))
         break
       case 'departure':
         sorted.sort((a, b) => a.departureTime.localeCompare(b.departureTime))
@@ -536,6 +594,14 @@ export default function Home() {
             </p>
           </CardHeader>
           <CardContent className="space-y-6">
+            {SEARCHED_AIRLINES[flightType].some((airline) => unavailableAirlines.includes(airline)) && (
+              <div className="rounded-lg border border-amber-500/30 bg-amber-500/10 px-4 py-3 text-sm text-amber-700">
+                Live {SEARCHED_AIRLINES[flightType]
+                  .filter((airline) => unavailableAirlines.includes(airline))
+                  .map((airline) => AIRLINE_NAMES[airline])
+                  .join(" and ")} data temporarily unavailable - showing the most recent saved results.
+              </div>
+            )}
             {}
             <div className="flex flex-col items-center space-y-4">
               <Label className="text-xs font-medium text-muted-foreground uppercase tracking-wider">
@@ -818,6 +884,37 @@ export default function Home() {
               </div>
             </div>
 
+            {/* Passengers */}
+            <div className="flex flex-wrap items-center gap-4">
+              {([
+                ['adult', 'Adults', 1],
+                ['child', 'Children', 0],
+                ['infant', 'Infants', 0],
+              ] as [keyof PassengerCounts, string, number][]).map(([key, label, min]) => (
+                <div key={key} className="flex items-center gap-2">
+                  <Label htmlFor={`pax-${key}`} className="text-sm font-medium">
+                    {label}
+                  </Label>
+                  <Input
+                    id={`pax-${key}`}
+                    type="number"
+                    min={min}
+                    max={key === 'infant' ? passengers.adult : 9}
+                    value={passengers[key]}
+                    onChange={(e) => {
+                      const value = parseInt(e.target.value) || 0
+                      setPassengers((current) => {
+                        const next = { ...current, [key]: Math.max(min, Math.min(9, value)) }
+                        // Each infant travels on an adult's lap, so lowering the adults lowers the infants too
+                        return { ...next, infant: Math.min(next.infant, next.adult) }
+                      })
+                    }}
+                    className="w-16 h-9"
+                  />
+                </div>
+              ))}
+            </div>
+
             {/* Search Bar with Checkbox and Button */}
             <div className={cn(
               "flex items-center gap-3",
@@ -1023,7 +1120,7 @@ export default function Home() {
                               <div className="flex flex-col lg:items-end gap-4 border-t lg:border-t-0 lg:border-l border-border/40 pt-5 lg:pt-0 lg:pl-6 lg:min-w-[200px]">
                                 <div className="text-center lg:text-right space-y-1">
                                   <p className="text-[10px] font-semibold text-muted-foreground uppercase tracking-wider">Cash Price</p>
-                                  <p className="font-bold text-3xl text-primary tracking-tight">{flight.cashPrice}</p>
+                                  <p className="font-bold text-3xl text-primary tracking-tight">{displayCashPrice(flight)}</p>
                                 </div>
                                 <div className="text-center lg:text-right space-y-1">
                                   <p className="text-[10px] font-semibold text-muted-foreground uppercase tracking-wider">Points</p>
@@ -1103,7 +1200,7 @@ export default function Home() {
                               <div className="flex flex-col lg:items-end gap-4 border-t lg:border-t-0 lg:border-l border-border/40 pt-5 lg:pt-0 lg:pl-6 lg:min-w-[200px]">
                                 <div className="text-center lg:text-right space-y-1">
                                   <p className="text-[10px] font-semibold text-muted-foreground uppercase tracking-wider">Cash Price</p>
-                                  <p className="font-bold text-3xl text-amber-600 tracking-tight">{flight.cashPrice}</p>
+                                  <p className="font-bold text-3xl text-amber-600 tracking-tight">{displayCashPrice(flight)}</p>
                                 </div>
                                 <div className="text-center lg:text-right space-y-1">
                                   <p className="text-[10px] font-semibold text-muted-foreground uppercase tracking-wider">Points</p>
@@ -1180,7 +1277,7 @@ export default function Home() {
                           <div className="flex flex-col lg:items-end gap-4 border-t lg:border-t-0 lg:border-l border-border/40 pt-5 lg:pt-0 lg:pl-6 lg:min-w-[200px]">
                             <div className="text-center lg:text-right space-y-1">
                               <p className="text-[10px] font-semibold text-muted-foreground uppercase tracking-wider">Cash Price</p>
-                              <p className="font-bold text-3xl text-blue-600 tracking-tight">{flight.cashPrice}</p>
+                              <p className="font-bold text-3xl text-blue-600 tracking-tight">{displayCashPrice(flight)}</p>
                             </div>
                             <div className="text-center lg:text-right space-y-1">
                               <p className="text-[10px] font-semibold text-muted-foreground uppercase tracking-wider">Points</p>
@@ -1245,7 +1342,7 @@ export default function Home() {
                       <div className="flex flex-col md:items-end gap-3 border-t md:border-t-0 md:border-l pt-4 md:pt-0 md:pl-6">
                         <div className="text-center md:text-right">
                           <p className="text-xs text-muted-foreground uppercase mb-1">Cash Price</p>
-                          <p className="font-bold text-2xl text-primary">{flight.cashPrice}</p>
+                          <p className="font-bold text-2xl text-primary">{displayCashPrice(flight)}</p>
                         </div>
                         <div className="text-center md:text-right">
                           <p className="text-xs text-muted-foreground uppercase mb-1">Points Price</p>
@@ -0,0 +1,249 @@
+// Airport index for autocomplete and typo-tolerant lookup (mirrors shared/airports.py)
+// Built once per server process from the bundled dataset, shared/airports.csv
+
+import fs from 'fs'
+import path from 'path'
+
+export const AIRLINES = ['spicejet', 'indigo', 'etihad']
+
+// Words shorter than this are never fuzzy-matched (3-letter codes one edit apart are different airports)
+const MIN_FUZZY_LENGTH = 4
+// Words in most airport names - they only match as part of a longer query
+const STOP_WORDS = new Set(['airport', 'international'])
+
+export interface Airport {
+  code: string
+  name: string
+  city: string
+  country: string
+  airlines: string[]
+}
+
+interface IndexedAirport extends Airport {
+  index: number
+  aliases: string[]
+}
+
+export function normalize(text: string): string {
+  return text.toLowerCase().replace(/[^a-z0-9]+/g, ' ').trim().replace(/\s+/g, ' ')
+}
+
+function maxTypos(word: string): number {
+  return word.length < 8 ? 1 : 2
+}
+
+export function editDistance(a: string, b: string): number {
+  let previous = Array.from({ length: b.length + 1 }, (_, j) => j)
+  for (let i = 1; i <= a.length; i++) {
+    const current = [i]
+    for (let j = 1; j <= b.length; j++) {
+      current.push(Math.min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (a[i - 1] === b[j - 1] ? 0 : 1)))
+    }
+    previous = current
+  }
+  return previous[b.length]
+}
+
+interface TrieNode {
+  children: Map<string, TrieNode>
+  airports: Set<number>
+}
+
+// Every prefix of the inserted words -> the airports that have such a word
+class PrefixTrie {
+  private root: TrieNode = { children: new Map(), airports: new Set() }
+
+  insert(word: string, index: number) {
+    let node = this.root
+    for (const char of word) {
+      let child = node.children.get(char)
+      if (!child) {
+        child = { children: new Map(), airports: new Set() }
+        node.children.set(char, child)
+      }
+      child.airports.add(index)
+      node = child
+    }
+  }
+
+  find(prefix: string): Set<number> {
+    let node: TrieNode | undefined = this.root
+    for (const char of prefix) {
+      node = node.children.get(char)
+      if (!node) return new Set()
+    }
+    return node.airports
+  }
+}
+
+interface BKNode {
+  word: string
+  airports: Set<number>
+  children: Map<number, BKNode>
+}
+
+// Burkhard-Keller tree of words under edit distance
+class BKTree {
+  private root: BKNode | null = null
+
+  insert(word: string, index: number) {
+    if (!this.root) {
+      this.root = { word, airports: new Set([index]), children: new Map() }
+      return
+    }
+    let node = this.root
+    while (true) {
+      const distance = editDistance(word, node.word)
+      if (distance === 0) {
+        node.airports.add(index)
+        return
+      }
+      const child = node.children.get(distance)
+      if (!child) {
+        node.children.set(distance, { word, airports: new Set([index]), children: new Map() })
+        return
+      }
+      node = child
+    }
+  }
+
+  // Words within limit edits, closest first
+  search(word: string, limit: number): { distance: number; word: string; airports: Set<number> }[] {
+    const found: { distance: number; word: string; airports: Set<number> }[] = []
+    const stack = this.root ? [this.root] : []
+    while (stack.length) {
+      const node = stack.pop()!
+      const distance = editDistance(word, node.word)
+      if (distance <= limit) {
+        found.push({ distance, word: node.word, airports: node.airports })
+      }
+      // Triangle inequality: only children at distance - limit .. distance + limit can match
+      for (const [childDistance, child] of node.children) {
+        if (childDistance >= distance - limit && childDistance <= distance + limit) {
+          stack.push(child)
+        }
+      }
+    }
+    return found.sort((a, b) => a.distance - b.distance || a.word.localeCompare(b.word))
+  }
+}
+
+function parseCsvLine(line: string): string[] {
+  const fields: string[] = []
+  let field = ''
+  let quoted = false
+  for (let i = 0; i < line.length; i++) {
+    const char = line[i]
+    if (quoted) {
+      if (char === '"' && line[i + 1] === '"') {
+        field += '"'
+        i++
+      } else if (char === '"') {
+        quoted = false
+      } else {
+        field += char
+      }
+    } else if (char === '"') {
+      quoted = true
+    } else if (char === ',') {
+      fields.push(field)
+      field = ''
+    } else {
+      field += char
+    }
+  }
+  fields.push(field)
+  return fields
+}
+
+export class AirportIndex {
+  private airports: IndexedAirport[]
+  private trie = new PrefixTrie()
+  private fuzzy = new BKTree()
+
+  constructor(airports: IndexedAirport[]) {
+    this.airports = airports
+    for (const airport of airports) {
+      const keys = new Set([airport.code, airport.city, airport.name, ...airport.aliases].map(normalize).filter(Boolean))
+      for (const key of keys) {
+        for (const word of new Set([key, ...key.split(' ')])) {
+          if (STOP_WORDS.has(word)) continue
+          this.trie.insert(word, airport.index)
+          if (word.length >= MIN_FUZZY_LENGTH) {
+            this.fuzzy.insert(word, airport.index)
+          }
+        }
+      }
+    }
+  }
+
+  static load(csvPath: string): AirportIndex {
+    const [header, ...lines] = fs.readFileSync(csvPath, 'utf-8').split('\n').filter(Boolean)
+    const columns = parseCsvLine(header)
+    const airports = lines.map((line, index) => {
+      const row = Object.fromEntries(parseCsvLine(line).map((value, i) => [columns[i], value]))
+      return {
+        index,
+        code: row.iata.toUpperCase(),
+        name: row.name,
+        city: row.city,
+        country: row.country,
+        aliases: row.aliases ? row.aliases.split('|') : [],
+        airlines: row.airlines ? row.airlines.split(' ') : [],
+      }
+    })
+    return new AirportIndex(airports)
+  }
+
+  private ranked(indexes: Iterable<number>, query: string): IndexedAirport[] {
+    // Exact code first, then cities starting with the query, then dataset order (main airports first)
+    return [...indexes].map((index) => this.airports[index]).sort((a, b) =>
+      Number(a.code.toLowerCase() !== query) - Number(b.code.toLowerCase() !== query) ||
+      Number(!normalize(a.city).startsWith(query)) - Number(!normalize(b.city).startsWith(query)) ||
+      a.index - b.index
+    )
+  }
+
+  private complete(query: string, airline?: string): IndexedAirport[] {
+    const words = query.split(' ')
+    const indexes = new Set(this.trie.find(query))
+    const perWord = words.map((word) => this.trie.find(word))
+    for (const index of perWord[0]) {
+      if (perWord.every((set) => set.has(index))) indexes.add(index)
+    }
+    return this.ranked(indexes, query).filter((airport) => !airline || airport.airlines.includes(airline))
+  }
+
+  private closest(query: string, airline?: string): IndexedAirport[] {
+    if (query.length < MIN_FUZZY_LENGTH) return []
+    const seen = new Set<number>()
+    const airports: IndexedAirport[] = []
+    for (const match of this.fuzzy.search(query, maxTypos(query))) {
+      const fresh = [...match.airports].filter((index) => !seen.has(index))
+      fresh.forEach((index) => seen.add(index))
+      airports.push(...this.ranked(fresh, query).filter((airport) => !airline || airport.airlines.includes(airline)))
+    }
+    return airports
+  }
+
+  // Autocomplete matches, topped up with typo-tolerant ones
+  search(text: string, limit: number = 10, airline?: string): Airport[] {
+    const query = normalize(text)
+    if (!query) return []
+    const airports = this.complete(query, airline)
+    if (airports.length < limit) {
+      const codes = new Set(airports.map((airport) => airport.code))
+      airports.push(...this.closest(query, airline).filter((airport) => !codes.has(airport.code)))
+    }
+    return airports.slice(0, limit).map(({ code, name, city, country, airlines }) => ({ code, name, city, country, airlines }))
+  }
+}
+
+let cachedIndex: AirportIndex | null = null
+
+export function airportIndex(): AirportIndex {
+  if (!cachedIndex) {
+    cachedIndex = AirportIndex.load(path.join(process.cwd(), '..', '..', 'shared', 'airports.csv'))
+  }
+  return cachedIndex
+}
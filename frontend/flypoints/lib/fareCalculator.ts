@@ -0,0 +1,50 @@
+// Prices any passenger mix from the per-passenger-type fares captured in one search
+// (mirrors shared/fare_calculator.py)
+
+export interface FareBreakdown {
+  total: number
+  base: number
+  taxes: number
+  discount: number
+  loyalty_points: number
+}
+
+// { fare family: { passenger type code: breakdown } }
+export type FareComponents = Record<string, Record<string, FareBreakdown>>
+
+export interface PassengerCounts {
+  adult: number
+  child: number
+  infant: number
+}
+
+export const SINGLE_ADULT: PassengerCounts = { adult: 1, child: 0, infant: 0 }
+
+const PASSENGER_TYPE_CODES: Record<keyof PassengerCounts, string> = {
+  adult: 'ADT',
+  child: 'CHD',
+  infant: 'INF',
+}
+
+export function isSingleAdult(passengers: PassengerCounts): boolean {
+  return passengers.adult === 1 && passengers.child === 0 && passengers.infant === 0
+}
+
+// Total fare for the passenger mix, or null if a passenger type was not priced in the capture
+export function priceForPassengers(
+  components: FareComponents | undefined,
+  passengers: PassengerCounts,
+  family: string = 'spicesaver'
+): number | null {
+  const familyComponents = components?.[family] ?? (components ? Object.values(components)[0] : undefined)
+  if (!familyComponents) return null
+
+  let total = 0
+  for (const [name, count] of Object.entries(passengers) as [keyof PassengerCounts, number][]) {
+    if (count <= 0) continue
+    const breakdown = familyComponents[PASSENGER_TYPE_CODES[name]]
+    if (!breakdown) return null
+    total += breakdown.total * count
+  }
+  return total
+}
@@ -0,0 +1,113 @@
+// Typed flight records from the Python API wrappers (mirrors shared/flight_record.py)
+// Prices arrive as integer paise and durations as minutes; display strings are built here, once
+
+import type { FareComponents } from '@/lib/fareCalculator'
+
+export interface FareFamilyRecord {
+  price_paise: number | null
+  points: number | null
+}
+
+export interface FlightRecord {
+  airline: string | null
+  airline_code: string | null
+  flight_numbers: string[]
+  origin: string | null
+  destination: string | null
+  departure: string | null // ISO 8601, e.g. 2025-12-25T20:30
+  arrival: string | null
+  duration_minutes: number | null
+  price_paise: number | null
+  points: number | null
+  direction: 'outbound' | 'return'
+  fares: Record<string, FareFamilyRecord>
+  fare_components: FareComponents | null
+}
+
+export interface FlightData {
+  airline: string
+  flightNumber: string
+  departureTime: string
+  arrivalTime: string
+  duration: string
+  cashPrice: string
+  pointsPrice: string
+  price?: number // rupees, for sorting without re-parsing cashPrice
+  points?: number
+  durationMinutes?: number
+  direction?: 'outbound' | 'return' // set on round-trip searches
+  spicesaverPrice?: string
+  spiceflexPrice?: string
+  spicemaxPrice?: string
+  spicesaverPoints?: string
+  spiceflexPoints?: string
+  spicemaxPoints?: string
+  fareComponents?: FareComponents // per-passenger-type fares, priced in the UI for any passenger mix
+}
+
+// Indian number system: 8338 → 8,338, 123456 → 1,23,456
+export function formatIndianNumber(num: number): string {
+  return Math.round(num).toLocaleString('en-IN')
+}
+
+export function formatRupees(paise: number): string {
+  return `₹${formatIndianNumber(paise / 100)}`
+}
+
+export function formatDuration(minutes: number): string {
+  return `${Math.floor(minutes / 60)}h ${minutes % 60}m`
+}
+
+// HH:MM from an ISO datetime
+function clockTime(iso: string | null): string {
+  return iso ? iso.slice(11, 16) : 'N/A'
+}
+
+// Display flight for a typed record, or null if it has no price
+export function recordToFlightData(record: FlightRecord, defaultAirline: string): FlightData | null {
+  if (!record.price_paise) return null
+
+  const fare = (family: string) => record.fares?.[family]
+  const familyPrice = (family: string) => {
+    const paise = fare(family)?.price_paise
+    return paise ? formatRupees(paise) : undefined
+  }
+  const familyPoints = (family: string) => {
+    const points = fare(family)?.points
+    return points ? formatIndianNumber(points) : undefined
+  }
+
+  return {
+    airline: record.airline || defaultAirline,
+    flightNumber: record.flight_numbers.length > 0 ? record.flight_numbers.join(', ') : 'N/A',
+    departureTime: clockTime(record.departure),
+    arrivalTime: clockTime(record.arrival),
+    duration: record.duration_minutes !== null ? formatDuration(record.duration_minutes) : 'N/A',
+    cashPrice: formatRupees(record.price_paise),
+    pointsPrice: record.points ? `${formatIndianNumber(record.points)} points` : 'N/A',
+    price: record.price_paise / 100,
+    points: record.points ?? undefined,
+    durationMinutes: record.duration_minutes ?? undefined,
+    direction: record.direction || undefined,
+    fareComponents: record.fare_components || undefined,
+    spicesaverPrice: familyPrice('spicesaver'),
+    spiceflexPrice: familyPrice('spiceflex'),
+    spicemaxPrice: familyPrice('spicemax'),
+    spicesaverPoints: familyPoints('spicesaver'),
+    spiceflexPoints: familyPoints('spiceflex'),
+    spicemaxPoints: familyPoints('spicemax'),
+  }
+}
+
+export function recordsToFlightData(records: FlightRecord[], defaultAirline: string): FlightData[] {
+  return records
+    .map((record) => recordToFlightData(record, defaultAirline))
+    .filter((flight): flight is FlightData => flight !== null) // Remove flights with no price
+}
+
+// Rupee price for sorting - HTML snapshot flights only have the display string
+export function priceValue(flight: { price?: number; cashPrice: string }): number {
+  return flight.price ?? (parseInt(flight.cashPrice.replace(/[^\d]/g, '')) || Infinity)
+}
+
+export const compareByPrice = (a: FlightData, b: FlightData) => priceValue(a) - priceValue(b)
@@ -0,0 +1,253 @@
+// Search popularity: a time-decayed count-min sketch with a heavy-hitters list over
+// (scraper, route, date) searches. Constant memory and O(1) work per search; the state is saved to
+// data/popularity.json every minute so it survives restarts and the crawler can read it
+// (shared/popularity.py reads the same file). Every server process keeps the searches it counted
+// since its last save and adds them to the saved sketch under a lock file, so processes sharing
+// the file never overwrite each other's counts. This is the only place searches are counted.
+
+import fs from 'fs'
+import path from 'path'
+
+const WIDTH = 4096
+const DEPTH = 4
+const HEAVY_HITTERS = 100
+const HALF_LIFE_HOURS = 72
+const PERSIST_MS = 60 * 1000
+// Rescale the counters before the decay weights grow past this many half-lives
+const RESCALE_HALF_LIVES = 20
+// A lock file older than this was left by a process that died while saving
+const STALE_LOCK_MS = 30 * 1000
+
+const HALF_LIFE_MS = HALF_LIFE_HOURS * 60 * 60 * 1000
+const SNAPSHOT_VERSION = 1
+
+export interface PopularSearch {
+  scraper: string
+  from: string
+  to: string
+  date: string
+  score: number
+}
+
+export function searchKey(scraper: string, from: string, to: string, date: string): string {
+  return [scraper, from.toUpperCase(), to.toUpperCase(), date].join('|')
+}
+
+// FNV-1a, seeded per sketch row
+function hash(key: string, seed: number): number {
+  let h = (0x811c9dc5 ^ Math.imul(seed + 1, 0x9e3779b1)) >>> 0
+  for (let i = 0; i < key.length; i++) {
+    h = Math.imul(h ^ key.charCodeAt(i), 0x01000193) >>> 0
+  }
+  return h
+}
+
+// Exclusive lock file: the descriptor, or null while another process holds it
+function acquireLock(lockPath: string): number | null {
+  try {
+    return fs.openSync(lockPath, 'wx')
+  } catch (error: any) {
+    if (error.code !== 'EEXIST') throw error
+    if (Date.now() - fs.statSync(lockPath).mtimeMs < STALE_LOCK_MS) return null
+    fs.unlinkSync(lockPath)
+    return fs.openSync(lockPath, 'wx')
+  }
+}
+
+function readSnapshot(snapshotPath: string): any | null {
+  try {
+    const snapshot = JSON.parse(fs.readFileSync(snapshotPath, 'utf-8'))
+    return snapshot.version === SNAPSHOT_VERSION && snapshot.width === WIDTH && snapshot.depth === DEPTH &&
+      snapshot.halfLifeHours === HALF_LIFE_HOURS ? snapshot : null
+  } catch (error: any) {
+    if (error.code !== 'ENOENT') console.error('Could not read search popularity:', error.message)
+    return null
+  }
+}
+
+function dataDir(): string {
+  return process.env.FLYPOINTS_DATA_DIR || path.join(process.cwd(), '..', '..', 'data')
+}
+
+// Forward decay: a search at time t adds 2^((t - epoch) / half-life), and estimates divide by the
+// weight of now - so old searches fade without ever touching the counters again.
+export class PopularityTracker {
+  private counts = new Float64Array(WIDTH * DEPTH)
+  // What this process added to counts since its last save (merged into the file on save)
+  private deltas = new Float64Array(WIDTH * DEPTH)
+  private heavy = new Map<string, number>()
+  private epoch: number
+  private saveTimer: ReturnType<typeof setTimeout> | null = null
+
+  constructor(private snapshotPath: string | null = null, now: number = Date.now()) {
+    this.epoch = now
+  }
+
+  private weight(now: number): number {
+    return Math.pow(2, (now - this.epoch) / HALF_LIFE_MS)
+  }
+
+  private rescale(now: number) {
+    const weight = this.weight(now)
+    for (let i = 0; i < this.counts.length; i++) {
+      this.counts[i] /= weight
+      this.deltas[i] /= weight
+    }
+    for (const [key, value] of this.heavy) this.heavy.set(key, value / weight)
+    this.epoch = now
+  }
+
+  private scaledEstimate(key: string): number {
+    let estimate = Infinity
+    for (let row = 0; row < DEPTH; row++) {
+      estimate = Math.min(estimate, this.counts[row * WIDTH + (hash(key, row) % WIDTH)])
+    }
+    return estimate
+  }
+
+  record(scraper: string, from: string, to: string, date: string, now: number = Date.now()) {
+    if (now - this.epoch > RESCALE_HALF_LIVES * HALF_LIFE_MS) this.rescale(now)
+    const key = searchKey(scraper, from, to, date)
+    // Conservative update: raise only the counters below the new estimate, which keeps
+    // collisions from inflating every other key that shares a counter
+    const estimate = this.scaledEstimate(key) + this.weight(now)
+    for (let row = 0; row < DEPTH; row++) {
+      const cell = row * WIDTH + (hash(key, row) % WIDTH)
+      if (estimate > this.counts[cell]) {
+        this.deltas[cell] += estimate - this.counts[cell]
+        this.counts[cell] = estimate
+      }
+    }
+
+    // Keep the HEAVY_HITTERS keys with the highest estimates (evicting the smallest)
+    if (this.heavy.has(key) || this.heavy.size < HEAVY_HITTERS) {
+      this.heavy.set(key, estimate)
+    } else {
+      let smallestKey = ''
+      let smallest = Infinity
+      for (const [heavyKey, value] of this.heavy) {
+        if (value < smallest) {
+          smallest = value
+          smallestKey = heavyKey
+        }
+      }
+      if (estimate > smallest) {
+        this.heavy.delete(smallestKey)
+        this.heavy.set(key, estimate)
+      }
+    }
+    this.scheduleSave()
+  }
+
+  // Decayed search count for one key (an overestimate by at most a small fraction of all searches)
+  score(scraper: string, from: string, to: string, date: string, now: number = Date.now()): number {
+    return this.scaledEstimate(searchKey(scraper, from, to, date)) / this.weight(now)
+  }
+
+  top(limit: number, now: number = Date.now()): PopularSearch[] {
+    const weight = this.weight(now)
+    return [...this.heavy.keys()]
+      .map((key) => {
+        const [scraper, from, to, date] = key.split('|')
+        return { scraper, from, to, date, score: this.scaledEstimate(key) / weight }
+      })
+      .sort((a, b) => b.score - a.score)
+      .slice(0, limit)
+  }
+
+  private scheduleSave() {
+    if (!this.snapshotPath || this.saveTimer) return
+    this.saveTimer = setTimeout(() => {
+      this.saveTimer = null
+      this.save()
+    }, PERSIST_MS)
+    this.saveTimer.unref?.()
+  }
+
+  // Add this process's searches since its last save to the saved sketch (which holds every other
+  // process's saved searches), adopt the merged sketch and write it back - all under the lock file.
+  // When another process holds the lock the save is retried later; nothing is lost meanwhile.
+  save() {
+    if (!this.snapshotPath) return
+    const lockPath = `${this.snapshotPath}.lock`
+    let lock: number | null = null
+    try {
+      fs.mkdirSync(path.dirname(this.snapshotPath), { recursive: true })
+      lock = acquireLock(lockPath)
+      if (lock === null) {
+        this.scheduleSave()
+        return
+      }
+
+      const saved = readSnapshot(this.snapshotPath)
+      const merged = new Float64Array(WIDTH * DEPTH)
+      if (saved) {
+        // Bring the saved counters to this sketch's epoch before adding
+        const scale = Math.pow(2, (saved.epoch - this.epoch) / HALF_LIFE_MS)
+        for (let i = 0; i < merged.length; i++) merged[i] = saved.counts[i] * scale
+      }
+      for (let i = 0; i < merged.length; i++) merged[i] += this.deltas[i]
+      this.counts = merged
+      this.deltas = new Float64Array(WIDTH * DEPTH)
+
+      const candidates = new Set([...this.heavy.keys(), ...(saved ? saved.heavyHitters : [])])
+      this.heavy = new Map(
+        [...candidates]
+          .map((key): [string, number] => [key, this.scaledEstimate(key)])
+          .sort((a, b) => b[1] - a[1])
+          .slice(0, HEAVY_HITTERS)
+      )
+
+      const snapshot = {
+        version: SNAPSHOT_VERSION,
+        width: WIDTH,
+        depth: DEPTH,
+        halfLifeHours: HALF_LIFE_HOURS,
+        epoch: this.epoch,
+        savedAt: Date.now(),
+        counts: Array.from(this.counts, (value) => Math.round(value * 1000) / 1000),
+        heavyHitters: [...this.heavy.keys()],
+      }
+      const temporary = `${this.snapshotPath}.${process.pid}.tmp`
+      fs.writeFileSync(temporary, JSON.stringify(snapshot))
+      fs.renameSync(temporary, this.snapshotPath)
+    } catch (error: any) {
+      console.error('Could not save search popularity:', error.message)
+    } finally {
+      if (lock !== null) {
+        fs.closeSync(lock)
+        fs.rmSync(lockPath, { force: true })
+      }
+    }
+  }
+
+  static load(snapshotPath: string): PopularityTracker {
+    const tracker = new PopularityTracker(snapshotPath)
+    const snapshot = readSnapshot(snapshotPath)
+    if (snapshot) {
+      tracker.epoch = snapshot.epoch
+      tracker.counts.set(snapshot.counts)
+      for (const key of snapshot.heavyHitters) tracker.heavy.set(key, tracker.scaledEstimate(key))
+    }
+    return tracker
+  }
+}
+
+let tracker: PopularityTracker | null = null
+
+export function popularityTracker(): PopularityTracker {
+  if (!tracker) {
+    tracker = PopularityTracker.load(path.join(dataDir(), 'popularity.json'))
+  }
+  return tracker
+}
+
+// Count one search - never throws, so popularity tracking cannot fail a search
+export function recordSearch(scraper: string, from: string, to: string, date: string) {
+  if (!/^\d{4}-\d{2}-\d{2}$/.test(date)) return
+  try {
+    popularityTracker().record(scraper, from, to, date)
+  } catch (error: any) {
+    console.error('Could not record search popularity:', error.message)
+  }
+}
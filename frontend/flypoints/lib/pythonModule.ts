@@ -0,0 +1,58 @@
+import { spawn } from 'child_process'
+import path from 'path'
+
+// Runs `python -m <module> ... --json` from the repository root (so the shared package resolves)
+// and resolves with its parsed stdout. Modules report errors as {"error": ...} on stderr.
+export function runPythonModule(module: string, args: string[], timeoutMs: number = 30 * 1000): Promise<any> {
+  return new Promise((resolve, reject) => {
+    const repoRoot = path.join(process.cwd(), '..', '..')
+    const pythonCommand = process.platform === 'win32' ? 'python' : 'python3'
+
+    const pythonProcess = spawn(pythonCommand, ['-m', module, ...args, '--json'], {
+      cwd: repoRoot,
+      stdio: ['pipe', 'pipe', 'pipe'],
+    })
+
+    let stdoutBuffer = ''
+    let stderrBuffer = ''
+
+    pythonProcess.stdout.on('data', (data) => {
+      stdoutBuffer += data.toString()
+    })
+
+    pythonProcess.stderr.on('data', (data) => {
+      stderrBuffer += data.toString()
+    })
+
+    const timeout = setTimeout(() => {
+      pythonProcess.kill()
+      reject(new Error(`${module} timeout after ${timeoutMs / 1000} seconds`))
+    }, timeoutMs)
+
+    pythonProcess.on('close', (code) => {
+      clearTimeout(timeout)
+
+      if (code === 0) {
+        try {
+          resolve(JSON.parse(stdoutBuffer.trim()))
+        } catch (parseError: any) {
+          reject(new Error(`Failed to parse ${module} output: ${parseError.message}`))
+        }
+        return
+      }
+
+      try {
+        const errorJson = JSON.parse(stderrBuffer.trim())
+        reject(new Error(errorJson.error || `${module} exited with code ${code}`))
+      } catch {
+        reject(new Error(`${module} exited with code ${code}. Error: ${stderrBuffer.substring(0, 200)}`))
+      }
+    })
+
+    // Python could not be started (missing or not executable) - 'close' may never follow
+    pythonProcess.on('error', (error) => {
+      clearTimeout(timeout)
+      reject(error)
+    })
+  })
+}
@@ -0,0 +1,54 @@
+import { runPythonModule } from '@/lib/pythonModule'
+import { type FlightRecord } from '@/lib/flightRecord'
+
+export interface StoredResults {
+  flights: FlightRecord[]
+  capturedAt: string
+}
+
+export interface BreakerVerdict {
+  state: 'open' | 'half_open'
+  reason: string | null
+  retryAfter: string | null
+}
+
+export interface SearchGate {
+  hot: StoredResults | null // fresh stored results answer the search
+  skipped: string | null // the serviceability index rules the route out
+  breaker: BreakerVerdict | null // the airline's circuit breaker holds live searches back
+  stored: StoredResults | null // latest stored results (any age) while the breaker is open
+}
+
+const LIVE: SearchGate = { hot: null, skipped: null, breaker: null, stored: null }
+
+function storedResults(results: any): StoredResults | null {
+  return results ? { flights: results.flights, capturedAt: results.captured_at } : null
+}
+
+// Runs a search's pre-scrape checks (shared/search_gate.py) in one Python process: fresh stored
+// results, route serviceability, then the circuit breaker. storedOk is false for round trips and
+// passenger mixes, which stored results cannot answer. Resolves with all-null (scrape live) when
+// the checks cannot run. A half-open breaker lets exactly one caller through as its probe, so
+// call this only right before scraping.
+export async function searchGate(
+  scraper: string, from: string, to: string, date: string, force: boolean, storedOk: boolean
+): Promise<SearchGate> {
+  if (!/^\d{4}-\d{2}-\d{2}$/.test(date)) return LIVE
+  const args = [scraper, from, to, date]
+  if (force) args.push('--force')
+  if (!storedOk) args.push('--no-stored')
+  try {
+    const gate = await runPythonModule('shared.search_gate', args, 10 * 1000)
+    return {
+      hot: storedResults(gate.hot),
+      skipped: gate.skipped || null,
+      breaker: gate.breaker
+        ? { state: gate.breaker.state, reason: gate.breaker.reason, retryAfter: gate.breaker.retry_after }
+        : null,
+      stored: storedResults(gate.stored),
+    }
+  } catch (error: any) {
+    console.error('Search gate failed:', error.message)
+    return LIVE
+  }
+}
@@ -0,0 +1,4 @@
+"""
+Shared helpers used by all airline scrapers
+Each attempt* directory adds the repository root to sys.path and imports from here
+"""
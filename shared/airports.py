@@ -0,0 +1,306 @@
+"""
+Airport index
+One airport lookup for every scraper and the frontend, loaded once from the bundled dataset
+(shared/airports.csv: IATA code, name, city, country, aliases, and the airlines whose scrapers
+serve the airport). Three structures are built from it:
+
+- a prefix trie over codes, cities, names and aliases for autocomplete ("ben" -> BLR)
+- a BK-tree over the same words for typo-tolerant matching ("banglore" -> BLR) that only
+  compares the input against a few words instead of all of them
+- one bitmap per airline (bit i = the airline serves airport i) for "which airlines fly here"
+
+    python -m shared.airports banglore
+"""
+
+import argparse
+import csv
+import json
+import os
+import re
+import sys
+from functools import lru_cache
+
+
+DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'airports.csv')
+AIRLINES = ('spicejet', 'indigo', 'etihad')
+
+# Words shorter than this are never fuzzy-matched (3-letter codes one edit apart are different airports)
+MIN_FUZZY_LENGTH = 4
+# Words in most airport names - they only match as part of a longer query
+STOP_WORDS = {'airport', 'international'}
+DEFAULT_LIMIT = 10
+
+
+def normalize(text):
+    """'  Bengaluru (BLR) ' -> 'bengaluru blr'"""
+    return ' '.join(re.sub(r'[^a-z0-9]+', ' ', str(text or '').lower()).split())
+
+
+def max_typos(word):
+    """Edits tolerated for a word of this length"""
+    return 1 if len(word) < 8 else 2
+
+
+def edit_distance(a, b):
+    """Levenshtein distance, bit-parallel (Myers/Hyyrö): one pass over b with a's positions as int bits"""
+    if not a or not b:
+        return len(a) + len(b)
+    positions = {}
+    for i, char in enumerate(a):
+        positions[char] = positions.get(char, 0) | (1 << i)
+    full = (1 << len(a)) - 1
+    last = 1 << (len(a) - 1)
+    plus, minus, distance = full, 0, len(a)
+    for char in b:
+        equal = positions.get(char, 0)
+        vertical = equal | minus
+        horizontal = (((equal & plus) + plus) ^ plus) | equal
+        horizontal_plus = (minus | ~(horizontal | plus)) & full
+        horizontal_minus = plus & horizontal
+        if horizontal_plus & last:
+            distance += 1
+        elif horizontal_minus & last:
+            distance -= 1
+        horizontal_plus = ((horizontal_plus << 1) | 1) & full
+        horizontal_minus = (horizontal_minus << 1) & full
+        plus = (horizontal_minus | ~(vertical | horizontal_plus)) & full
+        minus = horizontal_plus & vertical
+    return distance
+
+
+class Airport:
+    """One airport from the dataset"""
+
+    __slots__ = ('index', 'code', 'name', 'city', 'country', 'aliases', 'airlines')
+
+    def __init__(self, index, code, name, city, country, aliases=(), airlines=()):
+        self.index = index
+        self.code = sys.intern(code.upper())
+        self.name = name
+        self.city = city
+        self.country = country
+        self.aliases = tuple(aliases)
+        self.airlines = tuple(airlines)
+
+    def keys(self):
+        """Normalized strings the airport is found by"""
+        return {normalize(key) for key in (self.code, self.city, self.name, *self.aliases) if key}
+
+    def to_record(self):
+        return {'code': self.code, 'name': self.name, 'city': self.city, 'country': self.country,
+                'airlines': list(self.airlines)}
+
+
+class PrefixTrie:
+    """Maps every prefix of the inserted words to the airports that have such a word"""
+
+    def __init__(self):
+        self.root = {}
+
+    def insert(self, word, index):
+        node = self.root
+        for char in word:
+            node = node.setdefault(char, {})
+            node.setdefault('', set()).add(index)
+
+    def find(self, prefix):
+        """Indexes of airports with a word starting with prefix"""
+        node = self.root
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return set()
+        return node.get('', set())
+
+
+class BKTree:
+    """Burkhard-Keller tree of words under edit distance; each word carries airport indexes"""
+
+    def __init__(self):
+        self.root = None  # [word, indexes, {distance: child}]
+
+    def insert(self, word, index):
+        if self.root is None:
+            self.root = [word, {index}, {}]
+            return
+        node = self.root
+        while True:
+            distance = edit_distance(word, node[0])
+            if distance == 0:
+                node[1].add(index)
+                return
+            child = node[2].get(distance)
+            if child is None:
+                node[2][distance] = [word, {index}, {}]
+                return
+            node = child
+
+    def search(self, word, limit):
+        """[(distance, word, indexes)] for words within limit edits, closest first"""
+        found = []
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            distance = edit_distance(word, node[0])
+            if distance <= limit:
+                found.append((distance, node[0], node[1]))
+            # Triangle inequality: only children at distance - limit .. distance + limit can match
+            for child_distance, child in node[2].items():
+                if distance - limit <= child_distance <= distance + limit:
+                    stack.append(child)
+        found.sort(key=lambda match: (match[0], match[1]))
+        return found
+
+
+class AirportIndex:
+    """Airports with prefix, fuzzy and per-airline lookups"""
+
+    def __init__(self, airports):
+        self.airports = list(airports)
+        self.by_code = {airport.code: airport for airport in self.airports}
+        self.by_key = {}
+        self.trie = PrefixTrie()
+        self.fuzzy = BKTree()
+        self.served = {airline: 0 for airline in AIRLINES}
+
+        for airport in self.airports:
+            for key in airport.keys():
+                self.by_key.setdefault(key, airport)
+                words = {key, *key.split()} - STOP_WORDS
+                for word in words:
+                    self.trie.insert(word, airport.index)
+                    if len(word) >= MIN_FUZZY_LENGTH:
+                        self.fuzzy.insert(word, airport.index)
+            for airline in airport.airlines:
+                self.served[airline] = self.served.get(airline, 0) | (1 << airport.index)
+
+    @classmethod
+    def load(cls, path=DATASET):
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            rows = list(csv.DictReader(f))
+        return cls(Airport(index, row['iata'], row['name'], row['city'], row['country'],
+                           [alias for alias in row['aliases'].split('|') if alias],
+                           row['airlines'].split())
+                   for index, row in enumerate(rows))
+
+    def get(self, code):
+        return self.by_code.get(str(code or '').strip().upper())
+
+    # Airlines
+
+    def serves(self, airline, code):
+        """True if the airline's scraper serves the airport"""
+        airport = self.get(code)
+        return bool(airport and self.served.get(airline, 0) >> airport.index & 1)
+
+    def airlines_serving(self, *codes):
+        """Airlines that serve every one of the airports"""
+        airports = [self.get(code) for code in codes]
+        if None in airports:
+            return []
+        mask = sum(1 << airport.index for airport in airports)
+        return [airline for airline, served in self.served.items() if served & mask == mask]
+
+    # Lookup
+
+    def _ranked(self, indexes, query):
+        """Exact code first, then cities starting with the query, then dataset order (main airports first)"""
+        airports = [self.airports[index] for index in indexes]
+        airports.sort(key=lambda airport: (airport.code.lower() != query,
+                                           not normalize(airport.city).startswith(query), airport.index))
+        return airports
+
+    def complete(self, text, limit=DEFAULT_LIMIT, airline=None):
+        """Airports with a word starting with each word of text ('new yo' -> JFK, EWR ...)"""
+        query = normalize(text)
+        if not query:
+            return []
+        words = query.split()
+        indexes = self.trie.find(query) | set.intersection(*(self.trie.find(word) for word in words))
+        if airline:
+            indexes = {index for index in indexes if self.served.get(airline, 0) >> index & 1}
+        return self._ranked(indexes, query)[:limit]
+
+    def closest(self, text, limit=DEFAULT_LIMIT, airline=None):
+        """Airports with a word within a few typos of text, closest first"""
+        query = normalize(text)
+        if len(query) < MIN_FUZZY_LENGTH:
+            return []
+        airports, seen = [], set()
+        for _, _, indexes in self.fuzzy.search(query, max_typos(query)):
+            for airport in self._ranked(indexes - seen, query):
+                if not airline or self.served.get(airline, 0) >> airport.index & 1:
+                    airports.append(airport)
+            seen |= indexes
+        return airports[:limit]
+
+    def search(self, text, limit=DEFAULT_LIMIT, airline=None):
+        """Autocomplete matches, topped up with typo-tolerant ones"""
+        airports = self.complete(text, limit, airline)
+        if len(airports) < limit:
+            seen = {airport.code for airport in airports}
+            airports += [airport for airport in self.closest(text, limit, airline) if airport.code not in seen]
+        return airports[:limit]
+
+    def resolve(self, text, allow_unknown_codes=False):
+        """
+        Airport code for a code, city, airport name, alias or a near miss of one ('banglore'),
+        or None when nothing (or more than one equally close airport) matches.
+        allow_unknown_codes: pass 3-letter inputs missing from the dataset through uppercased
+        """
+        query = normalize(text)
+        if not query:
+            return None
+        if len(query) == 3 and query.upper() in self.by_code:
+            return query.upper()
+        if query in self.by_key:
+            return self.by_key[query].code
+        if len(query) >= MIN_FUZZY_LENGTH:
+            matches = self.fuzzy.search(query, max_typos(query))
+            if matches:
+                best = [(word, indexes) for distance, word, indexes in matches if distance == matches[0][0]]
+                codes = {self.airports[index].code for _, indexes in best for index in indexes}
+                if len(codes) == 1:
+                    return codes.pop()
+                # One word shared by several airports ('dubai'): the dataset lists the main one first
+                if len(best) == 1 and best[0][0] in self.by_key:
+                    return self.by_key[best[0][0]].code
+        if allow_unknown_codes and re.fullmatch(r'[a-z]{3}', query):
+            return query.upper()
+        return None
+
+
+@lru_cache(maxsize=1)
+def airport_index():
+    """The shared index, built on first use"""
+    return AirportIndex.load()
+
+
+def resolve_airport(text, allow_unknown_codes=False):
+    """Airport code for user input (see AirportIndex.resolve)"""
+    return airport_index().resolve(text, allow_unknown_codes)
+
+
+def main():
+    """Search airports from the command line"""
+    parser = argparse.ArgumentParser(description="Search the airport index (autocomplete and typo-tolerant)")
+    parser.add_argument('query')
+    parser.add_argument('--airline', choices=AIRLINES, help="Only airports this airline's scraper serves")
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT)
+    parser.add_argument('--json', action='store_true', help="Print JSON only")
+    args = parser.parse_args()
+
+    index = airport_index()
+    airports = index.search(args.query, args.limit, args.airline)
+    if args.json:
+        print(json.dumps({"success": True, "resolved": index.resolve(args.query),
+                          "airports": [airport.to_record() for airport in airports]}, ensure_ascii=True))
+        return
+
+    print(f"Resolves to: {index.resolve(args.query) or 'nothing'}")
+    for airport in airports:
+        print(f"  {airport.code}  {airport.city:<20} {airport.name:<50} {' '.join(airport.airlines)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Bounded response capture
+Only responses whose URL matches a declared endpoint pattern have their body read. Bodies are
+kept as raw bytes in a ring buffer capped by total size and decoded only when accessed
+"""
+
+import json
+import re
+import threading
+from collections import deque
+
+
+DEFAULT_MAX_BYTES = 8 * 1024 * 1024
+
+
+class CapturedResponse:
+    """One captured response body, decoded on first access"""
+
+    __slots__ = ('endpoint', 'url', 'body', '_data', '_decoded')
+
+    def __init__(self, endpoint, url, body):
+        self.endpoint = endpoint
+        self.url = url
+        self.body = body
+        self._data = None
+        self._decoded = False
+
+    @property
+    def size(self):
+        return len(self.body)
+
+    @property
+    def data(self):
+        """Decoded JSON body, or None if it is not JSON"""
+        if not self._decoded:
+            try:
+                self._data = json.loads(self.body)
+            except ValueError:
+                self._data = None
+            self._decoded = True
+        return self._data
+
+
+class ResponseCapture:
+    """
+    Ring buffer of captured response bodies.
+    endpoints: {name: regex} matched (case-insensitive) against the response URL
+    max_bytes: total body bytes kept - the oldest responses are dropped first
+    """
+
+    def __init__(self, endpoints, max_bytes=DEFAULT_MAX_BYTES):
+        self.endpoints = [(name, re.compile(pattern, re.IGNORECASE)) for name, pattern in endpoints.items()]
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.dropped = 0
+        self._responses = deque()
+        self._lock = threading.Lock()
+
+    def match(self, url):
+        """Endpoint name for a URL, or None - call this before reading the body"""
+        for name, pattern in self.endpoints:
+            if pattern.search(url or ''):
+                return name
+        return None
+
+    def add(self, endpoint, url, body):
+        """Store a response body (bytes or str). Returns the CapturedResponse, or None if it is too large."""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        if body is None or len(body) > self.max_bytes:
+            return None
+
+        captured = CapturedResponse(endpoint, url, body)
+        with self._lock:
+            self._responses.append(captured)
+            self.total_bytes += captured.size
+            while self.total_bytes > self.max_bytes:
+                oldest = self._responses.popleft()
+                self.total_bytes -= oldest.size
+                self.dropped += 1
+        return captured
+
+    def all(self, endpoint=None):
+        """Captured responses (oldest first), optionally for one endpoint"""
+        with self._lock:
+            return [captured for captured in self._responses if endpoint is None or captured.endpoint == endpoint]
+
+    def latest(self, endpoint):
+        """Most recent response for an endpoint, or None"""
+        with self._lock:
+            for captured in reversed(self._responses):
+                if captured.endpoint == endpoint:
+                    return captured
+        return None
+
+    def clear(self):
+        with self._lock:
+            self._responses.clear()
+            self.total_bytes = 0
@@ -0,0 +1,341 @@
+"""
+Capture archive
+Every raw availability JSON / results page is kept in a content-addressed store under
+data/archive/: identical payloads are stored once (keyed by SHA-256), compressed with zstd and
+a per-airline trained dictionary (zlib with a preset dictionary if zstandard is not installed),
+and indexed in SQLite by airline / route / travel date / capture time.
+Dictionaries are trained off the search path - by the crawler daemon while it is idle, or with
+`train` below. Set FLYPOINTS_ARCHIVE=0 to turn archiving off.
+
+    python -m shared.capture_archive train
+    python -m shared.capture_archive stats
+"""
+
+import argparse
+import hashlib
+import os
+import sqlite3
+import threading
+import zlib
+from datetime import datetime
+
+from shared.paths import data_path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+ENABLED_ENV = 'FLYPOINTS_ARCHIVE'
+
+ZSTD_LEVEL = 12
+ZSTD_DICT_SIZE = 112640
+ZLIB_DICT_SIZE = 32768  # zlib only looks back 32 KB
+
+# Train a dictionary once an airline has this many objects, then retrain as it grows
+TRAIN_AFTER = 20
+RETRAIN_EVERY = 200
+TRAIN_SAMPLES = 200
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS objects (
+    sha256 TEXT PRIMARY KEY,
+    airline TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    dict_id TEXT,
+    size INTEGER NOT NULL,
+    stored_size INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS captures (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    airline TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    origin TEXT,
+    destination TEXT,
+    travel_date TEXT,
+    url TEXT,
+    captured_at TEXT NOT NULL,
+    sha256 TEXT NOT NULL REFERENCES objects(sha256)
+);
+CREATE INDEX IF NOT EXISTS idx_captures_route ON captures (airline, origin, destination, travel_date);
+CREATE INDEX IF NOT EXISTS idx_captures_time ON captures (captured_at);
+CREATE TABLE IF NOT EXISTS dictionaries (
+    dict_id TEXT PRIMARY KEY,
+    airline TEXT NOT NULL,
+    codec TEXT NOT NULL,
+    trained_on INTEGER NOT NULL,
+    created_at TEXT NOT NULL
+);
+"""
+
+
+def archive_enabled():
+    """True unless FLYPOINTS_ARCHIVE is set to 0/false/no"""
+    return os.environ.get(ENABLED_ENV, '1').strip().lower() not in ('0', 'false', 'no')
+
+
+class CaptureArchive:
+    """Content-addressed, compressed store of raw captures with a SQLite index"""
+
+    _lock = threading.Lock()
+
+    def __init__(self, root=None):
+        self.root = root or os.path.dirname(data_path('archive', 'archive.db'))
+        os.makedirs(self.root, exist_ok=True)
+        self.db_path = os.path.join(self.root, 'archive.db')
+        self._dict_cache = {}
+        with self._connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def _object_path(self, sha256):
+        return os.path.join(self.root, 'objects', sha256[:2], sha256)
+
+    def _dict_path(self, dict_id):
+        return os.path.join(self.root, 'dicts', dict_id)
+
+    # Compression
+
+    def _load_dict(self, dict_id):
+        if dict_id not in self._dict_cache:
+            with open(self._dict_path(dict_id), 'rb') as f:
+                self._dict_cache[dict_id] = f.read()
+        return self._dict_cache[dict_id]
+
+    def _current_dict(self, conn, airline, codec):
+        row = conn.execute(
+            "SELECT dict_id FROM dictionaries WHERE airline = ? AND codec = ? ORDER BY created_at DESC LIMIT 1",
+            (airline, codec),
+        ).fetchone()
+        return row['dict_id'] if row else None
+
+    def _compress(self, raw, dict_id):
+        """(stored bytes, codec)"""
+        dict_data = self._load_dict(dict_id) if dict_id else None
+        if zstandard is not None:
+            params = {'level': ZSTD_LEVEL}
+            if dict_data:
+                params['dict_data'] = zstandard.ZstdCompressionDict(dict_data)
+            return zstandard.ZstdCompressor(**params).compress(raw), 'zstd'
+
+        compressor = zlib.compressobj(9, zdict=dict_data) if dict_data else zlib.compressobj(9)
+        return compressor.compress(raw) + compressor.flush(), 'zlib'
+
+    def _decompress(self, stored, codec, dict_id):
+        dict_data = self._load_dict(dict_id) if dict_id else None
+        if codec == 'zstd':
+            if zstandard is None:
+                raise RuntimeError("zstandard is required to read zstd-compressed captures")
+            params = {'dict_data': zstandard.ZstdCompressionDict(dict_data)} if dict_data else {}
+            return zstandard.ZstdDecompressor(**params).decompressobj().decompress(stored)
+
+        decompressor = zlib.decompressobj(zdict=dict_data) if dict_data else zlib.decompressobj()
+        return decompressor.decompress(stored) + decompressor.flush()
+
+    # Writing
+
+    def put(self, airline, kind, payload, origin=None, destination=None, travel_date=None, url=None,
+            captured_at=None):
+        """
+        Archive one raw capture (bytes or str). kind is e.g. 'availability', 'lowfare' or 'page'.
+        Returns the payload's SHA-256; the body is only written if it is not already stored.
+        """
+        raw = payload.encode('utf-8') if isinstance(payload, str) else bytes(payload)
+        sha256 = hashlib.sha256(raw).hexdigest()
+        captured_at = captured_at or datetime.now().isoformat(timespec='seconds')
+        codec = 'zstd' if zstandard is not None else 'zlib'
+
+        with self._lock, self._connect() as conn:
+            if not conn.execute("SELECT 1 FROM objects WHERE sha256 = ?", (sha256,)).fetchone():
+                dict_id = self._current_dict(conn, airline, codec)
+                stored, codec = self._compress(raw, dict_id)
+
+                # Another process archiving the same payload may get there first - then it is already
+                # stored. The row stays invisible to others until the body is written and committed.
+                inserted = conn.execute(
+                    "INSERT OR IGNORE INTO objects (sha256, airline, codec, dict_id, size, stored_size, created_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (sha256, airline, codec, dict_id, len(raw), len(stored), captured_at),
+                ).rowcount
+                if inserted:
+                    path = self._object_path(sha256)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    tmp_path = f"{path}.{os.getpid()}.tmp"
+                    with open(tmp_path, 'wb') as f:
+                        f.write(stored)
+                    os.replace(tmp_path, path)
+
+            conn.execute(
+                "INSERT INTO captures (airline, kind, origin, destination, travel_date, url, captured_at, sha256) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (airline, kind, origin, destination, travel_date, url, captured_at, sha256),
+            )
+
+        return sha256
+
+    # Dictionary training (never on the search path - see train_dictionaries)
+
+    def train_due(self, airline=None, force=False):
+        """
+        Train the dictionaries that are due: an airline's first after TRAIN_AFTER objects, then one
+        every RETRAIN_EVERY (force: every airline with objects now). Returns the airlines trained.
+        """
+        codec = 'zstd' if zstandard is not None else 'zlib'
+        trained = []
+        with self._lock, self._connect() as conn:
+            query = "SELECT airline, COUNT(*) FROM objects"
+            params = []
+            if airline:
+                query += " WHERE airline = ?"
+                params.append(airline)
+            for name, count in conn.execute(query + " GROUP BY airline", params).fetchall():
+                row = conn.execute(
+                    "SELECT MAX(trained_on) FROM dictionaries WHERE airline = ? AND codec = ?", (name, codec)
+                ).fetchone()
+                trained_on = row[0] or 0
+                due = (not trained_on and count >= TRAIN_AFTER) or (trained_on and count - trained_on >= RETRAIN_EVERY)
+                if (due or force) and self._train(conn, name, codec, count):
+                    trained.append(name)
+        return trained
+
+    def _train(self, conn, airline, codec, count):
+        rows = conn.execute(
+            "SELECT sha256, codec, dict_id FROM objects WHERE airline = ? ORDER BY created_at DESC LIMIT ?",
+            (airline, TRAIN_SAMPLES),
+        ).fetchall()
+        samples = []
+        for row in rows:
+            try:
+                with open(self._object_path(row['sha256']), 'rb') as f:
+                    samples.append(self._decompress(f.read(), row['codec'], row['dict_id']))
+            except (OSError, RuntimeError, zlib.error):
+                continue
+        if not samples:
+            return False
+
+        try:
+            if codec == 'zstd':
+                dict_data = zstandard.train_dictionary(ZSTD_DICT_SIZE, samples).as_bytes()
+            else:
+                # zlib preset dictionary: the most common content goes last (closest to the data)
+                dict_data = b''.join(sample[:ZLIB_DICT_SIZE // len(samples) or 1] for sample in reversed(samples))
+                dict_data = dict_data[-ZLIB_DICT_SIZE:]
+        except Exception as e:
+            print(f"Could not train {airline} archive dictionary: {e}")
+            return False
+
+        dict_id = f"{airline}-{codec}-{hashlib.sha256(dict_data).hexdigest()[:12]}"
+        path = self._dict_path(dict_id)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(dict_data)
+        conn.execute(
+            "INSERT OR REPLACE INTO dictionaries (dict_id, airline, codec, trained_on, created_at) VALUES (?, ?, ?, ?, ?)",
+            (dict_id, airline, codec, count, datetime.now().isoformat(timespec='seconds')),
+        )
+        print(f"Trained {airline} archive dictionary on {len(samples)} capture(s)")
+        return True
+
+    # Reading
+
+    def get(self, sha256):
+        """Raw payload bytes for a hash, or None if it is not archived"""
+        with self._connect() as conn:
+            row = conn.execute("SELECT codec, dict_id FROM objects WHERE sha256 = ?", (sha256,)).fetchone()
+        if not row:
+            return None
+        with open(self._object_path(sha256), 'rb') as f:
+            return self._decompress(f.read(), row['codec'], row['dict_id'])
+
+    def find(self, airline=None, kind=None, origin=None, destination=None, travel_date=None,
+             since=None, until=None, limit=None):
+        """Index rows (dicts, newest first) matching the given filters"""
+        filters = {
+            'airline = ?': airline, 'kind = ?': kind, 'origin = ?': origin, 'destination = ?': destination,
+            'travel_date = ?': travel_date, 'captured_at >= ?': since, 'captured_at <= ?': until,
+        }
+        clauses = [clause for clause, value in filters.items() if value is not None]
+        params = [value for value in filters.values() if value is not None]
+        query = "SELECT * FROM captures"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY captured_at DESC, id DESC"
+        if limit:
+            query += " LIMIT ?"
+            params.append(int(limit))
+
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query, params).fetchall()]
+
+    def stats(self):
+        """Object count, raw bytes and stored bytes per airline"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT airline, COUNT(*) AS objects, SUM(size) AS size, SUM(stored_size) AS stored_size "
+                "FROM objects GROUP BY airline"
+            ).fetchall()
+        return [dict(row) for row in rows]
+
+
+def archive_captures(airline, captures, origin=None, destination=None, travel_date=None):
+    """
+    Archive [(kind, payload, url)] from one search. Never raises - archiving must not fail a search.
+    """
+    if not archive_enabled() or not captures:
+        return
+    try:
+        archive = CaptureArchive()
+    except Exception as e:
+        print(f"Could not archive captures: {e}")
+        return
+    for kind, payload, url in captures:
+        if not payload:
+            continue
+        try:
+            archive.put(airline, kind, payload, origin, destination, travel_date, url)
+        except Exception as e:
+            print(f"Could not archive {kind} capture: {e}")
+
+
+def train_dictionaries():
+    """Train any archive dictionaries that are due - for background callers. Never raises."""
+    if not archive_enabled():
+        return []
+    try:
+        return CaptureArchive().train_due()
+    except Exception as e:
+        print(f"Could not train archive dictionaries: {e}")
+        return []
+
+
+def main():
+    """Train dictionaries or show archive sizes from the command line"""
+    parser = argparse.ArgumentParser(description="Capture archive maintenance")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    train_parser = subparsers.add_parser('train', help="Train the per-airline dictionaries that are due")
+    train_parser.add_argument('--airline')
+    train_parser.add_argument('--force', action='store_true', help="Retrain even if not due")
+    subparsers.add_parser('stats', help="Objects and bytes per airline")
+    args = parser.parse_args()
+
+    archive = CaptureArchive()
+    if args.command == 'train':
+        trained = archive.train_due(args.airline, args.force)
+        if not trained:
+            print("No dictionaries due")
+        return
+
+    for row in archive.stats():
+        ratio = row['size'] / row['stored_size'] if row['stored_size'] else 0
+        print(f"  {row['airline']:<23} {row['objects']:6} object(s)  {row['size']:>12,} -> "
+              f"{row['stored_size']:>12,} bytes ({ratio:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+"""
+Change feed
+Each search's results are diffed against the previous result set for the same airline, route and
+date(s), and the differences are appended to data/change_feed/feed.ndjson as events:
+new_flight, removed_flight, price_up, price_down and points_changed. Every event carries its
+byte offset in the log, so consumers resume with read_feed(next_offset) (or the
+/api/flights/changes route) instead of re-reading results.
+Set FLYPOINTS_CHANGE_FEED=0 to turn it off.
+"""
+
+import json
+import os
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from shared.paths import data_path
+from shared.fare_history import DEFAULT_FARE_FAMILY, history_flight_number
+from shared.flight_record import Flight
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # Windows - appends are only serialized within this process
+
+
+ENABLED_ENV = 'FLYPOINTS_CHANGE_FEED'
+FEED_FILE = 'feed.ndjson'
+DEFAULT_READ_LIMIT = 500
+
+_append_lock = threading.Lock()
+_snapshot_lock = threading.Lock()
+
+
+def change_feed_enabled():
+    """True unless FLYPOINTS_CHANGE_FEED is set to 0/false/no"""
+    return os.environ.get(ENABLED_ENV, '1').strip().lower() not in ('0', 'false', 'no')
+
+
+def feed_path():
+    return data_path('change_feed', FEED_FILE)
+
+
+def _snapshot_path(airline, origin, destination, date, return_date=None):
+    name = '-'.join(filter(None, (airline, origin, destination, date, return_date)))
+    return data_path('change_feed', 'latest', f"{name}.json")
+
+
+def journey_key(record):
+    """Direction, flight number(s) and departure time identify a journey within a result set"""
+    departure = record.departure.strftime('%H:%M') if record.departure else ''
+    return f"{record.direction}|{history_flight_number(record.flight_numbers)}|{departure}"
+
+
+def snapshot(flights, origin, destination, date, return_date=None):
+    """{journey key: {'flight_number', 'direction', 'fares': {family: [price_paise, points]}}}"""
+    result = {}
+    for flight in flights:
+        record = Flight.from_dict(flight, origin, destination, date, return_date)
+        if not record.flight_numbers:
+            continue
+        fares = {fare.name: [fare.price_paise, fare.points] for fare in record.fares} or \
+                {DEFAULT_FARE_FAMILY: [record.price_paise, record.points]}
+        result[journey_key(record)] = {
+            'flight_number': ', '.join(record.flight_numbers),
+            'direction': record.direction,
+            'fares': fares,
+        }
+    return result
+
+
+def diff_snapshots(previous, current):
+    """Change events (without airline/route fields) between two snapshots - one pass over each"""
+    events = []
+    for key, journey in current.items():
+        before = previous.get(key)
+        if before is None:
+            events.append({'type': 'new_flight', 'journey': key, 'flight_number': journey['flight_number'],
+                           'direction': journey['direction'], 'fares': journey['fares']})
+            continue
+
+        for family, (price, points) in journey['fares'].items():
+            old_price, old_points = before['fares'].get(family, (None, None))
+            base = {'journey': key, 'flight_number': journey['flight_number'],
+                    'direction': journey['direction'], 'fare_family': family}
+            if price is not None and old_price is not None and price != old_price:
+                events.append({'type': 'price_up' if price > old_price else 'price_down', **base,
+                               'old_price_paise': old_price, 'new_price_paise': price})
+            if points is not None and old_points is not None and points != old_points:
+                events.append({'type': 'points_changed', **base, 'old_points': old_points, 'new_points': points})
+
+    for key, journey in previous.items():
+        if key not in current:
+            events.append({'type': 'removed_flight', 'journey': key, 'flight_number': journey['flight_number'],
+                           'direction': journey['direction']})
+    return events
+
+
+def append_events(events):
+    """Append events to the feed, setting each one's 'offset'. Returns the offset after the last one."""
+    path = feed_path()
+    with _append_lock, open(path, 'ab') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            f.seek(0, os.SEEK_END)
+            offset = f.tell()
+            lines = []
+            for event in events:
+                event['offset'] = offset
+                line = (json.dumps(event, ensure_ascii=False, separators=(',', ':')) + "\n").encode('utf-8')
+                lines.append(line)
+                offset += len(line)
+            f.write(b''.join(lines))
+            f.flush()
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+    return offset
+
+
+@contextmanager
+def _locked(path):
+    """Hold an exclusive lock on path's .lock file, so one search at a time diffs and replaces a baseline"""
+    with _snapshot_lock, open(f"{path}.lock", 'a') as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def publish_changes(airline, flights, origin, destination, date, return_date=None, budget=None):
+    """
+    Diff a successful search against the previous one for the same airline/route/date(s), append
+    the changes to the feed and keep this result set as the new baseline.
+    Searches whose budget was cancelled (a hedge that lost) or ran out are skipped - a partial
+    result set would show up as removed flights and become the baseline.
+    Never raises - the feed must not fail a search. Returns the number of events written.
+    """
+    if not change_feed_enabled() or not flights:
+        return 0
+    if budget is not None and (budget.cancelled or budget.expired()):
+        return 0
+    try:
+        path = _snapshot_path(airline, origin, destination, date, return_date)
+        current = snapshot(flights, origin, destination, date, return_date)
+        with _locked(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    previous = json.load(f)
+            except (OSError, ValueError):
+                previous = None
+
+            # The first search of a route only sets the baseline
+            events = diff_snapshots(previous, current) if previous is not None else []
+            if events:
+                common = {'at': datetime.now().isoformat(timespec='seconds'), 'airline': airline,
+                          'origin': origin, 'destination': destination, 'date': date, 'return_date': return_date}
+                append_events([{**common, **event} for event in events])
+
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(current, f, separators=(',', ':'))
+            os.replace(tmp_path, path)
+        return len(events)
+    except Exception as e:
+        print(f"Could not publish fare changes: {e}")
+        return 0
+
+
+def read_feed(offset=0, limit=DEFAULT_READ_LIMIT):
+    """
+    (events, next_offset) from a byte offset - pass next_offset back to resume.
+    A line still being written (no trailing newline yet) is left for the next read.
+    """
+    try:
+        f = open(feed_path(), 'rb')
+    except OSError:
+        return [], offset
+    events = []
+    with f:
+        f.seek(offset)
+        while len(events) < limit:
+            line = f.readline()
+            if not line.endswith(b"\n"):
+                break
+            offset += len(line)
+            try:
+                events.append(json.loads(line))
+            except ValueError:
+                continue
+    return events, offset
@@ -0,0 +1,308 @@
+"""
+Circuit breakers
+One breaker per airline and path - 'browser' (a full page-load search) and 'api' (an airline API
+call replayed from a loaded page) - in data/circuit_breaker.db, shared by every process.
+
+The scrapers report each search's outcome: ok, error, or blocked (the airline's bot protection
+answered instead of the site). A closed breaker trips open when at least half of the last
+WINDOW outcomes from the past WINDOW_MINUTES failed (given MIN_SAMPLES), or on BLOCKS_TO_TRIP
+blocks in a row. While it is open, searches skip the airline at once - the search routes serve
+the last good result or the HTML snapshot instead of running the retry ladder for minutes.
+After a cooldown (doubling on each re-trip, up to MAX_OPEN_SECONDS) the breaker goes half-open
+and lets a single probe search through: success closes it, failure opens it again.
+
+    python -m shared.circuit_breaker status
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime, timedelta
+
+from shared.paths import data_path
+
+
+ENABLED_ENV = 'FLYPOINTS_CIRCUIT_BREAKER'
+
+PATHS = ('browser', 'api')
+OUTCOMES = ('ok', 'error', 'blocked')
+
+WINDOW = 10
+WINDOW_MINUTES = 30
+MIN_SAMPLES = 4
+FAILURE_RATE = 0.5
+BLOCKS_TO_TRIP = 2
+OPEN_SECONDS = 5 * 60
+MAX_OPEN_SECONDS = 30 * 60
+# A probe that never reports back (killed search) frees the half-open slot after this long
+PROBE_TIMEOUT_SECONDS = 6 * 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outcomes (
+    id INTEGER PRIMARY KEY,
+    airline TEXT NOT NULL,
+    path TEXT NOT NULL,
+    at TEXT NOT NULL,
+    outcome TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_outcomes_breaker ON outcomes (airline, path, at);
+CREATE TABLE IF NOT EXISTS breakers (
+    airline TEXT NOT NULL,
+    path TEXT NOT NULL,
+    state TEXT NOT NULL,
+    since TEXT NOT NULL,
+    trips INTEGER NOT NULL DEFAULT 0,
+    probe_at TEXT,
+    reason TEXT,
+    PRIMARY KEY (airline, path)
+);
+"""
+
+
+def circuit_breaker_enabled():
+    """True unless FLYPOINTS_CIRCUIT_BREAKER is set to 0/false/no"""
+    return os.environ.get(ENABLED_ENV, '1').strip().lower() not in ('0', 'false', 'no')
+
+
+def _iso(moment):
+    return moment.isoformat(timespec='seconds')
+
+
+def open_seconds(trips):
+    """Cooldown before the trips-th consecutive trip is probed"""
+    return min(MAX_OPEN_SECONDS, OPEN_SECONDS * 2 ** max(0, trips - 1))
+
+
+class CircuitBreakers:
+    """Breaker state per (airline, path) and the outcomes that drive it, in SQLite"""
+
+    def __init__(self, path=None):
+        self.path = path or data_path('circuit_breaker.db')
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _transaction(self, work):
+        """Run work(conn) under a write lock, so two processes never both take the half-open probe"""
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            result = work(conn)
+            conn.execute("COMMIT")
+            return result
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _breaker(conn, airline, path):
+        row = conn.execute("SELECT * FROM breakers WHERE airline = ? AND path = ?", (airline, path)).fetchone()
+        return dict(row) if row else {'airline': airline, 'path': path, 'state': 'closed', 'since': None,
+                                      'trips': 0, 'probe_at': None, 'reason': None}
+
+    @staticmethod
+    def _save(conn, breaker):
+        conn.execute(
+            "INSERT INTO breakers (airline, path, state, since, trips, probe_at, reason) VALUES "
+            "(:airline, :path, :state, :since, :trips, :probe_at, :reason) ON CONFLICT (airline, path) DO UPDATE SET "
+            "state = excluded.state, since = excluded.since, trips = excluded.trips, probe_at = excluded.probe_at, "
+            "reason = excluded.reason", breaker
+        )
+
+    def _trip_reason(self, conn, airline, path, now):
+        """Why the recent outcomes should open the breaker, or None"""
+        recent = [row['outcome'] for row in conn.execute(
+            "SELECT outcome FROM outcomes WHERE airline = ? AND path = ? AND at >= ? ORDER BY id DESC LIMIT ?",
+            (airline, path, _iso(now - timedelta(minutes=WINDOW_MINUTES)), WINDOW))]
+        if len(recent) >= BLOCKS_TO_TRIP and all(outcome == 'blocked' for outcome in recent[:BLOCKS_TO_TRIP]):
+            return f"{BLOCKS_TO_TRIP} blocked searches in a row"
+        failures = sum(outcome != 'ok' for outcome in recent)
+        if len(recent) >= MIN_SAMPLES and failures / len(recent) >= FAILURE_RATE:
+            return f"{failures} of the last {len(recent)} searches failed"
+        return None
+
+    def record(self, airline, path, outcome, now=None):
+        """Log a search outcome and move the breaker; returns its state afterwards"""
+        if path not in PATHS or outcome not in OUTCOMES:
+            raise ValueError(f"unknown path/outcome: {path}/{outcome}")
+        now = now or datetime.now()
+
+        def work(conn):
+            conn.execute("INSERT INTO outcomes (airline, path, at, outcome) VALUES (?, ?, ?, ?)",
+                         (airline, path, _iso(now), outcome))
+            # Outcomes older than the window never count again
+            conn.execute("DELETE FROM outcomes WHERE airline = ? AND path = ? AND at < ?",
+                         (airline, path, _iso(now - timedelta(minutes=WINDOW_MINUTES))))
+            breaker = self._breaker(conn, airline, path)
+            if breaker['state'] == 'half_open':
+                if outcome == 'ok':
+                    # A recovered airline starts a fresh window, not one full of the failures that tripped it
+                    conn.execute("DELETE FROM outcomes WHERE airline = ? AND path = ? AND at < ?",
+                                 (airline, path, _iso(now)))
+                    breaker.update(state='closed', since=_iso(now), trips=0, probe_at=None, reason=None)
+                else:
+                    breaker.update(state='open', since=_iso(now), trips=breaker['trips'] + 1, probe_at=None,
+                                   reason=f"probe search {'was blocked' if outcome == 'blocked' else 'failed'}")
+                self._save(conn, breaker)
+            elif breaker['state'] == 'closed' and outcome != 'ok':
+                reason = self._trip_reason(conn, airline, path, now)
+                if reason:
+                    breaker.update(state='open', since=_iso(now), trips=breaker['trips'] + 1, reason=reason)
+                    self._save(conn, breaker)
+            return breaker['state']
+
+        return self._transaction(work)
+
+    def allow(self, airline, path, now=None):
+        """
+        Whether a search may use this path now: {'allowed', 'state', 'reason', 'retry_after'}.
+        An open breaker past its cooldown turns half-open and allows exactly one caller (the probe).
+        """
+        now = now or datetime.now()
+
+        def work(conn):
+            breaker = self._breaker(conn, airline, path)
+            if breaker['state'] == 'closed':
+                return {'allowed': True, 'state': 'closed', 'reason': None, 'retry_after': None}
+
+            if breaker['state'] == 'open':
+                reopen_at = datetime.fromisoformat(breaker['since']) + timedelta(seconds=open_seconds(breaker['trips']))
+                if now < reopen_at:
+                    return {'allowed': False, 'state': 'open', 'reason': breaker['reason'],
+                            'retry_after': _iso(reopen_at)}
+            elif breaker['probe_at'] and now < datetime.fromisoformat(breaker['probe_at']) + \
+                    timedelta(seconds=PROBE_TIMEOUT_SECONDS):
+                return {'allowed': False, 'state': 'half_open', 'reason': 'a probe search is in progress',
+                        'retry_after': None}
+
+            breaker.update(state='half_open', probe_at=_iso(now))
+            self._save(conn, breaker)
+            return {'allowed': True, 'state': 'half_open', 'reason': 'probe search', 'retry_after': None}
+
+        return self._transaction(work)
+
+    def status(self, now=None):
+        """Every breaker that has seen outcomes, with its recent failure rate"""
+        now = now or datetime.now()
+        since = _iso(now - timedelta(minutes=WINDOW_MINUTES))
+        with self._connect() as conn:
+            breakers = {(row['airline'], row['path']): dict(row) for row in conn.execute("SELECT * FROM breakers")}
+            counts = {(row['airline'], row['path']): row for row in conn.execute(
+                "SELECT airline, path, COUNT(*) AS searches, SUM(outcome != 'ok') AS failures FROM outcomes "
+                "WHERE at >= ? GROUP BY airline, path", (since,))}
+        status = []
+        for key in sorted(set(breakers) | set(counts)):
+            breaker = breakers.get(key) or {'state': 'closed', 'since': None, 'trips': 0, 'reason': None}
+            count = counts.get(key)
+            retry_after = None
+            if breaker['state'] == 'open':
+                retry_after = _iso(datetime.fromisoformat(breaker['since']) + timedelta(seconds=open_seconds(breaker['trips'])))
+            status.append({'airline': key[0], 'path': key[1], 'state': breaker['state'], 'since': breaker['since'],
+                           'reason': breaker['reason'], 'retry_after': retry_after,
+                           'recent_searches': count['searches'] if count else 0,
+                           'recent_failures': count['failures'] if count else 0})
+        return status
+
+    def reset(self, airline, path=None):
+        """Close the airline's breakers (all paths unless one is given) and forget their outcomes"""
+        paths = [path] if path else list(PATHS)
+
+        def work(conn):
+            for each in paths:
+                conn.execute("DELETE FROM breakers WHERE airline = ? AND path = ?", (airline, each))
+                conn.execute("DELETE FROM outcomes WHERE airline = ? AND path = ?", (airline, each))
+
+        self._transaction(work)
+
+
+def breaker_verdict(airline, path):
+    """
+    CircuitBreakers.allow() for a search path - allowed (closed) when breakers are off or the
+    breaker store cannot be read
+    """
+    if not circuit_breaker_enabled():
+        return {'allowed': True, 'state': 'closed', 'reason': 'circuit breakers disabled', 'retry_after': None}
+    try:
+        return CircuitBreakers().allow(airline, path)
+    except Exception as e:
+        print(f"Could not check circuit breaker: {e}")
+        return {'allowed': True, 'state': 'closed', 'reason': 'circuit breaker unknown', 'retry_after': None}
+
+
+def breaker_allows(airline, path):
+    """(allowed, reason) for a search path - fails open when the breaker store cannot be read"""
+    verdict = breaker_verdict(airline, path)
+    return verdict['allowed'], verdict['reason']
+
+
+def record_search_outcome(airline, path, outcome, budget=None):
+    """
+    Report a search outcome ('ok', 'error' or 'blocked'). Searches cancelled by a hedge that
+    already won are not counted. Never raises.
+    """
+    if not circuit_breaker_enabled() or (budget is not None and budget.cancelled):
+        return
+    try:
+        state = CircuitBreakers().record(airline, path, outcome)
+        if state == 'open' and outcome != 'ok':
+            print(f"  Circuit breaker for {airline} ({path}) is open")
+    except Exception as e:
+        print(f"Could not record circuit breaker outcome: {e}")
+
+
+def main():
+    """Show, check or reset circuit breakers"""
+    parser = argparse.ArgumentParser(description="Per-airline circuit breakers")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    status_parser = subparsers.add_parser('status', help="State of every breaker")
+    allow_parser = subparsers.add_parser('allow', help="May a search use this path now? (takes the probe)")
+    allow_parser.add_argument('airline')
+    allow_parser.add_argument('path', choices=PATHS)
+    reset_parser = subparsers.add_parser('reset', help="Close an airline's breakers")
+    reset_parser.add_argument('airline')
+    reset_parser.add_argument('path', nargs='?', choices=PATHS)
+    for subparser in (status_parser, allow_parser):
+        subparser.add_argument('--json', action='store_true', help="Print JSON only")
+    args = parser.parse_args()
+
+    breakers = CircuitBreakers()
+    if args.command == 'reset':
+        breakers.reset(args.airline, args.path)
+        print(f"Reset {args.airline} {args.path or 'breakers'}")
+        return
+
+    if args.command == 'allow':
+        verdict = breaker_verdict(args.airline, args.path)
+        if args.json:
+            print(json.dumps({"success": True, **verdict}))
+        else:
+            print(f"{args.airline} {args.path}: {'allowed' if verdict['allowed'] else 'blocked'} "
+                  f"({verdict['state']}{', ' + verdict['reason'] if verdict['reason'] else ''})")
+        return
+
+    status = breakers.status()
+    if args.json:
+        print(json.dumps({"success": True, "breakers": status}))
+        return
+    if not status:
+        print("No search outcomes recorded yet")
+    for breaker in status:
+        detail = f"  {breaker['reason']}" if breaker['reason'] else ''
+        retry = f"  probe after {breaker['retry_after']}" if breaker['retry_after'] else ''
+        print(f"  {breaker['airline']:<9} {breaker['path']:<8} {breaker['state']:<9} "
+              f"{breaker['recent_failures']}/{breaker['recent_searches']} failed recently{detail}{retry}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,268 @@
+"""
+Multi-carrier connections
+Builds itineraries that combine airlines (e.g. a SpiceJet/IndiGo domestic leg into an Etihad
+long-haul) from stored or fresh flights. Legs are indexed per airport in arrays sorted by
+departure minute, so the onward legs of an arrival are the slice between two binary searches
+(arrival + minimum layover, arrival + maximum layover) rather than an all-pairs join.
+Connections between different airlines are separate tickets (self-transfer) and need a longer
+minimum layover to collect and re-check bags.
+
+    python -m shared.connections BLR AUH 2025-12-18 --sort price --top 10
+"""
+
+import argparse
+import json
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timedelta
+
+from shared.fare_history import FareHistory
+from shared.flight_record import Flight
+
+
+MIN_LAYOVER = 60              # minutes, same airline (through-checked)
+SELF_TRANSFER_LAYOVER = 180   # minutes, different airlines (separate tickets)
+MAX_LAYOVER = 12 * 60
+MAX_LEGS = 2
+SORT_KEYS = ('price', 'points', 'duration')
+# Loyalty points earned - more is better, so these rank highest first
+DESCENDING_KEYS = ('points',)
+
+EPOCH = datetime(2000, 1, 1)
+
+
+def _minute(moment):
+    return int((moment - EPOCH).total_seconds() // 60)
+
+
+class Itinerary:
+    """One or more legs, each departing after the previous one lands"""
+
+    __slots__ = ('legs',)
+
+    def __init__(self, legs):
+        self.legs = tuple(legs)
+
+    @property
+    def price_paise(self):
+        prices = [leg.price_paise for leg in self.legs]
+        return sum(prices) if None not in prices else None
+
+    @property
+    def points(self):
+        points = [leg.points for leg in self.legs]
+        return sum(points) if None not in points else None
+
+    @property
+    def duration_minutes(self):
+        return _minute(self.legs[-1].arrival) - _minute(self.legs[0].departure)
+
+    @property
+    def self_transfer(self):
+        return len({leg.airline for leg in self.legs}) > 1
+
+    def layovers(self):
+        return [_minute(after.departure) - _minute(before.arrival) for before, after in zip(self.legs, self.legs[1:])]
+
+    def sort_key(self, by='price'):
+        """Sort key for 'price' (cheapest first), 'points' (most earned first) or 'duration' - missing values sort last"""
+        value = {'price': self.price_paise, 'points': self.points, 'duration': self.duration_minutes}[by]
+        if value is not None and by in DESCENDING_KEYS:
+            value = -value
+        return (value is None, value if value is not None else 0, self.duration_minutes)
+
+    def to_record(self):
+        return {
+            'origin': self.legs[0].origin,
+            'destination': self.legs[-1].destination,
+            'departure': self.legs[0].departure.isoformat(timespec='minutes'),
+            'arrival': self.legs[-1].arrival.isoformat(timespec='minutes'),
+            'duration_minutes': self.duration_minutes,
+            'price_paise': self.price_paise,
+            'points': self.points,
+            'airlines': list(dict.fromkeys(leg.airline for leg in self.legs)),
+            'self_transfer': self.self_transfer,
+            'layover_minutes': self.layovers(),
+            'legs': [leg.to_record() for leg in self.legs],
+        }
+
+
+class _Departures:
+    """Legs sorted by departure minute, with the minutes in a parallel array for bisect"""
+
+    __slots__ = ('minutes', 'legs')
+
+    def __init__(self, legs):
+        legs.sort(key=lambda leg: leg.departure)
+        self.legs = legs
+        self.minutes = [_minute(leg.departure) for leg in legs]
+
+    def between(self, first, last):
+        """Legs departing from minute first to minute last (inclusive)"""
+        return self.legs[bisect_left(self.minutes, first):bisect_right(self.minutes, last)]
+
+
+class ScheduleIndex:
+    """Legs indexed by (airport, departure minute) and by (route, departure minute)"""
+
+    def __init__(self, legs):
+        by_airport, by_route = {}, {}
+        for leg in legs:
+            if not (leg.origin and leg.destination and leg.departure and leg.arrival):
+                continue
+            by_airport.setdefault(leg.origin, []).append(leg)
+            by_route.setdefault((leg.origin, leg.destination), []).append(leg)
+        self.by_airport = {airport: _Departures(group) for airport, group in by_airport.items()}
+        self.by_route = {route: _Departures(group) for route, group in by_route.items()}
+
+    def __len__(self):
+        return sum(len(departures.legs) for departures in self.by_airport.values())
+
+    def _onward(self, leg, destination, final, min_layover, self_transfer_layover, max_layover):
+        """Legs that can follow leg (towards destination only when it must be the last one)"""
+        departures = self.by_route.get((leg.destination, destination)) if final else self.by_airport.get(leg.destination)
+        if not departures:
+            return []
+        arrived = _minute(leg.arrival)
+        # The shorter same-airline minimum bounds the search; self-transfers are checked per leg
+        candidates = departures.between(arrived + min(min_layover, self_transfer_layover), arrived + max_layover)
+        return [onward for onward in candidates
+                if onward.airline == leg.airline or
+                _minute(onward.departure) - arrived >= self_transfer_layover]
+
+    def itineraries(self, origin, destination, date, max_legs=MAX_LEGS, min_layover=MIN_LAYOVER,
+                    self_transfer_layover=SELF_TRANSFER_LAYOVER, max_layover=MAX_LAYOVER, multi_carrier_only=False,
+                    prune=None):
+        """
+        Generate every itinerary from origin departing on date (YYYY-MM-DD) to destination.
+        prune(legs) -> True drops a partial itinerary and everything that would extend it.
+        """
+        first = self.by_airport.get(origin.upper())
+        if not first:
+            return
+        destination = destination.upper()
+        day = _minute(datetime.strptime(date, '%Y-%m-%d'))
+
+        stack = [(leg,) for leg in first.between(day, day + 24 * 60 - 1)]
+        while stack:
+            legs = stack.pop()
+            if prune and prune(legs):
+                continue
+            last = legs[-1]
+            if last.destination == destination:
+                if not multi_carrier_only or len({leg.airline for leg in legs}) > 1:
+                    yield Itinerary(legs)
+                continue
+            if len(legs) == max_legs:
+                continue
+            visited = {leg.origin for leg in legs}
+            final = len(legs) + 1 == max_legs
+            for onward in self._onward(last, destination, final, min_layover, self_transfer_layover, max_layover):
+                if onward.destination not in visited:
+                    stack.append(legs + (onward,))
+
+    def best(self, origin, destination, date, sort_by='price', top=20, **constraints):
+        """The `top` itineraries ranked by 'price', 'points' or 'duration'"""
+        # Price and elapsed time only grow as legs are added, so a partial itinerary's key bounds every
+        # completion: once `top` are found, branches that cannot beat the worst are cut. Points grow too,
+        # but more is better, so a partial itinerary bounds nothing - except that one with a leg missing
+        # its points can never earn any, and cannot beat a ranking whose worst entry has them.
+        ranked = []  # sorted (key, sequence, itinerary), at most `top`
+
+        def prune(legs):
+            if len(ranked) < top:
+                return False
+            key = Itinerary(legs).sort_key(sort_by)
+            if sort_by in DESCENDING_KEYS:
+                return key[0] > ranked[-1][0][0]
+            return key >= ranked[-1][0]
+
+        for sequence, itinerary in enumerate(self.itineraries(origin, destination, date, prune=prune, **constraints)):
+            insort(ranked, (itinerary.sort_key(sort_by), sequence, itinerary))
+            if len(ranked) > top:
+                ranked.pop()
+        return [itinerary for _, _, itinerary in ranked]
+
+
+def legs_from_history(date_from, date_to, history=None):
+    """
+    Latest capture of every stored flight departing between two dates (YYYY-MM-DD), at its
+    cheapest fare family, as Flight legs. Rows recorded before arrival times were stored are skipped.
+    """
+    query = (
+        "SELECT f.* FROM fares f JOIN ("
+        "  SELECT flight_number, origin, destination, departure_date, MAX(captured_at) AS captured_at FROM fares"
+        "  WHERE departure_date >= ? AND departure_date <= ? AND arrival_time IS NOT NULL"
+        "  GROUP BY flight_number, origin, destination, departure_date"
+        ") latest USING (flight_number, origin, destination, departure_date, captured_at) "
+        "ORDER BY f.price_paise IS NULL, f.price_paise"
+    )
+    history = history or FareHistory()
+    with history._connect() as conn:
+        rows = conn.execute(query, (date_from, date_to)).fetchall()
+
+    legs = {}
+    for row in rows:
+        key = (row['flight_number'], row['origin'], row['destination'], row['departure_date'])
+        if key in legs:
+            continue  # rows are cheapest first
+        departure = datetime.strptime(f"{row['departure_date']} {row['departure_time']}", '%Y-%m-%d %H:%M')
+        arrival = datetime.strptime(f"{row['arrival_date']} {row['arrival_time']}", '%Y-%m-%d %H:%M')
+        legs[key] = Flight(row['airline'], row['flight_number'].split(','), row['origin'], row['destination'],
+                           departure, arrival, _minute(arrival) - _minute(departure), row['price_paise'],
+                           row['points'])
+    return list(legs.values())
+
+
+def legs_from_search(flights, origin, destination, date, return_date=None):
+    """A fresh search's flight dicts as Flight legs"""
+    return [Flight.from_dict(flight, origin, destination, date, return_date) for flight in flights]
+
+
+def main():
+    """Print the best connections between two airports from the fare history"""
+    parser = argparse.ArgumentParser(description="Multi-carrier connections from stored flights")
+    parser.add_argument('origin')
+    parser.add_argument('destination')
+    parser.add_argument('date', help="Departure date of the first leg (YYYY-MM-DD)")
+    parser.add_argument('--sort', choices=SORT_KEYS, default='price')
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--max-legs', type=int, default=MAX_LEGS)
+    parser.add_argument('--min-layover', type=int, default=MIN_LAYOVER, help="Minutes, same airline")
+    parser.add_argument('--self-transfer-layover', type=int, default=SELF_TRANSFER_LAYOVER,
+                        help="Minutes, between different airlines")
+    parser.add_argument('--max-layover', type=int, default=MAX_LAYOVER, help="Minutes")
+    parser.add_argument('--multi-carrier', action='store_true', help="Only itineraries combining airlines")
+    parser.add_argument('--json', action='store_true', help="Print JSON only")
+    args = parser.parse_args()
+
+    # Later legs can depart on the following days
+    first_day = datetime.strptime(args.date, '%Y-%m-%d')
+    last_day = first_day + timedelta(days=1 + (args.max_layover * (args.max_legs - 1)) // (24 * 60))
+    index = ScheduleIndex(legs_from_history(args.date, last_day.strftime('%Y-%m-%d')))
+    best = index.best(args.origin, args.destination, args.date, args.sort, args.top, max_legs=args.max_legs,
+                      min_layover=args.min_layover, self_transfer_layover=args.self_transfer_layover,
+                      max_layover=args.max_layover, multi_carrier_only=args.multi_carrier)
+
+    if args.json:
+        print(json.dumps({"success": True, "itineraries": [itinerary.to_record() for itinerary in best]},
+                         ensure_ascii=True))
+        return
+
+    if not best:
+        print(f"No connections found among {len(index)} stored leg(s) - search the legs first")
+        return
+    for itinerary in best:
+        price = f"₹{itinerary.price_paise / 100:,.0f}" if itinerary.price_paise is not None else 'N/A'
+        points = f"{itinerary.points:,} pts" if itinerary.points is not None else ''
+        hours, minutes = divmod(itinerary.duration_minutes, 60)
+        print(f"{price:>10} {points:>10}  {hours}h {minutes}m"
+              f"{'  (self-transfer)' if itinerary.self_transfer else ''}")
+        for leg, layover in zip(itinerary.legs, itinerary.layovers() + [None]):
+            print(f"    {leg.flight_numbers[0]:<8} {leg.origin} {leg.departure:%d %b %H:%M} -> "
+                  f"{leg.destination} {leg.arrival:%H:%M}  {leg.airline}")
+            if layover is not None:
+                print(f"    {'':<8} {layover // 60}h {layover % 60}m in {leg.destination}")
+
+
+if __name__ == "__main__":
+    main()
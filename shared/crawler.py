@@ -0,0 +1,419 @@
+"""
+Background crawler
+Keeps popular searches fresh in the result store (data/results.db) so the search routes can
+answer them from there instead of waiting for a scrape.
+
+Every search the frontend makes is counted once, in the frontend's popularity sketch (see
+shared/popularity.py); the search routes only register the key here as a crawl candidate. Searches
+made with the `hot` command below are counted here instead. The crawler daemon turns those counts
+into a priority queue of (scraper, route, date) jobs:
+
+    priority = popularity x staleness x urgency
+
+- popularity: searches with exponential decay (halving every 72 hours)
+- staleness: age of the stored results / how long they stay fresh (only jobs past 1 are queued)
+- urgency: departures in the next few days change fastest and go first
+
+It runs the same scraper wrappers the API routes do, one at a time, and never starts one
+airline's scrapes closer together than CRAWL_INTERVALS. The scrapers' own hooks store the
+results, fare history and route serviceability; routes the serviceability index rules out are
+skipped, and so are airlines whose circuit breaker is open (shared/circuit_breaker.py).
+
+    python -m shared.crawler run
+    python -m shared.crawler queue
+"""
+
+import argparse
+import heapq
+import json
+import os
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from shared.paths import REPO_ROOT, data_path
+from shared.result_store import ResultStore
+from shared.serviceability import should_scrape
+from shared.circuit_breaker import breaker_allows
+from shared.popularity import PopularitySnapshot
+from shared.capture_archive import train_dictionaries
+
+
+# Scraper key -> (airline the results are stored under, API wrapper the routes also run)
+SCRAPERS = {
+    'spicejet': ('spicejet', os.path.join('attempt1', 'spicejet_scraper_api.py')),
+    'spicejet-international': ('spicejet', os.path.join('attempt1international', 'spicejet_scraper_api.py')),
+    'etihad': ('etihad', os.path.join('attempt1etihad', 'etihad_scraper_api.py')),
+}
+
+# Minimum seconds between two crawls of the same airline
+CRAWL_INTERVALS = {'spicejet': 90, 'etihad': 180}
+DEFAULT_CRAWL_INTERVAL = 120
+CRAWL_TIMEOUT = 5 * 60
+
+POPULARITY_HALF_LIFE_HOURS = 72
+# Decayed searches a job needs before it is crawled (a single search never qualifies)
+MIN_POPULARITY = 1.5
+# Stale results older than this many times their freshness window rank no higher
+MAX_STALENESS = 4
+POLL_SECONDS = 60
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    scraper TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    departure_date TEXT NOT NULL,
+    searches INTEGER NOT NULL DEFAULT 0,
+    popularity REAL NOT NULL DEFAULT 0,
+    popularity_at TEXT NOT NULL,
+    last_crawled TEXT,
+    last_status TEXT,
+    PRIMARY KEY (scraper, origin, destination, departure_date)
+);
+"""
+
+
+def freshness_seconds(departure_date, today=None):
+    """How long stored results stay fresh: fares move faster as departure approaches"""
+    days = (date.fromisoformat(departure_date) - (today or date.today())).days
+    if days <= 3:
+        return 30 * 60
+    if days <= 14:
+        return 2 * 60 * 60
+    return 6 * 60 * 60
+
+
+def decayed(popularity, since, now):
+    """popularity (as of since) decayed to now"""
+    hours = max(0.0, (now - since).total_seconds() / 3600)
+    return popularity * 0.5 ** (hours / POPULARITY_HALF_LIFE_HOURS)
+
+
+def crawl_interval(airline):
+    return CRAWL_INTERVALS.get(airline, DEFAULT_CRAWL_INTERVAL)
+
+
+def _error_message(process):
+    """The wrapper's {"error": ...} line, else the last line of stderr"""
+    lines = process.stderr.strip().splitlines()
+    if not lines:
+        return f"exit code {process.returncode}"
+    try:
+        return json.loads(lines[-1])['error']
+    except (ValueError, KeyError, TypeError):
+        return lines[-1][:200]
+
+
+class Job:
+    """One (scraper, route, date) to refresh"""
+
+    __slots__ = ('scraper', 'origin', 'destination', 'departure_date', 'popularity', 'staleness', 'priority')
+
+    def __init__(self, scraper, origin, destination, departure_date, popularity, staleness, priority):
+        self.scraper = scraper
+        self.origin = origin
+        self.destination = destination
+        self.departure_date = departure_date
+        self.popularity = popularity
+        self.staleness = staleness
+        self.priority = priority
+
+    @property
+    def airline(self):
+        return SCRAPERS[self.scraper][0]
+
+    def __lt__(self, other):
+        return self.priority > other.priority
+
+    def __repr__(self):
+        return f"{self.scraper} {self.origin}-{self.destination} {self.departure_date}"
+
+
+class Crawler:
+    """Search demand in SQLite and the crawl loop that keeps it fresh"""
+
+    def __init__(self, path=None, results=None):
+        self.path = path or data_path('crawler.db')
+        self.results = results or ResultStore()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        self.last_started = self._last_started()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _last_started(self):
+        """airline -> last crawl start, so a restarted daemon keeps to the intervals"""
+        started = {}
+        with self._connect() as conn:
+            for row in conn.execute("SELECT scraper, MAX(last_crawled) AS last FROM jobs "
+                                    "WHERE last_crawled IS NOT NULL GROUP BY scraper"):
+                if row['scraper'] in SCRAPERS:
+                    airline, last = SCRAPERS[row['scraper']][0], datetime.fromisoformat(row['last'])
+                    started[airline] = max(started.get(airline, last), last)
+        return started
+
+    # Demand
+
+    def record_search(self, scraper, origin, destination, departure_date, now=None):
+        """Count one search"""
+        now = now or datetime.now()
+        key = (scraper, origin.upper(), destination.upper(), departure_date)
+        with self._connect() as conn:
+            row = conn.execute("SELECT popularity, popularity_at FROM jobs WHERE scraper = ? AND origin = ? "
+                               "AND destination = ? AND departure_date = ?", key).fetchone()
+            popularity = 1.0
+            if row:
+                popularity += decayed(row['popularity'], datetime.fromisoformat(row['popularity_at']), now)
+            conn.execute(
+                "INSERT INTO jobs (scraper, origin, destination, departure_date, searches, popularity, popularity_at) "
+                "VALUES (?, ?, ?, ?, 1, ?, ?) ON CONFLICT (scraper, origin, destination, departure_date) "
+                "DO UPDATE SET searches = searches + 1, popularity = excluded.popularity, "
+                "popularity_at = excluded.popularity_at",
+                (*key, popularity, now.isoformat(timespec='seconds'))
+            )
+
+    def track(self, scraper, origin, destination, departure_date, now=None):
+        """Make a searched key a crawl candidate without counting it (the popularity sketch counts it)"""
+        now = now or datetime.now()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (scraper, origin, destination, departure_date, popularity_at) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (scraper, origin, destination, departure_date) DO NOTHING",
+                (scraper, origin.upper(), destination.upper(), departure_date, now.isoformat(timespec='seconds'))
+            )
+
+    def fresh_results(self, scraper, origin, destination, departure_date, now=None):
+        """(flight records, captured_at) if the stored results are still fresh, else None"""
+        now = now or datetime.now()
+        records, captured_at = self.results.latest_search(SCRAPERS[scraper][0], origin, destination, departure_date)
+        if not records:
+            return None
+        age = (now - datetime.fromisoformat(captured_at)).total_seconds()
+        if age > freshness_seconds(departure_date, now.date()):
+            return None
+        return records, captured_at
+
+    # Queue
+
+    def queue(self, now=None):
+        """
+        Heap of the jobs due for a refresh (heapq order: highest priority first).
+        Demand comes from the frontend's popularity sketch when it has saved one (its most searched
+        keys are candidates too), else from the searches counted here.
+        """
+        now = now or datetime.now()
+        today = now.date().isoformat()
+        with self._connect() as conn:
+            rows = conn.execute("SELECT * FROM jobs WHERE departure_date >= ?", (today,)).fetchall()
+        candidates = {(row['scraper'], row['origin'], row['destination'], row['departure_date']): row for row in rows}
+        demand = PopularitySnapshot.load()
+        if demand:
+            for _, *key in demand.top(len(demand.heavy_hitters), now.timestamp()):
+                if key[3] >= today:
+                    candidates.setdefault(tuple(key), None)
+
+        heap = []
+        for (scraper, origin, destination, departure_date), row in candidates.items():
+            if scraper not in SCRAPERS:
+                continue
+            if demand:
+                popularity = demand.score(scraper, origin, destination, departure_date, now.timestamp())
+            else:
+                popularity = decayed(row['popularity'], datetime.fromisoformat(row['popularity_at']), now)
+            if popularity < MIN_POPULARITY:
+                continue
+            _, captured_at = self.results.latest_search(SCRAPERS[scraper][0], origin, destination, departure_date)
+            refreshed = max(filter(None, (captured_at, row['last_crawled'] if row else None)), default=None)
+            fresh_for = freshness_seconds(departure_date, now.date())
+            if refreshed is None:
+                staleness = MAX_STALENESS
+            else:
+                staleness = min(MAX_STALENESS, (now - datetime.fromisoformat(refreshed)).total_seconds() / fresh_for)
+            if staleness < 1:
+                continue
+            days_out = (date.fromisoformat(departure_date) - now.date()).days
+            urgency = 1 / (1 + days_out / 7)
+            heap.append(Job(scraper, origin, destination, departure_date, popularity, staleness,
+                            popularity * staleness * urgency))
+        heapq.heapify(heap)
+        return heap
+
+    def wait_seconds(self, airline, now=None):
+        """Seconds until the airline may be crawled again"""
+        last = self.last_started.get(airline)
+        if last is None:
+            return 0
+        return max(0.0, crawl_interval(airline) - ((now or datetime.now()) - last).total_seconds())
+
+    def next_job(self, heap, now=None):
+        """
+        Pop the highest-priority job whose airline is not rate limited and whose circuit breaker
+        is closed (or half-open, the job then being its probe).
+        Returns (job, None), or (None, seconds until one could start) - None when the heap is empty.
+        """
+        now = now or datetime.now()
+        wait = None
+        broken = set()
+        while heap:
+            job = heapq.heappop(heap)
+            airline_wait = self.wait_seconds(job.airline, now)
+            if airline_wait > 0:
+                wait = airline_wait if wait is None else min(wait, airline_wait)
+                continue
+            scrape, reason = should_scrape(job.airline, job.origin, job.destination)
+            if not scrape:
+                self._finish(job, f"skipped: {reason}", now)
+                continue
+            # Jobs of a broken airline stay queued (unmarked) until its breaker lets a search through
+            if job.airline in broken or not breaker_allows(job.airline, 'browser')[0]:
+                broken.add(job.airline)
+                continue
+            return job, None
+        return None, wait
+
+    # Crawling
+
+    def _finish(self, job, status, now=None):
+        now = (now or datetime.now()).isoformat(timespec='seconds')
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (scraper, origin, destination, departure_date, popularity_at, last_crawled, "
+                "last_status) VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (scraper, origin, destination, departure_date) "
+                "DO UPDATE SET last_crawled = excluded.last_crawled, last_status = excluded.last_status",
+                (job.scraper, job.origin, job.destination, job.departure_date, now, now, status)
+            )
+
+    def crawl(self, job):
+        """Run the job's scraper (which stores its own results); returns a status line"""
+        started = datetime.now()
+        self.last_started[job.airline] = started
+        script = os.path.join(REPO_ROOT, SCRAPERS[job.scraper][1])
+        scraper_date = date.fromisoformat(job.departure_date).strftime('%d-%m-%Y')
+        try:
+            process = subprocess.run([sys.executable, script, job.origin, job.destination, scraper_date],
+                                     cwd=os.path.dirname(script), capture_output=True, text=True,
+                                     timeout=CRAWL_TIMEOUT)
+            if process.returncode == 0:
+                status = f"ok: {json.loads(process.stdout).get('count', 0)} flights"
+            else:
+                status = f"error: {_error_message(process)}"
+        except subprocess.TimeoutExpired:
+            status = f"error: timed out after {CRAWL_TIMEOUT}s"
+        except Exception as e:
+            status = f"error: {e}"
+        self._finish(job, status, started)
+        return status
+
+    def run(self, once=False, max_jobs=None, sleep=time.sleep):
+        """
+        Crawl due jobs until stopped. once: stop when no job is due (waiting out rate limits first).
+        max_jobs: stop after this many crawls.
+        """
+        crawled = 0
+        while max_jobs is None or crawled < max_jobs:
+            job, wait = self.next_job(self.queue())
+            if job is None:
+                # Idle time keeps the capture archive's dictionaries trained, off the search path
+                train_dictionaries()
+                if wait is None and once:
+                    return crawled
+                sleep(min(wait, POLL_SECONDS) if wait is not None else POLL_SECONDS)
+                continue
+            print(f"Crawling {job} (priority {job.priority:.2f})")
+            print(f"  {self.crawl(job)}")
+            crawled += 1
+        return crawled
+
+
+def hot_results(scraper, origin, destination, departure_date, count=True):
+    """
+    Count a search and return (flight records, captured_at) when fresh stored results can answer it,
+    else None. With count=False the search is only registered as a crawl candidate - for callers
+    whose searches the frontend's popularity sketch already counts. Never raises - a broken store
+    just means a live scrape.
+    """
+    try:
+        date.fromisoformat(departure_date)
+        crawler = Crawler()
+        if count:
+            crawler.record_search(scraper, origin, destination, departure_date)
+        else:
+            crawler.track(scraper, origin, destination, departure_date)
+        return crawler.fresh_results(scraper, origin, destination, departure_date)
+    except Exception as e:
+        print(f"Could not check stored results: {e}", file=sys.stderr)
+        return None
+
+
+def stored_results(scraper, origin, destination, departure_date):
+    """
+    The latest stored (flight records, captured_at) for a search, however old - the fallback while
+    an airline's circuit breaker is open. None when nothing is stored. Never raises.
+    """
+    try:
+        date.fromisoformat(departure_date)
+        records, captured_at = ResultStore().latest_search(SCRAPERS[scraper][0], origin, destination, departure_date)
+        return (records, captured_at) if records else None
+    except Exception as e:
+        print(f"Could not read stored results: {e}", file=sys.stderr)
+        return None
+
+
+def main():
+    """Run the crawler, show its queue, or answer a search from stored results"""
+    parser = argparse.ArgumentParser(description="Keep popular searches fresh in the result store")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    run_parser = subparsers.add_parser('run', help="Crawl due jobs (daemon)")
+    run_parser.add_argument('--once', action='store_true', help="Exit when no job is due")
+    run_parser.add_argument('--max-jobs', type=int)
+    queue_parser = subparsers.add_parser('queue', help="Jobs due for a refresh, highest priority first")
+    queue_parser.add_argument('--limit', type=int, default=20)
+    hot_parser = subparsers.add_parser('hot', help="Count a search and print fresh stored results")
+    stored_parser = subparsers.add_parser('stored', help="Print the latest stored results, however old")
+    for subparser in (hot_parser, stored_parser):
+        subparser.add_argument('scraper', choices=list(SCRAPERS))
+        subparser.add_argument('origin')
+        subparser.add_argument('destination')
+        subparser.add_argument('date', help="YYYY-MM-DD")
+        subparser.add_argument('--json', action='store_true', help="Print JSON only")
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        try:
+            crawled = Crawler().run(once=args.once, max_jobs=args.max_jobs)
+            print(f"Crawled {crawled} job(s)")
+        except KeyboardInterrupt:
+            print("Crawler stopped")
+        return
+
+    if args.command == 'queue':
+        heap = Crawler().queue()
+        if not heap:
+            print("No jobs due")
+        for job in heapq.nsmallest(args.limit, heap):
+            print(f"  {job.priority:7.2f}  {str(job):<40} popularity {job.popularity:.1f}  "
+                  f"staleness {job.staleness:.1f}")
+        return
+
+    lookup = hot_results if args.command == 'hot' else stored_results
+    hot = lookup(args.scraper, args.origin, args.destination, args.date)
+    if args.json:
+        print(json.dumps({"success": True, "hit": hot is not None, "flights": hot[0] if hot else [],
+                          "captured_at": hot[1] if hot else None}, ensure_ascii=True))
+        return
+    if hot is None:
+        print("No fresh stored results - the search scrapes live" if args.command == 'hot' else "No stored results")
+        return
+    print(f"{len(hot[0])} stored flight(s) from {hot[1]}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Debug artifacts
+Off by default - set FLYPOINTS_DEBUG_ARTIFACTS=1 to keep raw API responses and page sources.
+When on, each search gets its own directory under data/debug/<search id>/ and files are
+compressed (zstd if the zstandard package is installed, gzip otherwise) and written by a
+background thread, so scraping never waits on disk. Old searches are pruned by age and by a
+total size quota.
+"""
+
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+import time
+import uuid
+from datetime import datetime
+
+from shared.paths import data_path
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+ENABLED_ENV = 'FLYPOINTS_DEBUG_ARTIFACTS'
+MAX_TOTAL_BYTES = 200 * 1024 * 1024
+MAX_AGE_DAYS = 7
+
+
+def debug_artifacts_enabled():
+    """True when FLYPOINTS_DEBUG_ARTIFACTS is set to something other than 0/false/no"""
+    return os.environ.get(ENABLED_ENV, '').strip().lower() not in ('', '0', 'false', 'no')
+
+
+def _compress(raw):
+    """(compressed bytes, file extension)"""
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=10).compress(raw), '.zst'
+    return gzip.compress(raw, compresslevel=6), '.gz'
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def prune_debug_artifacts(root=None, max_total_bytes=MAX_TOTAL_BYTES, max_age_days=MAX_AGE_DAYS):
+    """Delete search directories older than max_age_days, then the oldest ones until under the quota"""
+    root = root or os.path.dirname(data_path('debug', 'x'))
+    try:
+        entries = [os.path.join(root, name) for name in os.listdir(root)]
+    except OSError:
+        return
+
+    searches = sorted((os.path.getmtime(path), path) for path in entries if os.path.isdir(path))
+    cutoff = time.time() - max_age_days * 86400
+    kept = []
+    for mtime, path in searches:
+        if mtime < cutoff:
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            kept.append((path, _dir_size(path)))
+
+    total = sum(size for _, size in kept)
+    for path, size in kept:
+        if total <= max_total_bytes:
+            break
+        shutil.rmtree(path, ignore_errors=True)
+        total -= size
+
+
+class DebugArtifacts:
+    """
+    Per-search debug artifact writer.
+    airline/origin/destination make up the search ID; enabled defaults to the environment setting.
+    """
+
+    def __init__(self, airline, origin='', destination='', enabled=None,
+                 max_total_bytes=MAX_TOTAL_BYTES, max_age_days=MAX_AGE_DAYS):
+        self.enabled = debug_artifacts_enabled() if enabled is None else enabled
+        stamp = datetime.now().strftime('%Y%m%d-%H%M%S')
+        route = f"{origin}-{destination}" if origin or destination else 'search'
+        self.search_id = f"{airline}-{route}-{stamp}-{uuid.uuid4().hex[:6]}"
+        self.max_total_bytes = max_total_bytes
+        self.max_age_days = max_age_days
+        self._queue = queue.Queue()
+        self._thread = None
+
+    def json(self, name, data):
+        """Queue a JSON artifact (serialized on the writer thread)"""
+        self._submit(name + '.json', lambda: json.dumps(data, ensure_ascii=False).encode('utf-8'))
+
+    def text(self, name, text, extension='.html'):
+        """Queue a text artifact such as a page source"""
+        self._submit(name + extension, lambda: text.encode('utf-8'))
+
+    def _submit(self, filename, serialize):
+        if not self.enabled:
+            return
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+        self._queue.put((filename, serialize))
+
+    def _run(self):
+        prune_debug_artifacts(max_total_bytes=self.max_total_bytes, max_age_days=self.max_age_days)
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            filename, serialize = item
+            try:
+                payload, extension = _compress(serialize())
+                path = data_path('debug', self.search_id, filename + extension)
+                with open(path, 'wb') as f:
+                    f.write(payload)
+                print(f"  Saved debug artifact {path}")
+            except Exception as e:
+                print(f"  Could not save debug artifact {filename}: {e}")
+        prune_debug_artifacts(max_total_bytes=self.max_total_bytes, max_age_days=self.max_age_days)
+
+    def close(self, timeout=10):
+        """Finish pending writes (waits up to timeout seconds)"""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
@@ -0,0 +1,157 @@
+"""
+Multi-passenger fare calculator
+One availability search that includes every passenger type returns a passengerFares entry
+(fareAmount + serviceCharges) per type in faresAvailable, so any passenger mix can be priced
+locally instead of re-scraping with different counts
+"""
+
+import re
+
+
+# Search URL passenger params -> passenger type codes used in passengerFares
+# (senior citizens are ADT fares carrying the SRCT discount code)
+PASSENGER_TYPES = {
+    'adult': 'ADT',
+    'child': 'CHD',
+    'infant': 'INF',
+    'srCitizen': 'SRCT',
+}
+
+SINGLE_ADULT = {'adult': 1, 'child': 0, 'infant': 0, 'srCitizen': 0}
+
+# Mix requested once so every bookable passenger type gets priced
+# (SpiceJet does not combine senior citizen fares with other passengers)
+PRICING_PASSENGERS = {'adult': 1, 'child': 1, 'infant': 1, 'srCitizen': 0}
+
+MAX_PASSENGERS = 9
+
+# serviceCharges types: 0 = fare, 1 / 7 = discounts, everything else is a tax or fee
+FARE_CHARGE_TYPE = 0
+DISCOUNT_CHARGE_TYPES = {1, 7}
+
+
+def parse_passengers(text):
+    """
+    Parse a passenger mix: 'all' (the pricing mix) or 'adult=2,child=1,infant=0'.
+    Returns a dict with every passenger type. Raises ValueError on bad input.
+    """
+    if text == 'all':
+        return dict(PRICING_PASSENGERS)
+
+    passengers = dict.fromkeys(PASSENGER_TYPES, 0)
+    for part in str(text).split(','):
+        match = re.match(r'^\s*(\w+)\s*=\s*(\d+)\s*$', part)
+        if not match or match.group(1) not in PASSENGER_TYPES:
+            raise ValueError(f"Invalid passengers '{text}'. Use 'all' or e.g. adult=2,child=1")
+        passengers[match.group(1)] = int(match.group(2))
+
+    if passengers['adult'] + passengers['srCitizen'] < 1:
+        raise ValueError("At least one adult or senior citizen is required")
+    if passengers['infant'] > passengers['adult'] + passengers['srCitizen']:
+        raise ValueError("Each infant must travel with an adult")
+    if sum(passengers.values()) - passengers['infant'] > MAX_PASSENGERS:
+        raise ValueError(f"At most {MAX_PASSENGERS} passengers (excluding infants)")
+    return passengers
+
+
+def passenger_query(passengers):
+    """Search URL params for a passenger mix (adult=1&child=0&srCitizen=0&infant=0)"""
+    passengers = passengers or SINGLE_ADULT
+    return '&'.join(f"{name}={int(passengers.get(name, 0))}" for name in ('adult', 'child', 'srCitizen', 'infant'))
+
+
+def is_single_adult(passengers):
+    """True when the mix is the default one-adult search"""
+    passengers = passengers or SINGLE_ADULT
+    return all(int(passengers.get(name, 0)) == count for name, count in SINGLE_ADULT.items())
+
+
+def passenger_type_code(passenger_fare):
+    """Passenger type of a passengerFares entry (discount codes such as SRCT win over ADT)"""
+    return passenger_fare.get('passengerDiscountCode') or passenger_fare.get('passengerType')
+
+
+def passenger_fare_breakdown(passenger_fare):
+    """
+    Per-passenger fare from a passengerFares entry: {'total', 'base', 'taxes', 'discount', 'loyalty_points'}.
+    Amounts are in rupees. fareAmount already includes taxes; the breakdown comes from serviceCharges.
+    """
+    base = taxes = discount = 0
+    for charge in passenger_fare.get('serviceCharges') or []:
+        amount = charge.get('amount')
+        if not isinstance(amount, (int, float)):
+            continue
+        if charge.get('type') == FARE_CHARGE_TYPE:
+            base += amount
+        elif charge.get('type') in DISCOUNT_CHARGE_TYPES:
+            discount += abs(amount)
+        else:
+            taxes += amount
+
+    total = passenger_fare.get('fareAmount')
+    if not isinstance(total, (int, float)):
+        if not base:
+            return None
+        total = base + taxes - discount
+
+    return {
+        'total': int(total),
+        'base': int(base),
+        'taxes': int(taxes),
+        'discount': int(discount),
+        'loyalty_points': int(passenger_fare.get('loyaltyPoints') or 0),
+    }
+
+
+def fare_components(fare_info):
+    """{passenger type: breakdown} for one faresAvailable entry"""
+    components = {}
+    for passenger_fare in fare_info.get('passengerFares') or []:
+        code = passenger_type_code(passenger_fare)
+        breakdown = passenger_fare_breakdown(passenger_fare)
+        if code and breakdown:
+            components[code] = breakdown
+    return components
+
+
+def journey_fare_components(fares, fares_available, family_by_product_class):
+    """
+    Fare components per fare family for a journey: {family: {passenger type: breakdown}}.
+    Where a family has several fare keys, the one with the cheapest adult fare is kept.
+    """
+    families = {}
+    if not isinstance(fares, dict) or not isinstance(fares_available, dict):
+        return families
+
+    for fare_key in fares:
+        fare_info = fares_available.get(fare_key)
+        if not isinstance(fare_info, dict):
+            continue
+
+        family = family_by_product_class.get(fare_info.get('productClass'))
+        components = fare_components(fare_info)
+        if not family or 'ADT' not in components:
+            continue
+
+        if family not in families or components['ADT']['total'] < families[family]['ADT']['total']:
+            families[family] = components
+
+    return families
+
+
+def price_passengers(components, passengers):
+    """
+    Total fare for a passenger mix from one family's components.
+    Returns {'total', 'by_type': {type: subtotal}} or None if a requested type was not priced.
+    """
+    by_type = {}
+    for name, count in (passengers or SINGLE_ADULT).items():
+        count = int(count)
+        if count <= 0:
+            continue
+        code = PASSENGER_TYPES.get(name)
+        if code not in components:
+            return None
+        by_type[code] = components[code]['total'] * count
+
+    return {'total': sum(by_type.values()), 'by_type': by_type}
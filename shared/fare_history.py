@@ -0,0 +1,289 @@
+"""
+Fare history
+Every successful search is appended to a SQLite time series in data/fare_history.db: one row per
+(airline, flight, route, departure date, capture time, fare family) with price and points.
+Writes are one batched transaction per search in WAL mode, so crawls and concurrent searches
+can append while other processes read. Set FLYPOINTS_FARE_HISTORY=0 to turn it off.
+
+    python -m shared.fare_history "SG 105" DEL BOM 2025-12-18 --days 14
+"""
+
+import argparse
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+from shared.paths import data_path
+from shared.flight_merge import normalize_flight_number
+from shared.flight_record import Flight
+
+
+ENABLED_ENV = 'FLYPOINTS_FARE_HISTORY'
+
+# Fare family recorded for airlines with a single price per flight (Etihad, IndiGo)
+DEFAULT_FARE_FAMILY = 'standard'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fares (
+    id INTEGER PRIMARY KEY,
+    airline TEXT NOT NULL,
+    flight_number TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    departure_date TEXT NOT NULL,
+    departure_time TEXT,
+    arrival_date TEXT,
+    arrival_time TEXT,
+    captured_at TEXT NOT NULL,
+    fare_family TEXT NOT NULL,
+    price_paise INTEGER,
+    points INTEGER
+);
+CREATE INDEX IF NOT EXISTS idx_fares_flight ON fares (flight_number, origin, destination, departure_date, captured_at);
+CREATE INDEX IF NOT EXISTS idx_fares_route ON fares (origin, destination, departure_date, captured_at);
+CREATE INDEX IF NOT EXISTS idx_fares_date ON fares (departure_date);
+CREATE TABLE IF NOT EXISTS route_days (
+    airline TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    departure_date TEXT NOT NULL,
+    price_paise INTEGER NOT NULL,
+    flight_number TEXT,
+    fare_family TEXT,
+    captured_at TEXT NOT NULL,
+    PRIMARY KEY (origin, destination, departure_date, airline)
+);
+"""
+
+COLUMNS = ('airline', 'flight_number', 'origin', 'destination', 'departure_date', 'departure_time',
+           'arrival_date', 'arrival_time', 'captured_at', 'fare_family', 'price_paise', 'points')
+
+# Columns added after the first release - created on databases that predate them
+ADDED_COLUMNS = {'arrival_date': 'TEXT', 'arrival_time': 'TEXT'}
+
+
+def fare_history_enabled():
+    """True unless FLYPOINTS_FARE_HISTORY is set to 0/false/no"""
+    return os.environ.get(ENABLED_ENV, '1').strip().lower() not in ('0', 'false', 'no')
+
+
+def history_flight_number(flight_numbers):
+    """'SG 105' -> 'SG105'; connecting itineraries are comma-joined ('EY219,EY11')"""
+    if isinstance(flight_numbers, str):
+        flight_numbers = flight_numbers.split(',')
+    return ','.join(filter(None, (normalize_flight_number(number) for number in flight_numbers)))
+
+
+class FareHistory:
+    """Append-only fare time series in SQLite"""
+
+    def __init__(self, path=None):
+        self.path = path or data_path('fare_history.db')
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            existing = {row['name'] for row in conn.execute("PRAGMA table_info(fares)")}
+            for column, column_type in ADDED_COLUMNS.items():
+                if existing and column not in existing:
+                    conn.execute(f"ALTER TABLE fares ADD COLUMN {column} {column_type}")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # Writing
+
+    def append(self, rows):
+        """Append row dicts (see COLUMNS) in one transaction. Returns the number of rows written."""
+        values = [tuple(row.get(column) for column in COLUMNS) for row in rows]
+        if not values:
+            return 0
+        with self._connect() as conn:
+            conn.executemany(
+                f"INSERT INTO fares ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})", values
+            )
+        return len(values)
+
+    def append_flights(self, airline, flights, origin, destination, date, return_date=None, captured_at=None):
+        """Append a search's flight dicts - one row per fare family with a price or points"""
+        captured_at = captured_at or datetime.now().isoformat(timespec='seconds')
+        rows = []
+        for flight in flights:
+            record = Flight.from_dict(flight, origin, destination, date, return_date)
+            flight_number = history_flight_number(record.flight_numbers)
+            if not flight_number or not record.origin or not record.destination:
+                continue
+
+            row = {
+                'airline': airline, 'flight_number': flight_number,
+                'origin': record.origin, 'destination': record.destination,
+                'departure_date': record.departure.strftime('%Y-%m-%d') if record.departure else (
+                    return_date if record.direction == 'return' and return_date else date),
+                'departure_time': record.departure.strftime('%H:%M') if record.departure else None,
+                'arrival_date': record.arrival.strftime('%Y-%m-%d') if record.arrival else None,
+                'arrival_time': record.arrival.strftime('%H:%M') if record.arrival else None,
+                'captured_at': captured_at,
+            }
+            fares = [(fare.name, fare.price_paise, fare.points) for fare in record.fares] or \
+                    [(DEFAULT_FARE_FAMILY, record.price_paise, record.points)]
+            for family, price_paise, points in fares:
+                if price_paise is not None or points is not None:
+                    rows.append({**row, 'fare_family': family, 'price_paise': price_paise, 'points': points})
+        written = self.append(rows)
+
+        # Cheapest fare per route and departure date from this search, for flexible-date queries
+        cheapest = {}
+        for row in rows:
+            key = (row['origin'], row['destination'], row['departure_date'])
+            if row['price_paise'] and (key not in cheapest or row['price_paise'] < cheapest[key]['price_paise']):
+                cheapest[key] = row
+        for (origin, destination), group in _group_by_route(cheapest.values()).items():
+            self.update_day_fares(airline, origin, destination, {
+                row['departure_date']: (row['price_paise'], row['flight_number'], row['fare_family']) for row in group
+            }, captured_at)
+        return written
+
+    def update_day_fares(self, airline, origin, destination, day_fares, captured_at=None):
+        """
+        Replace an airline's cheapest fare for some departure dates on a route.
+        day_fares: {'YYYY-MM-DD': price_paise or (price_paise, flight_number, fare_family)}
+        """
+        captured_at = captured_at or datetime.now().isoformat(timespec='seconds')
+        values = []
+        for day, fare in day_fares.items():
+            price_paise, flight_number, fare_family = fare if isinstance(fare, tuple) else (fare, None, None)
+            values.append((airline, origin.upper(), destination.upper(), day, int(price_paise), flight_number,
+                           fare_family, captured_at))
+        if not values:
+            return
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO route_days (airline, origin, destination, departure_date, price_paise, "
+                "flight_number, fare_family, captured_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)", values
+            )
+
+    # Reading
+
+    def price_history(self, flight_number, origin, destination, departure_date, days=14, fare_family=None):
+        """
+        Captures of one flight's fares for a departure date over the last `days` days, oldest first.
+        e.g. price_history('SG 105', 'DEL', 'BOM', '2025-12-18', days=14)
+        """
+        since = (datetime.now() - timedelta(days=days)).isoformat(timespec='seconds')
+        query = ("SELECT captured_at, fare_family, price_paise, points, departure_time FROM fares "
+                 "WHERE flight_number = ? AND origin = ? AND destination = ? AND departure_date = ? "
+                 "AND captured_at >= ?")
+        params = [history_flight_number(flight_number), origin.upper(), destination.upper(), departure_date, since]
+        if fare_family:
+            query += " AND fare_family = ?"
+            params.append(fare_family)
+        query += " ORDER BY captured_at"
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+
+    def day_fares(self, origin, destination, date_from=None, date_to=None, airlines=None):
+        """Latest cheapest fare per airline and departure date on a route (route_days rows)"""
+        query = "SELECT * FROM route_days WHERE origin = ? AND destination = ?"
+        params = [origin.upper(), destination.upper()]
+        if date_from:
+            query += " AND departure_date >= ?"
+            params.append(date_from)
+        if date_to:
+            query += " AND departure_date <= ?"
+            params.append(date_to)
+        if airlines:
+            query += f" AND airline IN ({', '.join('?' * len(airlines))})"
+            params.extend(airlines)
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query + " ORDER BY departure_date", params)]
+
+    def cheapest_days(self, origin, destination, date_from, date_to, k=5, airlines=None):
+        """
+        The k cheapest departure dates on a route between date_from and date_to (inclusive), cheapest
+        first - one row per date with the cheapest airline's fare. A range scan of the route_days
+        primary key: O(days in the window) rows read, in one query.
+        """
+        query = ("SELECT departure_date AS date, airline, MIN(price_paise) AS price_paise, flight_number, "
+                 "fare_family, captured_at FROM route_days "
+                 "WHERE origin = ? AND destination = ? AND departure_date BETWEEN ? AND ?")
+        params = [origin.upper(), destination.upper(), date_from, date_to]
+        if airlines:
+            query += f" AND airline IN ({', '.join('?' * len(airlines))})"
+            params.extend(airlines)
+        # SQLite takes the bare columns (airline, flight...) from the row holding the MIN
+        query += " GROUP BY departure_date ORDER BY price_paise, departure_date LIMIT ?"
+        params.append(k)
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query, params)]
+
+    def latest_fares(self, origin, destination, departure_date, max_age=None):
+        """
+        Most recent capture of every flight / fare family on a route and departure date.
+        max_age: optional seconds - older captures are ignored
+        """
+        query = ("SELECT f.* FROM fares f JOIN ("
+                 "  SELECT flight_number, fare_family, MAX(captured_at) AS captured_at FROM fares"
+                 "  WHERE origin = ? AND destination = ? AND departure_date = ? AND captured_at >= ?"
+                 "  GROUP BY flight_number, fare_family"
+                 ") latest USING (flight_number, fare_family, captured_at) "
+                 "WHERE f.origin = ? AND f.destination = ? AND f.departure_date = ? "
+                 "ORDER BY f.price_paise")
+        since = (datetime.now() - timedelta(seconds=max_age)).isoformat(timespec='seconds') if max_age else ''
+        route = (origin.upper(), destination.upper(), departure_date)
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query, (*route, since, *route))]
+
+
+def _group_by_route(rows):
+    groups = {}
+    for row in rows:
+        groups.setdefault((row['origin'], row['destination']), []).append(row)
+    return groups
+
+
+def record_fares(airline, flights, origin, destination, date, return_date=None):
+    """Append a successful search to the fare history. Never raises - history must not fail a search."""
+    if not fare_history_enabled() or not flights:
+        return
+    try:
+        FareHistory().append_flights(airline, flights, origin, destination, date, return_date)
+    except Exception as e:
+        print(f"Could not record fare history: {e}")
+
+
+def record_day_fares(airline, origin, destination, day_fares):
+    """Store calendar (lowest fare per day) results for flexible-date queries. Never raises."""
+    if not fare_history_enabled() or not day_fares:
+        return
+    try:
+        FareHistory().update_day_fares(airline, origin, destination, day_fares)
+    except Exception as e:
+        print(f"Could not record calendar fares: {e}")
+
+
+def main():
+    """Print a flight's fare history from the command line"""
+    parser = argparse.ArgumentParser(description="Fare history of one flight for a departure date")
+    parser.add_argument('flight_number', help="e.g. 'SG 105'")
+    parser.add_argument('origin')
+    parser.add_argument('destination')
+    parser.add_argument('departure_date', help="YYYY-MM-DD")
+    parser.add_argument('--days', type=int, default=14, help="Captures from the last N days")
+    parser.add_argument('--family', help="Only this fare family (e.g. spicesaver)")
+    args = parser.parse_args()
+
+    rows = FareHistory().price_history(args.flight_number, args.origin, args.destination, args.departure_date,
+                                       days=args.days, fare_family=args.family)
+    if not rows:
+        print("No fare history for that flight")
+        return
+    for row in rows:
+        price = f"₹{row['price_paise'] / 100:,.0f}" if row['price_paise'] is not None else 'N/A'
+        points = f"{row['points']:,} points" if row['points'] is not None else ''
+        print(f"  {row['captured_at']}  {row['fare_family']:<12} {price:>10}  {points}")
+
+
+if __name__ == "__main__":
+    main()
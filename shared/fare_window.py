@@ -0,0 +1,69 @@
+"""
+Cheapest-in-window queries
+A route's cheapest fare per departure date is kept in the fare history's route_days table by
+every search and calendar sweep. "Cheapest days between Dec 10 and Jan 5" is one grouped query
+over that table's primary key (see FareHistory.cheapest_days).
+
+    python -m shared.fare_window DEL DXB 2025-12-10 2026-01-05 --top 5
+"""
+
+import argparse
+import json
+import sys
+from datetime import datetime
+
+from shared.fare_history import FareHistory
+
+
+def _day(date):
+    return datetime.strptime(date, '%Y-%m-%d').date()
+
+
+def cheapest(origin, destination, date_from, date_to, airlines=None, history=None):
+    """Cheapest fare departing between date_from and date_to (inclusive), or None"""
+    days = (history or FareHistory()).cheapest_days(origin, destination, date_from, date_to, 1, airlines)
+    return days[0] if days else None
+
+
+def main():
+    """Cheapest days in a date window from the command line"""
+    parser = argparse.ArgumentParser(description="Cheapest stored fares for a route in a date window")
+    parser.add_argument('origin')
+    parser.add_argument('destination')
+    parser.add_argument('date_from', help="YYYY-MM-DD")
+    parser.add_argument('date_to', help="YYYY-MM-DD")
+    parser.add_argument('--top', type=int, default=5, help="Number of cheapest days")
+    parser.add_argument('--airline', action='append', help="Only these airlines (repeatable)")
+    parser.add_argument('--json', action='store_true', help="Print JSON only")
+    args = parser.parse_args()
+
+    try:
+        if _day(args.date_to) < _day(args.date_from):
+            raise ValueError("date_to is before date_from")
+    except ValueError as e:
+        error = f"Invalid date window: {e}"
+        if args.json:
+            sys.stderr.write(json.dumps({"error": error}) + "\n")
+        else:
+            print(f"Error: {error}")
+        sys.exit(1)
+
+    origin, destination = args.origin.upper(), args.destination.upper()
+    days = FareHistory().cheapest_days(origin, destination, args.date_from, args.date_to, args.top, args.airline)
+
+    if args.json:
+        print(json.dumps({"success": True, "origin": origin, "destination": destination,
+                          "from": args.date_from, "to": args.date_to, "days": days}, ensure_ascii=True))
+        return
+
+    if not days:
+        print("No stored fares for that route and window - run a search or calendar sweep first")
+        return
+    print(f"Cheapest days {origin} -> {destination}, {args.date_from} to {args.date_to}:")
+    for day in days:
+        flight = f"{day['flight_number']} ({day['fare_family']})" if day.get('flight_number') else 'calendar fare'
+        print(f"  {day['date']}  ₹{day['price_paise'] / 100:,.0f}  {day['airline']}  {flight}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+"""
+Flight merging
+Combines flights from several sources (API capture, rendered HTML, ...) in one pass:
+every flight is indexed once by its normalized flight number(s) and times, and each field is
+taken from the highest-priority source that has a value for it
+"""
+
+import re
+
+
+MISSING_VALUES = (None, '', 'N/A')
+
+# Fields that decide whether two flights are the same itinerary
+TIME_FIELDS = ('departure_time', 'arrival_time')
+
+
+def normalize_flight_number(text):
+    """'SG 105', 'sg105' and 'SG-105' all become 'SG105'"""
+    return re.sub(r'[^A-Z0-9]', '', str(text or '').upper())
+
+
+def flight_numbers(flight):
+    """Normalized flight numbers of an itinerary - connecting flights are comma-joined"""
+    value = flight.get('flight_number')
+    if value in MISSING_VALUES:
+        return ()
+    return tuple(number for number in (normalize_flight_number(part) for part in str(value).split(',')) if number)
+
+
+def normalize_time(text):
+    """'6:05', '06:05' and '06:05 AM' all become '06:05' (None if there is no time)"""
+    match = re.search(r'(\d{1,2}):(\d{2})', str(text or ''))
+    return f"{int(match.group(1)):02d}:{match.group(2)}" if match else None
+
+
+def _times(flight):
+    return tuple(normalize_time(flight.get(field)) for field in TIME_FIELDS)
+
+
+def _times_compatible(a, b):
+    """Times match where both sides have them"""
+    return all(x is None or y is None or x == y for x, y in zip(a, b))
+
+
+class FlightMerger:
+    """
+    Merge flights from named sources.
+    sources: source names in default priority order (first wins)
+    field_priority: {field: [source names]} overrides the order for specific fields
+    group_by: fields that must be equal for flights to match (e.g. 'direction' on round trips)
+    on_conflict: optional callback(merged_flight, field, kept_value, other_value) when two sources
+                 disagree on a field
+    """
+
+    def __init__(self, sources, field_priority=None, group_by=(), on_conflict=None):
+        self.sources = list(sources)
+        self.field_priority = field_priority or {}
+        self.group_by = tuple(group_by)
+        self.on_conflict = on_conflict
+
+        self._records = []        # [merged flight, {field: source rank}]
+        self._by_numbers = {}     # (group, numbers) -> [record index]
+        self._by_first_number = {}  # (group, first number) -> [record index]
+
+    def _rank(self, field, source):
+        order = self.field_priority.get(field, self.sources)
+        return order.index(source) if source in order else len(order) + self.sources.index(source)
+
+    def _find(self, group, numbers, times):
+        """Existing record for an itinerary, matching on all flight numbers, then on the first one"""
+        for index in self._by_numbers.get((group, numbers), ()):
+            if _times_compatible(_times(self._records[index][0]), times):
+                return index
+
+        # One source may only show the first leg of a connecting itinerary
+        for index in self._by_first_number.get((group, numbers[0]), ()):
+            merged_numbers = flight_numbers(self._records[index][0])
+            if (len(merged_numbers) == 1 or len(numbers) == 1) and _times_compatible(_times(self._records[index][0]), times):
+                return index
+        return None
+
+    def add(self, source, flights):
+        """Merge a source's flights into the result"""
+        for flight in flights or []:
+            numbers = flight_numbers(flight)
+            if not numbers:
+                # Nothing to match on - keep it as its own result
+                self._records.append([dict(flight), {field: self._rank(field, source) for field in flight}])
+                continue
+
+            group = tuple(flight.get(field) for field in self.group_by)
+            index = self._find(group, numbers, _times(flight))
+            if index is None:
+                index = len(self._records)
+                self._records.append([dict(flight), {field: self._rank(field, source) for field in flight}])
+                self._by_numbers.setdefault((group, numbers), []).append(index)
+                self._by_first_number.setdefault((group, numbers[0]), []).append(index)
+                continue
+
+            merged, ranks = self._records[index]
+            for field, value in flight.items():
+                if value in MISSING_VALUES or field == 'flight_number':
+                    continue
+                rank = self._rank(field, source)
+                current = merged.get(field)
+                if current in MISSING_VALUES:
+                    merged[field] = value
+                    ranks[field] = rank
+                elif rank < ranks[field]:
+                    if self.on_conflict and current != value:
+                        self.on_conflict(merged, field, value, current)
+                    merged[field] = value
+                    ranks[field] = rank
+                elif rank > ranks[field] and self.on_conflict and current != value:
+                    self.on_conflict(merged, field, current, value)
+
+            # Flight numbers are not ranked - the fuller one wins for connecting itineraries
+            if len(numbers) > len(flight_numbers(merged)):
+                merged['flight_number'] = flight['flight_number']
+                self._by_numbers.setdefault((group, numbers), []).append(index)
+
+        return self
+
+    def flights(self):
+        """Merged flights in the order they were first seen"""
+        return [merged for merged, ranks in self._records]
+
+
+def merge_flights(sources, field_priority=None, group_by=(), on_conflict=None):
+    """
+    One-call merge. sources: [(source name, flights), ...] in default priority order.
+    Also de-duplicates within a single source.
+    """
+    merger = FlightMerger([name for name, _ in sources], field_priority, group_by, on_conflict)
+    for name, flights in sources:
+        merger.add(name, flights)
+    return merger.flights()
@@ -0,0 +1,165 @@
+"""
+Typed flight record
+Scrapers build string-valued dicts ('₹9,230', '2h 20m', 'N/A'). Flight parses those once into
+integer paise, integer minutes, datetimes and None, so sorting and comparing never re-parse
+strings; display formatting happens only at the edges (CLI table, frontend).
+"""
+
+import re
+import sys
+from datetime import datetime, timedelta
+
+
+MISSING_VALUES = (None, '', 'N/A')
+
+# Cheapest fare first - the flight's headline price and points come from the first family found
+PRICE_FIELDS = ('spicesaver_price', 'price_inr', 'price')
+POINTS_FIELDS = ('spicesaver_points', 'award_points')
+
+
+def _intern(value):
+    return sys.intern(value) if value else None
+
+
+def parse_paise(text):
+    """'₹9,230' / '9230.50' / 9230 -> 923000 / 923050 / 923000 (None if there is no amount)"""
+    if text in MISSING_VALUES:
+        return None
+    if isinstance(text, (int, float)):
+        return int(round(text * 100))
+    match = re.search(r'\d[\d,]*(?:\.\d+)?', str(text))
+    return int(round(float(match.group(0).replace(',', '')) * 100)) if match else None
+
+
+def parse_points(text):
+    """'1,234' / '1,234 points' -> 1234 (None if there is no number)"""
+    if text in MISSING_VALUES:
+        return None
+    if isinstance(text, int):
+        return text
+    digits = re.sub(r'[^\d]', '', str(text))
+    return int(digits) if digits else None
+
+
+def parse_minutes(text):
+    """'2h 20m' / '2h' / '45m' -> 140 / 120 / 45 (None if there is no duration)"""
+    if text in MISSING_VALUES:
+        return None
+    match = re.search(r'(?:(\d+)\s*h)?\s*(?:(\d+)\s*m)?', str(text), re.IGNORECASE)
+    if not match or not (match.group(1) or match.group(2)):
+        return None
+    return int(match.group(1) or 0) * 60 + int(match.group(2) or 0)
+
+
+def _parse_clock(text, date):
+    """'06:05' on '2025-12-25' -> datetime (None if there is no time or date)"""
+    match = re.search(r'(\d{1,2}):(\d{2})', str(text or ''))
+    if not match or not date:
+        return None
+    return datetime.strptime(date, '%Y-%m-%d').replace(hour=int(match.group(1)), minute=int(match.group(2)))
+
+
+class FareFamily:
+    """One fare family (e.g. SpiceSaver) of a flight"""
+
+    __slots__ = ('name', 'price_paise', 'points')
+
+    def __init__(self, name, price_paise=None, points=None):
+        self.name = _intern(name)
+        self.price_paise = price_paise
+        self.points = points
+
+    def to_record(self):
+        return {'price_paise': self.price_paise, 'points': self.points}
+
+
+class Flight:
+    """
+    One itinerary with typed values: prices in paise, durations in minutes, departure/arrival
+    datetimes and None for anything missing. Airline and airport codes are interned.
+    """
+
+    __slots__ = ('airline', 'airline_code', 'flight_numbers', 'origin', 'destination', 'departure',
+                 'arrival', 'duration_minutes', 'price_paise', 'points', 'direction', 'fares',
+                 'fare_components')
+
+    def __init__(self, airline, flight_numbers=(), origin=None, destination=None, departure=None,
+                 arrival=None, duration_minutes=None, price_paise=None, points=None, direction='outbound',
+                 fares=(), fare_components=None):
+        self.airline = _intern(airline)
+        self.flight_numbers = tuple(_intern(number) for number in flight_numbers)
+        self.airline_code = _intern(self.flight_numbers[0].split()[0]) if self.flight_numbers else None
+        self.origin = _intern(origin)
+        self.destination = _intern(destination)
+        self.departure = departure
+        self.arrival = arrival
+        self.duration_minutes = duration_minutes
+        self.price_paise = price_paise
+        self.points = points
+        self.direction = _intern(direction)
+        self.fares = tuple(fares)
+        self.fare_components = fare_components
+
+    @classmethod
+    def from_dict(cls, flight, origin=None, destination=None, date=None, return_date=None):
+        """
+        Parse a scraper's flight dict. origin/destination/date are the search's (swapped for
+        return flights on round trips) and turn the page's clock times into datetimes.
+        """
+        direction = flight.get('direction') or 'outbound'
+        if direction == 'return':
+            origin, destination, date = destination, origin, return_date or date
+
+        departure = _parse_clock(flight.get('departure_time'), date)
+        arrival = _parse_clock(flight.get('arrival_time'), date)
+        if departure and arrival and arrival <= departure:
+            arrival += timedelta(days=1)  # overnight flight
+
+        # Fare families are the '<family>_price' / '<family>_points' pairs (SpiceJet)
+        fares = []
+        for field, value in flight.items():
+            if field.endswith('_price'):
+                family = field[:-len('_price')]
+                fares.append(FareFamily(family, parse_paise(value), parse_points(flight.get(f'{family}_points'))))
+
+        price_paise = next(filter(None, (parse_paise(flight.get(field)) for field in PRICE_FIELDS)), None)
+        points = next(filter(None, (parse_points(flight.get(field)) for field in POINTS_FIELDS)), None)
+
+        numbers = flight.get('flight_number')
+        numbers = () if numbers in MISSING_VALUES else [part.strip() for part in str(numbers).split(',') if part.strip()]
+
+        return cls(
+            flight.get('airline'), numbers, origin, destination, departure, arrival,
+            parse_minutes(flight.get('duration')), price_paise, points, direction, fares,
+            flight.get('fare_components') or None,
+        )
+
+    def sort_key(self, by='price'):
+        """Sort key for 'price', 'duration' or 'departure' - missing values sort last"""
+        value = {'price': self.price_paise, 'duration': self.duration_minutes, 'departure': self.departure}[by]
+        return (value is None, value if value is not None else 0)
+
+    def to_record(self):
+        """JSON-ready dict of typed values (datetimes as ISO 8601 strings)"""
+        return {
+            'airline': self.airline,
+            'airline_code': self.airline_code,
+            'flight_numbers': list(self.flight_numbers),
+            'origin': self.origin,
+            'destination': self.destination,
+            'departure': self.departure.isoformat(timespec='minutes') if self.departure else None,
+            'arrival': self.arrival.isoformat(timespec='minutes') if self.arrival else None,
+            'duration_minutes': self.duration_minutes,
+            'price_paise': self.price_paise,
+            'points': self.points,
+            'direction': self.direction,
+            'fares': {fare.name: fare.to_record() for fare in self.fares},
+            'fare_components': self.fare_components,
+        }
+
+
+def flight_records(flights, origin=None, destination=None, date=None, return_date=None, sort_by='price'):
+    """Scraper flight dicts -> typed records (JSON-ready dicts), sorted once"""
+    parsed = [Flight.from_dict(flight, origin, destination, date, return_date) for flight in flights]
+    parsed.sort(key=lambda flight: flight.sort_key(sort_by))
+    return [flight.to_record() for flight in parsed]
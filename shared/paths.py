@@ -0,0 +1,17 @@
+"""
+File locations shared between scrapers
+Runtime data (latency logs, stores, archives) lives in <repo>/data unless FLYPOINTS_DATA_DIR is set
+"""
+
+import os
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.environ.get('FLYPOINTS_DATA_DIR', os.path.join(REPO_ROOT, 'data'))
+
+
+def data_path(*parts):
+    """Absolute path inside the data directory (parent directories are created)"""
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
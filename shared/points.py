@@ -0,0 +1,79 @@
+"""
+Loyalty points engine
+Per-airline earn rules (fare family x base fare -> points) so points can come straight from the
+availability capture instead of the "Earn N" text on the rendered results page.
+
+The SpiceJet rates in EARN_RULES are placeholders: no published SpiceClub earn table or captured
+page backs them. The captured availability response (attempt1/spicejet_api_response.json, e.g. the
+8150 base / 9230 total SpiceSaver fare) is an anonymous session with loyaltyPoints 0, so it has no
+figure to check them against. Until a rate is confirmed, earn_points() is only an estimate and
+points_from_fare_components() never puts it in a flight - flights carry the API's loyaltyPoints
+or the page's figure, never a made-up number.
+"""
+
+import re
+
+
+# Points earned per ₹100 of base fare (before taxes and fees), per fare family
+# PLACEHOLDERS - not from any SpiceClub source; move an airline to VERIFIED_EARN_RULES once its
+# rates are confirmed against a logged-in capture or the site's "Earn N" figures
+EARN_RULES = {
+    'spicejet': {
+        'spicesaver': 5,
+        'spiceflex': 7,
+        'spicemax': 10,
+    },
+}
+
+# Airlines whose EARN_RULES are confirmed - only their computed points reach flights
+VERIFIED_EARN_RULES = set()
+
+# Rounding differences below this are not reported as mismatches
+POINTS_TOLERANCE = 1
+
+
+def earn_points(airline, fare_family, base_fare):
+    """Points for one passenger on a fare family, or None if there is no rule (an estimate unless verified)"""
+    rate = EARN_RULES.get(airline, {}).get(fare_family)
+    if rate is None or not base_fare:
+        return None
+    return int(base_fare * rate // 100)
+
+
+def points_from_fare_components(airline, fare_components, passenger_type='ADT'):
+    """
+    {'<family>_points': '1,234'} from shared.fare_calculator fare components.
+    Uses the API's loyaltyPoints when it has them (logged-in sessions), otherwise the earn rules -
+    only for airlines in VERIFIED_EARN_RULES, so placeholder rates never show up as points.
+    """
+    points = {}
+    use_rules = airline in VERIFIED_EARN_RULES
+    for family, components in (fare_components or {}).items():
+        breakdown = components.get(passenger_type)
+        if not breakdown:
+            continue
+
+        value = breakdown.get('loyalty_points') or \
+            (earn_points(airline, family, breakdown.get('base')) if use_rules else None)
+        if value:
+            points[f'{family}_points'] = f"{int(value):,}"
+    return points
+
+
+def _points_value(text):
+    """Integer value of a points string ('1,234' -> 1234), or None"""
+    digits = re.sub(r'[^\d]', '', str(text or ''))
+    return int(digits) if digits else None
+
+
+def points_conflict(flight, field, kept_value, other_value):
+    """
+    shared.flight_merge on_conflict hook: report points where the page and the earn rules disagree.
+    The page's figure is kept (MERGE_FIELD_PRIORITY puts HTML first for points).
+    """
+    if not field.endswith('_points'):
+        return
+    kept, other = _points_value(kept_value), _points_value(other_value)
+    if kept is not None and other is not None and abs(kept - other) > POINTS_TOLERANCE:
+        print(f"  ⚠ Points mismatch for {flight.get('flight_number')} {field}: "
+              f"page {kept_value}, computed {other_value}")
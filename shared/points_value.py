@@ -0,0 +1,170 @@
+"""
+Cash-vs-points value analytics
+Loads fares from the fare history (shared/fare_history.py) into NumPy column arrays and computes,
+without per-row Python loops, the cash value of a point (₹ per point) for every flight and fare
+family, the best-value fares, and percentile tables per route / airline / fare family.
+Needs numpy (pip install numpy).
+
+    python -m shared.points_value DEL BOM --from 2025-12-01 --to 2025-12-31 --top 10
+"""
+
+import argparse
+
+from shared.fare_history import FareHistory
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _require_numpy():
+    if np is None:
+        raise RuntimeError("numpy is required for points analytics (pip install numpy)")
+
+
+class FareArrays:
+    """Column arrays of fares: one element per flight / departure date / fare family"""
+
+    def __init__(self, rows):
+        _require_numpy()
+        columns = list(zip(*rows)) if rows else [()] * 8
+        self.airline = np.array(columns[0], dtype=object)
+        self.flight_number = np.array(columns[1], dtype=object)
+        self.route = np.array(columns[2], dtype=object)
+        self.departure_date = np.array(columns[3], dtype=object)
+        self.fare_family = np.array(columns[4], dtype=object)
+        self.captured_at = np.array(columns[5], dtype=object)
+        self.price = np.array(columns[6], dtype=np.float64) / 100  # rupees
+        self.points = np.array(columns[7], dtype=np.float64)
+
+    def __len__(self):
+        return len(self.price)
+
+    def value_per_point(self):
+        """₹ of cash fare per point (NaN where there are no points)"""
+        value = np.full(len(self), np.nan)
+        np.divide(self.price, self.points, out=value, where=self.points > 0)
+        return value
+
+
+def load_fares(origin=None, destination=None, date_from=None, date_to=None, airlines=None, history=None):
+    """
+    Latest captured fare of every flight / departure date / fare family that has both a price
+    and points, optionally for one route, a departure date range and some airlines.
+    """
+    _require_numpy()
+    clauses = ["price_paise > 0", "points > 0"]
+    params = []
+    for clause, value in (("origin = ?", origin), ("destination = ?", destination),
+                          ("departure_date >= ?", date_from), ("departure_date <= ?", date_to)):
+        if value:
+            clauses.append(clause)
+            params.append(value.upper() if clause.startswith(('origin', 'destination')) else value)
+    if airlines:
+        clauses.append(f"airline IN ({', '.join('?' * len(airlines))})")
+        params.extend(airlines)
+    where = " AND ".join(clauses)
+
+    query = (
+        "SELECT airline, flight_number, origin || '-' || destination, departure_date, fare_family, "
+        "captured_at, price_paise, points FROM fares f JOIN ("
+        f"  SELECT flight_number, origin, destination, departure_date, fare_family, MAX(captured_at) AS captured_at"
+        f"  FROM fares WHERE {where} GROUP BY flight_number, origin, destination, departure_date, fare_family"
+        ") latest USING (flight_number, origin, destination, departure_date, fare_family, captured_at)"
+    )
+    history = history or FareHistory()
+    with history._connect() as conn:
+        conn.row_factory = None
+        rows = conn.execute(query, params).fetchall()
+    return FareArrays(rows)
+
+
+def best_redemptions(fares, top=20):
+    """The `top` fares with the highest ₹ per point, best first"""
+    value = fares.value_per_point()
+    valid = np.flatnonzero(~np.isnan(value))
+    if not len(valid):
+        return []
+    top = min(top, len(valid))
+    # argpartition picks the top-k in linear time; only those k are sorted
+    best = valid[np.argpartition(-value[valid], top - 1)[:top]]
+    best = best[np.argsort(-value[best], kind='stable')]
+    return [{
+        'airline': fares.airline[i], 'flight_number': fares.flight_number[i], 'route': fares.route[i],
+        'departure_date': fares.departure_date[i], 'fare_family': fares.fare_family[i],
+        'price': float(fares.price[i]), 'points': int(fares.points[i]),
+        'value_per_point': round(float(value[i]), 2),
+    } for i in best]
+
+
+def percentile_table(fares, percentiles=PERCENTILES):
+    """
+    ₹-per-point percentiles per (route, airline, fare family):
+    [{'route', 'airline', 'fare_family', 'count', 'p10', 'p25', ...}] sorted by route then median
+    """
+    value = fares.value_per_point()
+    valid = ~np.isnan(value)
+    if not valid.any():
+        return []
+
+    # Integer code per (route, airline, family) from each column's unique values
+    routes, route_codes = np.unique(fares.route[valid], return_inverse=True)
+    airlines, airline_codes = np.unique(fares.airline[valid], return_inverse=True)
+    families, family_codes = np.unique(fares.fare_family[valid], return_inverse=True)
+    combined = (route_codes * len(airlines) + airline_codes) * len(families) + family_codes
+    groups, group_index = np.unique(combined, return_inverse=True)
+    values = value[valid]
+
+    # Sort once by (group, value); each group is then a contiguous, already-sorted slice
+    order = np.lexsort((values, group_index))
+    sorted_values = values[order]
+    bounds = np.flatnonzero(np.diff(group_index[order])) + 1
+    starts = np.concatenate(([0], bounds))
+    ends = np.concatenate((bounds, [len(sorted_values)]))
+
+    table = []
+    for group, start, end in zip(groups, starts, ends):
+        route_airline, family = divmod(int(group), len(families))
+        route, airline = divmod(route_airline, len(airlines))
+        points = np.percentile(sorted_values[start:end], percentiles)
+        table.append({'route': routes[route], 'airline': airlines[airline], 'fare_family': families[family],
+                      'count': int(end - start),
+                      **{f"p{p}": round(float(v), 2) for p, v in zip(percentiles, points)}})
+    table.sort(key=lambda row: (row['route'], -row[f"p{percentiles[len(percentiles) // 2]}"]))
+    return table
+
+
+def main():
+    """Print the best-value fares and percentile tables from the command line"""
+    parser = argparse.ArgumentParser(description="Cash value of a point (₹ per point) from the fare history")
+    parser.add_argument('origin', nargs='?')
+    parser.add_argument('destination', nargs='?')
+    parser.add_argument('--from', dest='date_from', help="First departure date (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='date_to', help="Last departure date (YYYY-MM-DD)")
+    parser.add_argument('--airline', action='append', help="spicejet, indigo or etihad (repeatable)")
+    parser.add_argument('--top', type=int, default=10, help="Best-value fares to list")
+    args = parser.parse_args()
+
+    fares = load_fares(args.origin, args.destination, args.date_from, args.date_to, args.airline)
+    if not len(fares):
+        print("No fares with both a price and points in the fare history")
+        return
+
+    print(f"Best value per point ({len(fares)} fare(s)):")
+    for row in best_redemptions(fares, args.top):
+        print(f"  ₹{row['value_per_point']:>6.2f}/pt  {row['airline']:<9} {row['flight_number']:<10} "
+              f"{row['route']}  {row['departure_date']}  {row['fare_family']:<11} "
+              f"₹{row['price']:,.0f} / {row['points']:,} pts")
+
+    print("\n₹ per point percentiles:")
+    for row in percentile_table(fares):
+        spread = '  '.join(f"p{p} {row[f'p{p}']:.2f}" for p in PERCENTILES)
+        print(f"  {row['route']}  {row['airline']:<9} {row['fare_family']:<11} n={row['count']:<5} {spread}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Search popularity (read side)
+The frontend counts every search in a time-decayed count-min sketch (frontend/flypoints/lib/popularity.ts)
+and saves it to data/popularity.json every minute. This reads that snapshot so Python code - the
+background crawler - can rank work by real demand: decayed search counts (halving every 72 hours)
+per (scraper, route, date), and the most searched keys.
+
+    python -m shared.popularity --top 20
+"""
+
+import argparse
+import json
+import time
+
+from shared.paths import data_path
+
+
+SNAPSHOT_VERSION = 1
+DEFAULT_TOP = 20
+
+
+def search_key(scraper, origin, destination, departure_date):
+    return '|'.join((scraper, origin.upper(), destination.upper(), departure_date))
+
+
+def _hash(key, seed):
+    """FNV-1a seeded per sketch row - must match hash() in lib/popularity.ts"""
+    h = (0x811c9dc5 ^ ((seed + 1) * 0x9e3779b1)) & 0xffffffff
+    for char in key:
+        h = ((h ^ ord(char)) * 0x01000193) & 0xffffffff
+    return h
+
+
+class PopularitySnapshot:
+    """A saved sketch: decayed search counts per key and the heavy-hitter keys"""
+
+    def __init__(self, snapshot):
+        self.width = snapshot['width']
+        self.depth = snapshot['depth']
+        self.half_life_ms = snapshot['halfLifeHours'] * 60 * 60 * 1000
+        self.epoch = snapshot['epoch']
+        self.saved_at = snapshot['savedAt']
+        self.counts = snapshot['counts']
+        self.heavy_hitters = snapshot['heavyHitters']
+
+    @classmethod
+    def load(cls, path=None):
+        """The saved snapshot, or None when the frontend has not saved one (or it is unreadable)"""
+        try:
+            with open(path or data_path('popularity.json'), 'r', encoding='utf-8') as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if snapshot.get('version') != SNAPSHOT_VERSION:
+            return None
+        return cls(snapshot)
+
+    def _weight(self, now_ms):
+        return 2 ** ((now_ms - self.epoch) / self.half_life_ms)
+
+    def _scaled(self, key):
+        return min(self.counts[row * self.width + _hash(key, row) % self.width] for row in range(self.depth))
+
+    def score(self, scraper, origin, destination, departure_date, now=None):
+        """Decayed search count for one key (never an underestimate)"""
+        now_ms = (now or time.time()) * 1000
+        return self._scaled(search_key(scraper, origin, destination, departure_date)) / self._weight(now_ms)
+
+    def top(self, limit=DEFAULT_TOP, now=None):
+        """[(score, scraper, origin, destination, date)] for the most searched keys, highest first"""
+        weight = self._weight((now or time.time()) * 1000)
+        ranked = [(self._scaled(key) / weight, *key.split('|')) for key in self.heavy_hitters]
+        ranked.sort(key=lambda entry: -entry[0])
+        return ranked[:limit]
+
+
+def main():
+    """Show the most searched routes"""
+    parser = argparse.ArgumentParser(description="Most searched (scraper, route, date) keys")
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP)
+    parser.add_argument('--json', action='store_true', help="Print JSON only")
+    args = parser.parse_args()
+
+    snapshot = PopularitySnapshot.load()
+    top = snapshot.top(args.top) if snapshot else []
+    if args.json:
+        print(json.dumps({"success": True, "top": [
+            {"scraper": scraper, "from": origin, "to": destination, "date": departure_date, "score": score}
+            for score, scraper, origin, destination, departure_date in top]}))
+        return
+
+    if snapshot is None:
+        print("No popularity snapshot yet (the frontend saves one a minute after the first search)")
+        return
+    for score, scraper, origin, destination, departure_date in top:
+        print(f"  {score:8.2f}  {scraper:<23} {origin}-{destination}  {departure_date}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Per-airline rate limiting
+One token bucket per airline in data/rate_limit.db, shared by every scraper process (API routes,
+hedged attempts, the crawler and the watchlist), so concurrent searches cannot together hammer
+spicejet.com or digital.etihad.com into blocking us. Every page navigation and replayed API call
+takes a token first.
+
+A bucket holds up to `burst` tokens and refills at `per_minute`. Taking a token is one SQLite
+write transaction (BEGIN IMMEDIATE locks the file across processes). When the bucket is empty the
+token is reserved anyway - the balance goes negative - and the caller sleeps until its turn, so
+waiting processes are served in order instead of racing for each refill.
+Waits are logged as throttling events; `python -m shared.rate_limit` reports them.
+Set FLYPOINTS_RATE_LIMIT=0 to turn limiting off.
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from shared.paths import data_path
+
+
+ENABLED_ENV = 'FLYPOINTS_RATE_LIMIT'
+
+# airline -> (burst, tokens per minute)
+RATES = {
+    'spicejet': (4, 12),
+    'indigo': (4, 12),
+    'etihad': (3, 6),
+}
+DEFAULT_RATE = (3, 6)
+EVENT_RETENTION_DAYS = 7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS buckets (
+    airline TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    acquired INTEGER NOT NULL DEFAULT 0,
+    throttled INTEGER NOT NULL DEFAULT 0,
+    waited_seconds REAL NOT NULL DEFAULT 0,
+    max_wait_seconds REAL NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS throttle_events (
+    id INTEGER PRIMARY KEY,
+    airline TEXT NOT NULL,
+    at TEXT NOT NULL,
+    wait_seconds REAL NOT NULL,
+    purpose TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_throttle_events_at ON throttle_events (at);
+"""
+
+
+def rate_limit_enabled():
+    """True unless FLYPOINTS_RATE_LIMIT is set to 0/false/no"""
+    return os.environ.get(ENABLED_ENV, '1').strip().lower() not in ('0', 'false', 'no')
+
+
+class RateLimiter:
+    """Token buckets per airline in SQLite, shared across processes"""
+
+    def __init__(self, path=None, rates=None):
+        self.path = path or data_path('rate_limit.db')
+        self.rates = rates or RATES
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def rate(self, airline):
+        return self.rates.get(airline, DEFAULT_RATE)
+
+    def reserve(self, airline, purpose=None, now=None):
+        """Take a token; returns the seconds to wait before using it (0 when one was available)"""
+        burst, per_minute = self.rate(airline)
+        per_second = per_minute / 60
+        now = now if now is not None else time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE airline = ?", (airline,)).fetchone()
+            tokens = burst if row is None else min(burst, row['tokens'] + max(0.0, now - row['updated_at']) * per_second)
+            tokens -= 1
+            wait = -tokens / per_second if tokens < 0 else 0.0
+            conn.execute(
+                "INSERT INTO buckets (airline, tokens, updated_at, acquired, throttled, waited_seconds, "
+                "max_wait_seconds) VALUES (?, ?, ?, 1, ?, ?, ?) ON CONFLICT (airline) DO UPDATE SET "
+                "tokens = excluded.tokens, updated_at = excluded.updated_at, acquired = acquired + 1, "
+                "throttled = throttled + excluded.throttled, waited_seconds = waited_seconds + excluded.waited_seconds, "
+                "max_wait_seconds = MAX(max_wait_seconds, excluded.max_wait_seconds)",
+                (airline, tokens, now, 1 if wait else 0, wait, wait)
+            )
+            if wait:
+                event_id = conn.execute(
+                    "INSERT INTO throttle_events (airline, at, wait_seconds, purpose) VALUES (?, ?, ?, ?)",
+                    (airline, datetime.fromtimestamp(now).isoformat(timespec='seconds'), wait, purpose)
+                ).lastrowid
+                if event_id % 1000 == 0:
+                    cutoff = datetime.fromtimestamp(now) - timedelta(days=EVENT_RETENTION_DAYS)
+                    conn.execute("DELETE FROM throttle_events WHERE at < ?", (cutoff.isoformat(timespec='seconds'),))
+            conn.execute("COMMIT")
+        except Exception:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        return wait
+
+    def acquire(self, airline, purpose=None, max_wait=None, sleep=time.sleep):
+        """Take a token, sleeping until it is usable (at most max_wait seconds); returns the seconds waited"""
+        wait = self.reserve(airline, purpose)
+        if max_wait is not None:
+            wait = min(wait, max(0.0, max_wait))
+        if wait > 0:
+            sleep(wait)
+        return wait
+
+    def report(self, now=None):
+        """Per-airline state and counters, with throttling events from the last hour"""
+        now = now if now is not None else time.time()
+        since = (datetime.fromtimestamp(now) - timedelta(hours=1)).isoformat(timespec='seconds')
+        with self._connect() as conn:
+            buckets = conn.execute("SELECT * FROM buckets ORDER BY airline").fetchall()
+            recent = {row['airline']: row for row in conn.execute(
+                "SELECT airline, COUNT(*) AS events, SUM(wait_seconds) AS waited FROM throttle_events "
+                "WHERE at >= ? GROUP BY airline", (since,))}
+        report = []
+        for row in buckets:
+            burst, per_minute = self.rate(row['airline'])
+            tokens = min(burst, row['tokens'] + max(0.0, now - row['updated_at']) * per_minute / 60)
+            last_hour = recent.get(row['airline'])
+            report.append({
+                'airline': row['airline'], 'burst': burst, 'per_minute': per_minute, 'tokens': round(tokens, 2),
+                'acquired': row['acquired'], 'throttled': row['throttled'],
+                'waited_seconds': round(row['waited_seconds'], 1),
+                'max_wait_seconds': round(row['max_wait_seconds'], 1),
+                'throttled_last_hour': last_hour['events'] if last_hour else 0,
+                'waited_last_hour_seconds': round(last_hour['waited'], 1) if last_hour else 0.0,
+            })
+        return report
+
+    def prune(self, days=EVENT_RETENTION_DAYS):
+        cutoff = (datetime.now() - timedelta(days=days)).isoformat(timespec='seconds')
+        with self._connect() as conn:
+            return conn.execute("DELETE FROM throttle_events WHERE at < ?", (cutoff,)).rowcount
+
+
+def acquire_token(airline, purpose=None, budget=None):
+    """
+    Wait for the airline's rate limit before a navigation or API call (never past the search
+    budget's deadline). Returns the seconds waited. Never raises - a broken limiter must not fail a search.
+    """
+    if not rate_limit_enabled():
+        return 0.0
+    try:
+        waited = RateLimiter().acquire(airline, purpose, budget.remaining() if budget else None)
+    except Exception as e:
+        print(f"Could not apply rate limit: {e}")
+        return 0.0
+    if waited:
+        print(f"  Rate limited: waited {waited:.1f}s for {airline} ({purpose or 'request'})")
+    return waited
+
+
+def main():
+    """Report rate limiter state and throttling"""
+    parser = argparse.ArgumentParser(description="Per-airline rate limits and throttling events")
+    parser.add_argument('--prune', action='store_true', help=f"Delete events older than {EVENT_RETENTION_DAYS} days")
+    parser.add_argument('--json', action='store_true', help="Print JSON only")
+    args = parser.parse_args()
+
+    limiter = RateLimiter()
+    if args.prune:
+        print(f"Deleted {limiter.prune()} old throttling event(s)")
+    report = limiter.report()
+    if args.json:
+        print(json.dumps({"success": True, "airlines": report}))
+        return
+    if not report:
+        print("No requests rate limited yet")
+    for row in report:
+        print(f"  {row['airline']:<9} {row['tokens']:>5}/{row['burst']} tokens  {row['per_minute']}/min  "
+              f"{row['acquired']} acquired  {row['throttled']} throttled ({row['waited_seconds']}s total, "
+              f"max {row['max_wait_seconds']}s)  last hour: {row['throttled_last_hour']} "
+              f"({row['waited_last_hour_seconds']}s)")
+
+
+if __name__ == "__main__":
+    main()
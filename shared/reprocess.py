@@ -0,0 +1,414 @@
+"""
+Offline reprocessing
+Re-runs the current parsers over captures we already hold (the capture archive, saved API
+responses / page sources, debug artifacts) without scraping live. Captures are streamed through
+a process pool per parser; results are written to data/reprocess/<run id>/<parser>.jsonl along
+with the parser version, throughput, and a diff against the previous run.
+
+    python -m shared.reprocess                      # everything in the capture archive
+    python -m shared.reprocess attempt1etihad/ data/debug/ --parser etihad
+"""
+
+import argparse
+import gzip
+import hashlib
+import io
+import json
+import os
+import shutil
+import sys
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from multiprocessing import Pool
+
+from shared.paths import REPO_ROOT, data_path
+from shared.capture_archive import CaptureArchive
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Parsers that can run without a browser: scraper directory, module, class, and the capture
+# kind each one reads. SpiceJet's HTML pass and IndiGo read the live DOM, so they have none.
+PARSERS = {
+    'spicejet': {'directory': 'attempt1', 'module': 'spicejet_scraper', 'class': 'SpiceJetScraper',
+                 'kind': 'availability'},
+    'spicejet-international': {'directory': 'attempt1international', 'module': 'spicejet_scraper',
+                               'class': 'SpiceJetScraper', 'kind': 'availability'},
+    'etihad': {'directory': 'attempt1etihad', 'module': 'etihad_scraper', 'class': 'EtihadScraper',
+               'kind': 'page'},
+}
+
+CAPTURE_EXTENSIONS = ('.json', '.html')
+COMPRESSED_EXTENSIONS = ('.gz', '.zst')
+SNIFF_BYTES = 256 * 1024
+DIFF_EXAMPLES = 5
+
+
+# Reading captures
+
+def _read_capture(path, limit=None):
+    """Capture file contents (bytes), decompressing .gz / .zst debug artifacts"""
+    if path.endswith('.gz'):
+        with gzip.open(path, 'rb') as f:
+            return f.read(limit) if limit else f.read()
+    if path.endswith('.zst'):
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read .zst captures")
+        with open(path, 'rb') as f, zstandard.ZstdDecompressor().stream_reader(f) as reader:
+            return reader.read(limit) if limit else reader.read()
+    with open(path, 'rb') as f:
+        return f.read(limit) if limit else f.read()
+
+
+def _capture_extension(path):
+    """'.json' / '.html' for capture files (compressed or not), else None"""
+    name = path
+    for extension in COMPRESSED_EXTENSIONS:
+        if name.endswith(extension):
+            name = name[:-len(extension)]
+    extension = os.path.splitext(name)[1].lower()
+    return extension if extension in CAPTURE_EXTENSIONS else None
+
+
+def detect_parser(path):
+    """Parser name for a capture file, or None if no offline parser can read it"""
+    extension = _capture_extension(path)
+    if not extension:
+        return None
+
+    parts = os.path.abspath(path).split(os.sep)
+    for name, parser in PARSERS.items():
+        if parser['directory'] in parts:
+            return name if (extension == '.json') == (parser['kind'] == 'availability') else None
+
+    try:
+        head = _read_capture(path, SNIFF_BYTES)
+    except Exception:
+        return None
+    if extension == '.json' and b'journeysAvailable' in head:
+        return 'spicejet'
+    if extension == '.html' and b'ey-bound-card' in head:
+        return 'etihad'
+    return None
+
+
+def find_capture_files(paths, parser=None):
+    """{parser name: [file path]} for capture files under the given files/directories"""
+    found = {}
+    skipped = 0
+    for path in paths:
+        if os.path.isdir(path):
+            files = sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+        else:
+            files = [path]
+
+        for file_path in files:
+            if not _capture_extension(file_path):
+                continue
+            name = parser or detect_parser(file_path)
+            if name:
+                found.setdefault(name, []).append(file_path)
+            else:
+                skipped += 1
+
+    if skipped:
+        print(f"Skipped {skipped} capture file(s) with no offline parser (SpiceJet/IndiGo pages need a live browser)")
+    return found
+
+
+def find_archive_captures(archive, parser=None, since=None, until=None):
+    """{parser name: [sha256]} for archived captures, each payload once"""
+    found = {}
+    for name, spec in PARSERS.items():
+        if parser and name != parser:
+            continue
+        rows = archive.find(airline=name, kind=spec['kind'], since=since, until=until)
+        hashes = list(dict.fromkeys(row['sha256'] for row in reversed(rows)))
+        if hashes:
+            found[name] = hashes
+    return found
+
+
+def parser_version(name):
+    """Short hash of the parser module source - changes whenever the parser does"""
+    spec = PARSERS[name]
+    with open(os.path.join(REPO_ROOT, spec['directory'], spec['module'] + '.py'), 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+# Worker processes (one pool per parser, since each scraper directory has its own config/utils)
+
+_worker = {}
+
+
+def _load_scraper(name):
+    """An instance of the parser's scraper class (imports its module from its own directory)"""
+    spec = PARSERS[name]
+    sys.path.insert(0, os.path.join(REPO_ROOT, spec['directory']))
+    with redirect_stdout(io.StringIO()):
+        module = __import__(spec['module'])
+        return getattr(module, spec['class'])()
+
+
+def _check_parser(name):
+    """Load the parser once - run in a throwaway process, since the scraper modules share names"""
+    _load_scraper(name)
+    return name
+
+
+def check_parsers(names):
+    """
+    Raise RuntimeError naming every parser whose scraper module cannot be imported (e.g. playwright
+    missing). A pool initializer that raises is respawned forever, so this runs before any pool.
+    """
+    failures = []
+    for name in names:
+        with Pool(1) as probe:
+            try:
+                probe.apply(_check_parser, (name,))
+            except Exception as e:
+                failures.append(f"{name} ({PARSERS[name]['directory']}/{PARSERS[name]['module']}.py): "
+                                f"{type(e).__name__}: {e}")
+    if failures:
+        raise RuntimeError("Cannot load parser(s): " + "; ".join(failures))
+
+
+def _init_worker(name, archive_root):
+    _worker['scraper'] = _load_scraper(name)
+    _worker['kind'] = PARSERS[name]['kind']
+    _worker['archive'] = CaptureArchive(archive_root) if archive_root else None
+
+
+def _parse(payload):
+    scraper = _worker['scraper']
+    if _worker['kind'] == 'availability':
+        scraper.return_date = None
+        return scraper._tag_directions(scraper._parse_api_response(json.loads(payload)))
+    return scraper.parse_page_source(payload.decode('utf-8', errors='replace'))
+
+
+def _process(task):
+    """(source, reference) -> result dict; errors are reported, never raised"""
+    source, reference = task
+    result = {'source': source, 'reference': reference, 'capture': None, 'size': 0,
+              'flights': [], 'error': None}
+    started = time.perf_counter()
+    try:
+        payload = _worker['archive'].get(reference) if source == 'archive' else _read_capture(reference)
+        if payload is None:
+            raise ValueError("capture not found")
+        result['capture'] = hashlib.sha256(payload).hexdigest()
+        result['size'] = len(payload)
+        # The parsers are chatty - keep their progress output out of the report
+        with redirect_stdout(io.StringIO()):
+            result['flights'] = _parse(payload)
+    except Exception as e:
+        result['error'] = f"{type(e).__name__}: {e}"
+    result['seconds'] = round(time.perf_counter() - started, 4)
+    return result
+
+
+# Diffs against the previous run
+
+def _flight_key(flight):
+    return (flight.get('direction'), flight.get('flight_number'), flight.get('departure_time'))
+
+
+def _previous_results(runs_root, run_id, name):
+    """{capture sha256: flights} from the newest earlier run of this parser, and that run's ID"""
+    try:
+        # Dot-prefixed directories are runs still being written (or abandoned)
+        runs = sorted((run for run in os.listdir(runs_root) if run < run_id and not run.startswith('.')),
+                      reverse=True)
+    except OSError:
+        return {}, None
+    for run in runs:
+        path = os.path.join(runs_root, run, f"{name}.jsonl")
+        if not os.path.exists(path):
+            continue
+        previous = {}
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                record = json.loads(line)
+                if record.get('capture') and not record.get('error'):
+                    previous[record['capture']] = record['flights']
+        return previous, run
+    return {}, None
+
+
+class ResultDiff:
+    """Running tally of how a parser's output changed since the previous run"""
+
+    def __init__(self, previous):
+        self.previous = previous
+        self.compared = 0
+        self.new_captures = 0
+        self.changed_captures = 0
+        self.added = 0
+        self.removed = 0
+        self.changed_fields = {}
+        self.examples = []
+
+    def add(self, capture, flights):
+        if capture not in self.previous:
+            self.new_captures += 1
+            return
+        self.compared += 1
+        before = {_flight_key(flight): flight for flight in self.previous[capture]}
+        after = {_flight_key(flight): flight for flight in flights}
+
+        added = [key for key in after if key not in before]
+        removed = [key for key in before if key not in after]
+        changed = []
+        for key in after.keys() & before.keys():
+            for field in after[key].keys() | before[key].keys():
+                if after[key].get(field) != before[key].get(field):
+                    self.changed_fields[field] = self.changed_fields.get(field, 0) + 1
+                    changed.append((key, field, before[key].get(field), after[key].get(field)))
+
+        if added or removed or changed:
+            self.changed_captures += 1
+            self.added += len(added)
+            self.removed += len(removed)
+            if len(self.examples) < DIFF_EXAMPLES:
+                self.examples.append({
+                    'capture': capture[:12],
+                    'added': [key[1] for key in added],
+                    'removed': [key[1] for key in removed],
+                    'changed': [f"{key[1]} {field}: {old!r} -> {new!r}" for key, field, old, new in changed[:3]],
+                })
+
+    def summary(self):
+        return {
+            'compared': self.compared, 'new_captures': self.new_captures,
+            'changed_captures': self.changed_captures, 'flights_added': self.added,
+            'flights_removed': self.removed, 'changed_fields': self.changed_fields,
+            'examples': self.examples,
+        }
+
+
+# Running
+
+def reprocess(tasks_by_parser, archive_root=None, workers=None, run_id=None):
+    """
+    Run every parser over its captures. tasks_by_parser: {parser name: [(source, reference)]}
+    where source is 'file' (reference = path) or 'archive' (reference = sha256).
+    Returns the run manifest (also written to data/reprocess/<run id>/manifest.json).
+    The run is written to data/reprocess/.<run id>.tmp/ and renamed only once it completes, so a
+    failed run never becomes the "previous run" of the next diff.
+    Raises RuntimeError before doing anything if a parser cannot be loaded.
+    """
+    run_id = run_id or datetime.now().strftime('%Y%m%d-%H%M%S')
+    check_parsers([name for name, tasks in tasks_by_parser.items() if tasks])
+
+    run_dir = data_path('reprocess', run_id)
+    runs_root = os.path.dirname(run_dir)
+    partial_dir = os.path.join(runs_root, f".{run_id}.tmp")
+    os.makedirs(partial_dir, exist_ok=True)
+    try:
+        manifest = _run(tasks_by_parser, archive_root, workers or os.cpu_count() or 1, run_id, runs_root,
+                        partial_dir)
+        os.replace(partial_dir, run_dir)
+    except BaseException:
+        shutil.rmtree(partial_dir, ignore_errors=True)
+        raise
+    print(f"\nResults written to {run_dir}")
+    return manifest
+
+
+def _run(tasks_by_parser, archive_root, workers, run_id, runs_root, run_dir):
+    manifest = {'run_id': run_id, 'created_at': datetime.now().isoformat(timespec='seconds'), 'parsers': {}}
+
+    for name, tasks in tasks_by_parser.items():
+        if not tasks:
+            continue
+        previous, previous_run = _previous_results(runs_root, run_id, name)
+        diff = ResultDiff(previous)
+        stats = {'version': parser_version(name), 'captures': 0, 'errors': 0, 'flights': 0, 'bytes': 0,
+                 'parse_seconds': 0.0, 'previous_run': previous_run}
+        print(f"\n{name}: reprocessing {len(tasks)} capture(s) with {min(workers, len(tasks))} worker(s)...")
+
+        started = time.perf_counter()
+        with open(os.path.join(run_dir, f"{name}.jsonl"), 'w', encoding='utf-8') as out, \
+                Pool(min(workers, len(tasks)), initializer=_init_worker, initargs=(name, archive_root)) as pool:
+            for result in pool.imap_unordered(_process, tasks, chunksize=4):
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+                stats['captures'] += 1
+                stats['bytes'] += result['size']
+                stats['parse_seconds'] += result['seconds']
+                if result['error']:
+                    stats['errors'] += 1
+                    print(f"  ⚠ {result['reference']}: {result['error']}")
+                    continue
+                stats['flights'] += len(result['flights'])
+                diff.add(result['capture'], result['flights'])
+        elapsed = time.perf_counter() - started
+
+        stats['seconds'] = round(elapsed, 2)
+        stats['parse_seconds'] = round(stats['parse_seconds'], 2)
+        stats['captures_per_second'] = round(stats['captures'] / elapsed, 1) if elapsed else None
+        stats['mb_per_second'] = round(stats['bytes'] / 1048576 / elapsed, 2) if elapsed else None
+        stats['diff'] = diff.summary()
+        manifest['parsers'][name] = stats
+        _print_parser_report(name, stats)
+
+    with open(os.path.join(run_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+    return manifest
+
+
+def _print_parser_report(name, stats):
+    print(f"  {name} @ {stats['version']}: {stats['captures']} capture(s), {stats['flights']} flight(s), "
+          f"{stats['errors']} error(s) in {stats['seconds']}s "
+          f"({stats['captures_per_second']} captures/s, {stats['mb_per_second']} MB/s)")
+
+    diff = stats['diff']
+    if not stats['previous_run']:
+        print("  No previous run to compare with")
+        return
+    print(f"  vs {stats['previous_run']}: {diff['compared']} compared, {diff['changed_captures']} changed, "
+          f"{diff['new_captures']} new | flights +{diff['flights_added']} -{diff['flights_removed']}")
+    for field, count in sorted(diff['changed_fields'].items(), key=lambda item: -item[1]):
+        print(f"    {field}: {count} change(s)")
+    for example in diff['examples']:
+        print(f"    e.g. {example['capture']}: +{example['added']} -{example['removed']} {example['changed']}")
+
+
+def main():
+    """Reprocess saved captures from the command line"""
+    parser = argparse.ArgumentParser(description="Re-run the current parsers over saved captures")
+    parser.add_argument('paths', nargs='*', help="Capture files or directories (default: the capture archive)")
+    parser.add_argument('--archive', action='store_true', help="Also reprocess the capture archive")
+    parser.add_argument('--parser', choices=sorted(PARSERS), help="Only this parser (forces it for files)")
+    parser.add_argument('--since', help="Archive captures from this ISO date/time on")
+    parser.add_argument('--until', help="Archive captures up to this ISO date/time")
+    parser.add_argument('--workers', type=int, help="Worker processes per parser (default: CPU count)")
+    args = parser.parse_args()
+
+    tasks = {}
+    for name, files in find_capture_files(args.paths, args.parser).items():
+        tasks.setdefault(name, []).extend(('file', path) for path in files)
+
+    archive_root = None
+    if args.archive or not args.paths:
+        archive = CaptureArchive()
+        archive_root = archive.root
+        for name, hashes in find_archive_captures(archive, args.parser, args.since, args.until).items():
+            tasks.setdefault(name, []).extend(('archive', sha256) for sha256 in hashes)
+
+    if not any(tasks.values()):
+        print("No captures to reprocess")
+        return
+    try:
+        reprocess(tasks, archive_root, args.workers)
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
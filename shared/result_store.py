@@ -0,0 +1,314 @@
+"""
+Result store
+Keeps the latest results of every search in data/results.db (one row per flight and fare family,
+replaced when the same airline, route and date is searched again) and answers filtered, sorted,
+paginated queries over them, so callers ask for "cheapest 20 non-stop DEL-BOM fares departing
+18-25 Dec before noon" instead of loading whole result arrays and sorting them.
+
+Sorting walks an index on (route, sort column) and stops after `limit` rows - SQLite's ORDER BY
+... LIMIT is a top-k selection, never a full sort. Pages continue from an opaque cursor (the last
+row's sort value and id), so page 50 costs the same as page 1.
+Set FLYPOINTS_RESULT_STORE=0 to stop storing results.
+
+    python -m shared.result_store DEL BOM --from 2025-12-18 --to 2025-12-25 --sort price --max-stops 0
+"""
+
+import argparse
+import base64
+import json
+import os
+import sqlite3
+import sys
+from datetime import datetime
+
+from shared.paths import data_path
+from shared.fare_history import DEFAULT_FARE_FAMILY, history_flight_number
+from shared.flight_record import Flight
+
+
+ENABLED_ENV = 'FLYPOINTS_RESULT_STORE'
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 500
+
+# Sort name -> column; rows without a value for the sort column are left out of that ordering
+SORT_COLUMNS = {
+    'price': 'price_paise',
+    'duration': 'duration_minutes',
+    'departure': 'departure_at',
+    'points': 'points',
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY,
+    airline TEXT NOT NULL,
+    flight_number TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    departure_date TEXT NOT NULL,
+    departure_at TEXT,
+    departure_minute INTEGER,
+    arrival_at TEXT,
+    duration_minutes INTEGER,
+    stops INTEGER NOT NULL,
+    fare_family TEXT NOT NULL,
+    price_paise INTEGER,
+    points INTEGER,
+    captured_at TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_results_search ON results (airline, origin, destination, departure_date);
+CREATE INDEX IF NOT EXISTS idx_results_departure ON results (origin, destination, departure_at, id);
+CREATE INDEX IF NOT EXISTS idx_results_price ON results (origin, destination, price_paise, id);
+CREATE INDEX IF NOT EXISTS idx_results_duration ON results (origin, destination, duration_minutes, id);
+CREATE INDEX IF NOT EXISTS idx_results_points ON results (origin, destination, points, id);
+"""
+
+COLUMNS = ('airline', 'flight_number', 'origin', 'destination', 'departure_date', 'departure_at',
+           'departure_minute', 'arrival_at', 'duration_minutes', 'stops', 'fare_family', 'price_paise',
+           'points', 'captured_at', 'record')
+
+
+def result_store_enabled():
+    """True unless FLYPOINTS_RESULT_STORE is set to 0/false/no"""
+    return os.environ.get(ENABLED_ENV, '1').strip().lower() not in ('0', 'false', 'no')
+
+
+def _minute_of_day(text):
+    """'06:05' -> 365"""
+    hours, minutes = text.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def encode_cursor(sort, descending, value, row_id):
+    payload = json.dumps([sort, descending, value, row_id], separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(payload).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """(sort, descending, value, id) - raises ValueError for a cursor this module did not issue"""
+    try:
+        sort, descending, value, row_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        return sort, bool(descending), value, int(row_id)
+    except Exception:
+        raise ValueError("invalid cursor")
+
+
+class ResultStore:
+    """Latest search results per airline / route / departure date in SQLite"""
+
+    def __init__(self, path=None):
+        self.path = path or data_path('results.db')
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # Writing
+
+    def replace_search(self, airline, flights, origin, destination, date, return_date=None, captured_at=None):
+        """
+        Store a search's flight dicts, replacing the airline's previous results for the same
+        route(s) and date(s) in one transaction. Returns the number of rows written.
+        """
+        captured_at = captured_at or datetime.now().isoformat(timespec='seconds')
+        searched = {(origin.upper(), destination.upper(), date)}
+        if return_date:
+            searched.add((destination.upper(), origin.upper(), return_date))
+
+        rows = []
+        for flight in flights:
+            record = Flight.from_dict(flight, origin, destination, date, return_date)
+            flight_number = history_flight_number(record.flight_numbers)
+            if not flight_number or not record.origin or not record.destination:
+                continue
+            departure_date = record.departure.strftime('%Y-%m-%d') if record.departure else (
+                return_date if record.direction == 'return' and return_date else date)
+            duration = record.duration_minutes
+            if duration is None and record.departure and record.arrival:
+                duration = int((record.arrival - record.departure).total_seconds() // 60)
+            row = {
+                'airline': airline, 'flight_number': flight_number,
+                'origin': record.origin.upper(), 'destination': record.destination.upper(),
+                'departure_date': departure_date,
+                'departure_at': record.departure.isoformat(timespec='minutes') if record.departure else None,
+                'departure_minute': record.departure.hour * 60 + record.departure.minute if record.departure else None,
+                'arrival_at': record.arrival.isoformat(timespec='minutes') if record.arrival else None,
+                'duration_minutes': duration, 'stops': max(0, len(record.flight_numbers) - 1),
+                'captured_at': captured_at,
+                'record': json.dumps(record.to_record(), ensure_ascii=False, separators=(',', ':')),
+            }
+            fares = [(fare.name, fare.price_paise, fare.points) for fare in record.fares] or \
+                    [(DEFAULT_FARE_FAMILY, record.price_paise, record.points)]
+            for family, price_paise, points in fares:
+                if price_paise is not None or points is not None:
+                    rows.append({**row, 'fare_family': family, 'price_paise': price_paise, 'points': points})
+
+        with self._connect() as conn:
+            conn.executemany(
+                "DELETE FROM results WHERE airline = ? AND origin = ? AND destination = ? AND departure_date = ?",
+                [(airline, *search) for search in searched]
+            )
+            conn.executemany(
+                f"INSERT INTO results ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})",
+                [tuple(row[column] for column in COLUMNS) for row in rows]
+            )
+        return len(rows)
+
+    # Reading
+
+    def query(self, origin, destination, date_from=None, date_to=None, depart_after=None, depart_before=None,
+              max_price=None, max_duration=None, max_stops=None, fare_family=None, min_points=None,
+              airlines=None, sort='price', descending=False, limit=DEFAULT_LIMIT, cursor=None):
+        """
+        One page of stored results for a route, filtered and sorted.
+        depart_after / depart_before: 'HH:MM' local departure time window (inclusive)
+        max_price: rupees; max_duration: minutes
+        Returns (rows, next_cursor) - next_cursor is None on the last page.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"unknown sort: {sort} (use {', '.join(SORT_COLUMNS)})")
+        column = SORT_COLUMNS[sort]
+        limit = max(1, min(int(limit), MAX_LIMIT))
+
+        clauses = ["origin = ?", "destination = ?", f"{column} IS NOT NULL"]
+        params = [origin.upper(), destination.upper()]
+        for clause, value in (
+            ("departure_date >= ?", date_from),
+            ("departure_date <= ?", date_to),
+            ("departure_minute >= ?", _minute_of_day(depart_after) if depart_after else None),
+            ("departure_minute <= ?", _minute_of_day(depart_before) if depart_before else None),
+            ("price_paise <= ?", int(round(max_price * 100)) if max_price is not None else None),
+            ("duration_minutes <= ?", max_duration),
+            ("stops <= ?", max_stops),
+            ("fare_family = ?", fare_family.lower() if fare_family else None),
+            ("points >= ?", min_points),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+        if airlines:
+            clauses.append(f"airline IN ({', '.join('?' * len(airlines))})")
+            params.extend(airlines)
+
+        if cursor:
+            cursor_sort, cursor_descending, value, row_id = decode_cursor(cursor)
+            if (cursor_sort, cursor_descending) != (sort, descending):
+                raise ValueError("cursor belongs to a different sort order")
+            operator = '<' if descending else '>'
+            clauses.append(f"({column} {operator} ? OR ({column} = ? AND id {operator} ?))")
+            params.extend((value, value, row_id))
+
+        direction = 'DESC' if descending else 'ASC'
+        query = (f"SELECT * FROM results WHERE {' AND '.join(clauses)} "
+                 f"ORDER BY {column} {direction}, id {direction} LIMIT ?")
+        with self._connect() as conn:
+            rows = conn.execute(query, (*params, limit + 1)).fetchall()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(sort, descending, rows[-1][column], rows[-1]['id'])
+        results = []
+        for row in rows:
+            record = json.loads(row['record'])
+            results.append({**record, 'airline': record['airline'] or row['airline'],
+                            'fare_family': row['fare_family'], 'price_paise': row['price_paise'],
+                            'points': row['points'], 'duration_minutes': row['duration_minutes'],
+                            'stops': row['stops'], 'captured_at': row['captured_at']})
+        return results, next_cursor
+
+    def latest_search(self, airline, origin, destination, departure_date):
+        """
+        (flight records, captured_at) of the airline's stored search for the route and date,
+        cheapest first - the same records the scraper returned. ([], None) when nothing is stored.
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT record, MIN(price_paise) AS price_paise, MIN(captured_at) AS captured_at FROM results "
+                "WHERE airline = ? AND origin = ? AND destination = ? AND departure_date = ? "
+                "GROUP BY record ORDER BY price_paise IS NULL, price_paise, MIN(id)",
+                (airline, origin.upper(), destination.upper(), departure_date)
+            ).fetchall()
+        if not rows:
+            return [], None
+        return [json.loads(row['record']) for row in rows], min(row['captured_at'] for row in rows)
+
+
+def store_results(airline, flights, origin, destination, date, return_date=None, truncated=False):
+    """
+    Keep a successful search as the latest results for its route and date(s). A truncated search
+    (cut off by its deadline) may be missing flights, so it never replaces what is stored. Never raises.
+    """
+    if not result_store_enabled() or not flights:
+        return
+    if truncated:
+        print("Search ran out of time - not replacing the stored results with a partial set")
+        return
+    try:
+        ResultStore().replace_search(airline, flights, origin, destination, date, return_date)
+    except Exception as e:
+        print(f"Could not store search results: {e}")
+
+
+def main():
+    """Query stored results from the command line"""
+    parser = argparse.ArgumentParser(description="Filter, sort and page through stored search results")
+    parser.add_argument('origin')
+    parser.add_argument('destination')
+    parser.add_argument('--from', dest='date_from', help="First departure date (YYYY-MM-DD)")
+    parser.add_argument('--to', dest='date_to', help="Last departure date (YYYY-MM-DD)")
+    parser.add_argument('--depart-after', help="HH:MM")
+    parser.add_argument('--depart-before', help="HH:MM")
+    parser.add_argument('--max-price', type=float, help="Rupees")
+    parser.add_argument('--max-duration', type=int, help="Minutes")
+    parser.add_argument('--max-stops', type=int)
+    parser.add_argument('--fare-family', help="e.g. spicesaver")
+    parser.add_argument('--min-points', type=int)
+    parser.add_argument('--airline', action='append', help="spicejet, indigo or etihad (repeatable)")
+    parser.add_argument('--sort', choices=list(SORT_COLUMNS), default='price')
+    parser.add_argument('--desc', action='store_true', help="Largest first")
+    parser.add_argument('--limit', type=int, default=DEFAULT_LIMIT)
+    parser.add_argument('--cursor', help="nextCursor from the previous page")
+    parser.add_argument('--json', action='store_true', help="Print JSON only")
+    args = parser.parse_args()
+
+    try:
+        rows, next_cursor = ResultStore().query(
+            args.origin, args.destination, args.date_from, args.date_to, args.depart_after, args.depart_before,
+            args.max_price, args.max_duration, args.max_stops, args.fare_family, args.min_points, args.airline,
+            args.sort, args.desc, args.limit, args.cursor,
+        )
+    except ValueError as e:
+        if args.json:
+            sys.stderr.write(json.dumps({"error": str(e)}) + "\n")
+        else:
+            print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.json:
+        print(json.dumps({"success": True, "results": rows, "nextCursor": next_cursor}, ensure_ascii=True))
+        return
+
+    if not rows:
+        print("No stored results match")
+        return
+    for row in rows:
+        price = f"₹{row['price_paise'] / 100:,.0f}" if row['price_paise'] is not None else 'N/A'
+        points = f"{row['points']:,} pts" if row['points'] is not None else ''
+        duration = f"{row['duration_minutes'] // 60}h {row['duration_minutes'] % 60}m" \
+            if row['duration_minutes'] is not None else 'N/A'
+        print(f"  {row['departure'] or 'N/A':<16}  {', '.join(row['flight_numbers']):<16} {row['airline'] or '':<10} "
+              f"{duration:>7}  {row['fare_family']:<11} {price:>9}  {points}")
+    if next_cursor:
+        print(f"\nMore results: --cursor {next_cursor}")
+
+
+if __name__ == "__main__":
+    main()
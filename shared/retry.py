@@ -0,0 +1,254 @@
+"""
+Retry helpers shared by the scrapers
+- In-page retries: re-issue a captured API request with fetch() from the already-loaded page
+- Hedged searches: start a second attempt once the first runs past the route's p95 latency
+"""
+
+import json
+import math
+import os
+import queue
+import sys
+import threading
+import time
+
+from shared.paths import data_path
+from shared.search_budget import PROFILES, SearchBudget
+
+
+# Headers the browser sets itself - fetch() refuses or overrides them
+FORBIDDEN_FETCH_HEADERS = {
+    'host', 'connection', 'content-length', 'cookie', 'cookie2', 'origin', 'referer',
+    'user-agent', 'accept-encoding', 'keep-alive', 'te', 'trailer', 'transfer-encoding', 'upgrade',
+}
+
+# Runs inside the page so the request carries the page's own cookies and session
+REPLAY_REQUEST_JS = """
+async ({url, method, headers, body, timeoutMs}) => {
+    const controller = new AbortController();
+    const timer = setTimeout(() => controller.abort(), timeoutMs);
+    try {
+        const response = await fetch(url, {
+            method: method,
+            headers: headers,
+            body: method === 'GET' || method === 'HEAD' ? undefined : body,
+            credentials: 'include',
+            signal: controller.signal,
+        });
+        const text = await response.text();
+        return {status: response.status, text: text};
+    } catch (e) {
+        return {status: 0, error: String(e)};
+    } finally {
+        clearTimeout(timer);
+    }
+}
+"""
+
+
+def request_snapshot(request):
+    """Copy what we need to replay a Playwright request (the request object dies with the page)"""
+    headers = {}
+    for name, value in (request.headers or {}).items():
+        lower = name.lower()
+        if lower in FORBIDDEN_FETCH_HEADERS or lower.startswith('sec-') or lower.startswith(':'):
+            continue
+        headers[name] = value
+
+    return {
+        'url': request.url,
+        'method': request.method,
+        'headers': headers,
+        'body': request.post_data,
+    }
+
+
+def replay_request_in_page(page, snapshot, timeout_ms=30000):
+    """
+    Re-issue a captured request from inside the loaded page with fetch().
+    Returns the decoded JSON body, or None if the request failed.
+    """
+    try:
+        result = page.evaluate(REPLAY_REQUEST_JS, {
+            'url': snapshot['url'],
+            'method': snapshot.get('method') or 'GET',
+            'headers': snapshot.get('headers') or {},
+            'body': snapshot.get('body'),
+            'timeoutMs': int(timeout_ms),
+        })
+    except Exception as e:
+        print(f"  In-page request failed: {e}")
+        return None
+
+    if not result or result.get('status') != 200:
+        status = result.get('status') if result else 'no response'
+        print(f"  In-page request returned status {status} {result.get('error', '') if result else ''}")
+        return None
+
+    try:
+        return json.loads(result.get('text') or '')
+    except ValueError:
+        print("  In-page request did not return JSON")
+        return None
+
+
+class RouteLatencyLog:
+    """Recent search latencies per airline/route, persisted as JSON and used to pick the hedge delay"""
+
+    def __init__(self, path=None, max_samples=50, min_samples=5):
+        self.path = path or data_path('route_latency.json')
+        self.max_samples = max_samples
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def _key(self, airline, origin, destination):
+        return f"{airline}:{origin}-{destination}".upper()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def record(self, airline, origin, destination, seconds):
+        """Add one completed search latency for the route"""
+        with self._lock:
+            data = self._load()
+            samples = data.get(self._key(airline, origin, destination), [])
+            samples.append(round(seconds, 2))
+            data[self._key(airline, origin, destination)] = samples[-self.max_samples:]
+
+            # Write to a temp file and swap so concurrent readers never see half a file
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(data, f)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f"Could not save route latency log: {e}")
+
+    def p95(self, airline, origin, destination):
+        """95th percentile latency for the route, or None if there are too few samples"""
+        samples = sorted(self._load().get(self._key(airline, origin, destination), []))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[max(0, math.ceil(0.95 * len(samples)) - 1)]
+
+
+# Threads running a hedged attempt - their writes to a silenced stream are dropped
+_attempt_threads = set()
+
+
+class _SilencedAttempts:
+    """sys.stdout / sys.stderr stand-in that drops writes from hedged attempt threads"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        if threading.get_ident() in _attempt_threads:
+            return len(text)
+        return self.stream.write(text)
+
+    def flush(self):
+        if threading.get_ident() not in _attempt_threads:
+            self.stream.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.stream, name)
+
+
+def silence_attempts():
+    """
+    Drop everything hedged attempt threads print, for their whole lifetime. A losing attempt is
+    only asked to stop and can outlive hedged_search, so a caller whose stdout must carry nothing
+    but its result (the scraper API wrappers) calls this before anything swaps sys.stdout.
+    """
+    if not isinstance(sys.stdout, _SilencedAttempts):
+        sys.stdout = _SilencedAttempts(sys.stdout)
+    if not isinstance(sys.stderr, _SilencedAttempts):
+        sys.stderr = _SilencedAttempts(sys.stderr)
+
+
+def hedged_search(scraper_factory, origin, destination, date, airline, profile='thorough',
+                  deadline=None, hedge=True, latency_log=None, **search_kwargs):
+    """
+    Run scraper_factory().scrape_flights(...) in a worker thread. If it is still running once the
+    route's p95 latency has passed (or it fails early), start a second attempt with its own
+    browser and take whichever returns flights first. The losing attempt is cancelled through the
+    SearchBudget it was started with (scrape_flights takes budget=). Its output is dropped when the
+    caller used silence_attempts().
+    Extra keyword arguments (return_date, passengers) are passed through to scrape_flights.
+    """
+    log = latency_log or RouteLatencyLog()
+    total_deadline = float(deadline) if deadline is not None else float(PROFILES[profile]['deadline'])
+    hedge_after = log.p95(airline, origin, destination) if hedge else None
+
+    started = time.monotonic()
+    results = queue.Queue()
+    attempts = []
+
+    def run(scraper, budget, attempt_started):
+        _attempt_threads.add(threading.get_ident())
+        try:
+            try:
+                flights = scraper.scrape_flights(origin, destination, date, profile=profile, budget=budget,
+                                                 **search_kwargs)
+            except Exception as e:
+                print(f"Search attempt failed: {e}")
+                flights = []
+            results.put((scraper, flights, time.monotonic() - attempt_started))
+        finally:
+            _attempt_threads.discard(threading.get_ident())
+
+    def launch():
+        # Each attempt gets its own budget up front, so cancel() reaches the search it was meant for
+        attempt_started = time.monotonic()
+        budget = SearchBudget(profile, max(1.0, total_deadline - (attempt_started - started)))
+        scraper = scraper_factory()
+        thread = threading.Thread(target=run, args=(scraper, budget, attempt_started), daemon=True)
+        attempts.append((scraper, budget, thread))
+        thread.start()
+
+    launch()
+    if hedge_after is not None:
+        print(f"Hedging after route p95 of {hedge_after:.1f}s")
+
+    flights = []
+    winner = None
+    pending = 1
+    while pending:
+        timeout = None
+        if hedge and len(attempts) == 1 and hedge_after is not None:
+            timeout = max(0.0, hedge_after - (time.monotonic() - started))
+
+        try:
+            scraper, attempt_flights, attempt_seconds = results.get(timeout=timeout)
+        except queue.Empty:
+            print(f"Search passed route p95 ({hedge_after:.1f}s) - starting hedged attempt")
+            launch()
+            pending += 1
+            continue
+
+        pending -= 1
+        if attempt_flights:
+            flights = attempt_flights
+            winner = scraper
+            log.record(airline, origin, destination, attempt_seconds)
+            break
+
+        # First attempt failed early - use the hedge slot as a retry while time remains
+        if hedge and len(attempts) == 1 and total_deadline - (time.monotonic() - started) > 5:
+            print("Search attempt returned no flights - starting hedged attempt")
+            launch()
+            pending += 1
+
+    # Cancel the losing attempt and give it a moment to close its browser
+    for scraper, budget, thread in attempts:
+        if scraper is not winner and thread.is_alive():
+            budget.cancel()
+    for scraper, budget, thread in attempts:
+        thread.join(timeout=15)
+
+    return flights
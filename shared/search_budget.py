@@ -0,0 +1,176 @@
+"""
+Search latency budgets
+Named profiles (fast / balanced / thorough) and a deadline that every wait and retry draws from,
+so a search returns its best partial result by the deadline instead of timing out empty
+"""
+
+import time
+
+from shared.fare_calculator import parse_passengers
+
+
+# Search profiles
+# - deadline: total seconds a search may take (overridable per search)
+# - wait_until: Playwright navigation event to wait for
+# - html_enrichment: also parse rendered HTML for prices/points after the API capture (verification)
+# - exhaustive_selectors: try every fallback selector strategy per flight card
+# - max_retries: page load retries after the first attempt
+# - settle_scale: multiplier applied to fixed "let the page settle" sleeps
+PROFILES = {
+    'fast': {
+        'deadline': 15,
+        'wait_until': 'domcontentloaded',
+        'html_enrichment': False,
+        'exhaustive_selectors': False,
+        'max_retries': 0,
+        'settle_scale': 0.25,
+    },
+    'balanced': {
+        'deadline': 90,
+        'wait_until': 'load',
+        'html_enrichment': False,  # prices and points both come from the API capture
+        'exhaustive_selectors': False,
+        'max_retries': 1,
+        'settle_scale': 0.5,
+    },
+    'thorough': {
+        'deadline': 240,
+        'wait_until': 'networkidle',
+        'html_enrichment': True,
+        'exhaustive_selectors': True,
+        'max_retries': 2,
+        'settle_scale': 1.0,
+    },
+}
+
+DEFAULT_PROFILE = 'thorough'
+
+
+class SearchBudget:
+    """Deadline and profile settings for a single search"""
+
+    def __init__(self, profile=DEFAULT_PROFILE, deadline=None):
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown search profile '{profile}'. Use one of: {', '.join(PROFILES)}")
+
+        settings = PROFILES[profile]
+        self.profile = profile
+        self.deadline_seconds = float(deadline) if deadline is not None else float(settings['deadline'])
+        self.wait_until = settings['wait_until']
+        self.html_enrichment = settings['html_enrichment']
+        self.exhaustive_selectors = settings['exhaustive_selectors']
+        self.max_retries = settings['max_retries']
+        self.settle_scale = settings['settle_scale']
+
+        self.started_at = time.monotonic()
+        self.expires_at = self.started_at + self.deadline_seconds
+        self.cancelled = False
+
+    def elapsed(self):
+        """Seconds spent since the search started"""
+        return time.monotonic() - self.started_at
+
+    def remaining(self):
+        """Seconds left before the deadline (never negative)"""
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        """True once the deadline has passed"""
+        return self.remaining() <= 0
+
+    def has(self, seconds):
+        """True if at least `seconds` are left in the budget"""
+        return self.remaining() >= seconds
+
+    def sleep(self, seconds):
+        """
+        Sleep for a settle delay scaled by the profile, never past the deadline.
+        Returns the number of seconds actually slept.
+        """
+        duration = min(seconds * self.settle_scale, self.remaining())
+        if duration > 0:
+            time.sleep(duration)
+        return max(duration, 0.0)
+
+    def timeout(self, seconds):
+        """Cap a timeout (in seconds) to the remaining budget"""
+        return max(0.001, min(float(seconds), self.remaining()))
+
+    def timeout_ms(self, milliseconds):
+        """Cap a Playwright-style timeout (in milliseconds) to the remaining budget"""
+        return max(1, int(min(milliseconds, self.remaining() * 1000)))
+
+    def wait_for(self, predicate, max_seconds, interval=0.5, pause=time.sleep):
+        """
+        Poll `predicate` until it returns truthy, `max_seconds` pass or the deadline hits.
+        `pause` lets browser drivers keep processing events while we wait
+        (e.g. Playwright's page.wait_for_timeout). Returns the last predicate value.
+        """
+        stop_at = time.monotonic() + max_seconds
+        result = predicate()
+        # expires_at is re-read each round so a cancelled budget stops the wait early
+        while not result and time.monotonic() < min(stop_at, self.expires_at):
+            pause(min(interval, max(0.0, min(stop_at, self.expires_at) - time.monotonic())))
+            result = predicate()
+        return result
+
+    def cancel(self):
+        """Expire the budget now (e.g. when a hedged attempt has already won)"""
+        self.expires_at = time.monotonic()
+        self.cancelled = True
+
+    def can_retry(self, retry_count):
+        """True if another retry is allowed by both the profile and the deadline"""
+        return retry_count < self.max_retries and not self.expired()
+
+
+def parse_search_options(args):
+    """
+    Parse optional CLI flags shared by the *_scraper_api.py wrappers.
+    Supports: --profile fast|balanced|thorough  --deadline SECONDS  --hedge  --return DATE
+              --passengers all|adult=N,child=N,infant=N
+    Returns a dict with profile, deadline, hedge, return_date (unparsed) and passengers.
+    Raises ValueError on bad input.
+    """
+    profile = DEFAULT_PROFILE
+    deadline = None
+    hedge = False
+    return_date = None
+    passengers = None
+
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ('--profile', '--deadline', '--return', '--passengers'):
+            if i + 1 >= len(args):
+                raise ValueError(f"Missing value for {arg}")
+            value = args[i + 1]
+            if arg == '--profile':
+                if value not in PROFILES:
+                    raise ValueError(f"Unknown search profile '{value}'. Use one of: {', '.join(PROFILES)}")
+                profile = value
+            elif arg == '--return':
+                return_date = value
+            elif arg == '--passengers':
+                passengers = parse_passengers(value)
+            else:
+                try:
+                    deadline = float(value)
+                except ValueError:
+                    raise ValueError(f"Invalid deadline '{value}' (expected seconds)")
+                if deadline <= 0:
+                    raise ValueError("Deadline must be greater than 0 seconds")
+            i += 2
+        elif arg == '--hedge':
+            hedge = True
+            i += 1
+        else:
+            raise ValueError(f"Unknown option: {arg}")
+
+    return {
+        'profile': profile,
+        'deadline': deadline,
+        'hedge': hedge,
+        'return_date': return_date,
+        'passengers': passengers,
+    }
@@ -0,0 +1,94 @@
+"""
+Search gate
+Everything a search route checks before scraping, in one process instead of one per check:
+
+1. fresh stored results (shared/crawler.py) - answer from the result store
+2. route serviceability (shared/serviceability.py) - skip a scrape that cannot return flights
+3. the airline's circuit breaker (shared/circuit_breaker.py) - while it is open, answer with
+   the latest stored results however old
+
+Stored results only answer one-way, single-adult searches (what the store holds). `force` skips
+1 and 2, never 3. Every check fails open, so a broken store means a live scrape. The route has
+already counted the search in the popularity sketch, so 1 does not count it again.
+
+    python -m shared.search_gate etihad DEL AUH 2025-12-18
+"""
+
+import argparse
+import json
+import sys
+from contextlib import redirect_stdout
+
+from shared.crawler import SCRAPERS, hot_results, stored_results
+from shared.serviceability import should_scrape
+from shared.circuit_breaker import breaker_verdict
+
+
+def _results(found):
+    return {'flights': found[0], 'captured_at': found[1]} if found else None
+
+
+def search_gate(scraper, origin, destination, departure_date, force=False, stored_ok=True):
+    """
+    {'hot', 'skipped', 'breaker', 'stored'} for a search: hot/stored are {'flights', 'captured_at'}
+    or None, skipped the serviceability reason or None, breaker the open breaker's verdict or None.
+    Scrape live when all four are None. The breaker is asked last and only when the search would
+    otherwise scrape, since a half-open breaker hands its single probe to whoever asks.
+    """
+    airline = SCRAPERS[scraper][0]
+    gate = {'hot': None, 'skipped': None, 'breaker': None, 'stored': None}
+
+    gate['hot'] = _results(hot_results(scraper, origin, destination, departure_date, count=False)) \
+        if stored_ok and not force else None
+    if gate['hot']:
+        return gate
+
+    if not force:
+        scrape, reason = should_scrape(airline, origin, destination)
+        if not scrape:
+            gate['skipped'] = reason
+            return gate
+
+    verdict = breaker_verdict(airline, 'browser')
+    if not verdict['allowed']:
+        gate['breaker'] = {key: verdict[key] for key in ('state', 'reason', 'retry_after')}
+        if stored_ok:
+            gate['stored'] = _results(stored_results(scraper, origin, destination, departure_date))
+    return gate
+
+
+def main():
+    """Run a search's pre-scrape checks from the command line"""
+    parser = argparse.ArgumentParser(description="Decide how a search is answered before scraping")
+    parser.add_argument('scraper', choices=list(SCRAPERS))
+    parser.add_argument('origin')
+    parser.add_argument('destination')
+    parser.add_argument('date', help="YYYY-MM-DD")
+    parser.add_argument('--force', action='store_true', help="Skip stored results and serviceability")
+    parser.add_argument('--no-stored', action='store_true',
+                        help="Round trip or passenger mix - stored results cannot answer it")
+    parser.add_argument('--json', action='store_true', help="Print JSON only")
+    args = parser.parse_args()
+
+    # In JSON mode messages from the checks go to stderr so stdout stays parseable
+    with redirect_stdout(sys.stderr if args.json else sys.stdout):
+        gate = search_gate(args.scraper, args.origin.upper(), args.destination.upper(), args.date,
+                           force=args.force, stored_ok=not args.no_stored)
+
+    if args.json:
+        print(json.dumps({"success": True, **gate}, ensure_ascii=True))
+        return
+    if gate['hot']:
+        print(f"Fresh stored results: {len(gate['hot']['flights'])} flight(s) from {gate['hot']['captured_at']}")
+    elif gate['skipped']:
+        print(f"Skip: {gate['skipped']}")
+    elif gate['breaker']:
+        stored = gate['stored']
+        print(f"Circuit breaker {gate['breaker']['state']}: {gate['breaker']['reason']}"
+              + (f" - {len(stored['flights'])} stored flight(s) from {stored['captured_at']}" if stored else ''))
+    else:
+        print("Scrape live")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+"""
+Route serviceability
+Which airline flies which origin-destination pair, so searches skip scrapes that cannot return
+flights instead of spending a browser session (often a minute) to get [].
+
+Only observed answers skip a route. data/serviceability.db holds the outcome of every completed
+search (flights found, or the airline's availability response listing no flights), logged by the
+scrapers through record_outcome(). A search that came back empty for any other reason (response
+never captured, parse miss, cancelled hedge) is not logged, since it says nothing about the route.
+
+A pair is skipped after EMPTY_THRESHOLD empty searches in a row, but only for REVALIDATE_DAYS;
+after that the next search goes through, so new routes are picked up. Any search that finds
+flights marks the pair serviceable again. The station lists in the airport index
+(shared/airports.csv) are incomplete - many airports list no airline - so a station the airline
+does not list is only a hint: it lowers the threshold to one empty search, never skips on its own.
+Set FLYPOINTS_SERVICEABILITY=0 to never skip.
+
+    python -m shared.serviceability check etihad DEL JFK
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+from shared.paths import data_path
+from shared.airports import airport_index
+
+
+ENABLED_ENV = 'FLYPOINTS_SERVICEABILITY'
+
+EMPTY_THRESHOLD = 2
+# Empty searches that confirm a route whose station the airline's station list lacks
+HINTED_EMPTY_THRESHOLD = 1
+REVALIDATE_DAYS = 7
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS routes (
+    airline TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    source TEXT NOT NULL,
+    consecutive_empty INTEGER NOT NULL DEFAULT 0,
+    last_flights INTEGER,
+    last_checked TEXT NOT NULL,
+    last_served TEXT,
+    PRIMARY KEY (airline, origin, destination)
+);
+"""
+
+
+def serviceability_enabled():
+    """True unless FLYPOINTS_SERVICEABILITY is set to 0/false/no"""
+    return os.environ.get(ENABLED_ENV, '1').strip().lower() not in ('0', 'false', 'no')
+
+
+def _now():
+    return datetime.now().isoformat(timespec='seconds')
+
+
+class ServiceabilityIndex:
+    """Per (airline, origin, destination) search outcomes in SQLite"""
+
+    def __init__(self, path=None, empty_threshold=EMPTY_THRESHOLD, revalidate_days=REVALIDATE_DAYS):
+        self.path = path or data_path('serviceability.db')
+        self.empty_threshold = empty_threshold
+        self.revalidate_days = revalidate_days
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+            # Verdicts seeded from the station lists alone, before they became hints
+            conn.execute("DELETE FROM routes WHERE source = 'stations'")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def record(self, airline, origin, destination, flights_found):
+        """Log a completed search: flights_found flights (0 = the airline returned an empty result page)"""
+        now = _now()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO routes (airline, origin, destination, source, consecutive_empty, last_flights, "
+                "last_checked, last_served) VALUES (?, ?, ?, 'search', ?, ?, ?, ?) "
+                "ON CONFLICT (airline, origin, destination) DO UPDATE SET source = 'search', "
+                "consecutive_empty = CASE WHEN excluded.last_flights > 0 THEN 0 ELSE consecutive_empty + 1 END, "
+                "last_flights = excluded.last_flights, last_checked = excluded.last_checked, "
+                "last_served = COALESCE(excluded.last_served, last_served)",
+                (airline, origin.upper(), destination.upper(), 0 if flights_found else 1, flights_found, now,
+                 now if flights_found else None)
+            )
+
+    def _station_miss(self, airline, origin, destination):
+        """Airport code the airline's station list lacks, or None (unknown airports are not held against it)"""
+        index = airport_index()
+        for code in (origin, destination):
+            if index.get(code) and not index.serves(airline, code):
+                return code
+        return None
+
+    def check(self, airline, origin, destination):
+        """
+        {'serviceable': bool, 'reason': str, 'revalidate_after': ISO time or None}
+        Unserviceable verdicts expire after revalidate_days, letting one search through to re-check.
+        """
+        origin, destination = origin.upper(), destination.upper()
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM routes WHERE airline = ? AND origin = ? AND destination = ?",
+                               (airline, origin, destination)).fetchone()
+
+        if row is None:
+            return {'serviceable': True, 'reason': 'not searched yet', 'revalidate_after': None}
+
+        missing = self._station_miss(airline, origin, destination)
+        threshold = min(self.empty_threshold, HINTED_EMPTY_THRESHOLD) if missing else self.empty_threshold
+        if row['consecutive_empty'] < threshold:
+            reason = f"flights found {row['last_served']}" if row['last_served'] else 'not enough empty searches'
+            return {'serviceable': True, 'reason': reason, 'revalidate_after': None}
+
+        revalidate_after = datetime.fromisoformat(row['last_checked']) + timedelta(days=self.revalidate_days)
+        if datetime.now() >= revalidate_after:
+            return {'serviceable': True, 'reason': 're-checking a route last found unserviceable',
+                    'revalidate_after': None}
+
+        reason = f"{row['consecutive_empty']} empty search(es) in a row"
+        if missing:
+            reason += f" ({airline} does not list {missing})"
+        return {'serviceable': False, 'reason': reason,
+                'revalidate_after': revalidate_after.isoformat(timespec='seconds')}
+
+    def routes(self, airline=None):
+        query = "SELECT * FROM routes"
+        params = []
+        if airline:
+            query += " WHERE airline = ?"
+            params.append(airline)
+        with self._connect() as conn:
+            return [dict(row) for row in conn.execute(query + " ORDER BY airline, origin, destination", params)]
+
+
+def record_outcome(airline, origin, destination, flights, answered_empty=False, budget=None):
+    """
+    Log a completed search's outcome. An empty result only counts when answered_empty is set -
+    the airline's own response listed zero flights. Searches whose budget was cancelled (a hedge
+    that lost) are ignored. Never raises.
+    """
+    if not serviceability_enabled() or (budget is not None and budget.cancelled):
+        return
+    if not flights and not answered_empty:
+        return
+    try:
+        ServiceabilityIndex().record(airline, origin, destination, len(flights or []))
+    except Exception as e:
+        print(f"Could not record route serviceability: {e}")
+
+
+def should_scrape(airline, origin, destination):
+    """(scrape?, reason) - errs on the side of scraping when the index cannot be read"""
+    if not serviceability_enabled():
+        return True, 'serviceability checks disabled'
+    try:
+        verdict = ServiceabilityIndex().check(airline, origin, destination)
+        return verdict['serviceable'], verdict['reason']
+    except Exception as e:
+        print(f"Could not check route serviceability: {e}")
+        return True, 'serviceability unknown'
+
+
+def main():
+    """Check or list route serviceability from the command line"""
+    parser = argparse.ArgumentParser(description="Which airline serves which route")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    check_parser = subparsers.add_parser('check', help="Should this airline be searched for this route?")
+    check_parser.add_argument('airline')
+    check_parser.add_argument('origin')
+    check_parser.add_argument('destination')
+    check_parser.add_argument('--json', action='store_true', help="Print JSON only")
+    list_parser = subparsers.add_parser('list', help="Logged routes")
+    list_parser.add_argument('--airline')
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        if serviceability_enabled():
+            verdict = ServiceabilityIndex().check(args.airline, args.origin, args.destination)
+        else:
+            verdict = {'serviceable': True, 'reason': 'serviceability checks disabled', 'revalidate_after': None}
+        if args.json:
+            print(json.dumps({"success": True, **verdict}))
+            return
+        status = 'serviceable' if verdict['serviceable'] else 'skip'
+        print(f"{args.airline} {args.origin.upper()} -> {args.destination.upper()}: {status} ({verdict['reason']})")
+        if verdict['revalidate_after']:
+            print(f"  re-checked by the first search after {verdict['revalidate_after']}")
+        return
+
+    for row in ServiceabilityIndex().routes(args.airline):
+        print(f"  {row['airline']:<9} {row['origin']}-{row['destination']}  {row['source']:<8} "
+              f"empty x{row['consecutive_empty']}  last checked {row['last_checked']}  "
+              f"last served {row['last_served'] or '-'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,330 @@
+"""
+Watchlist
+Users watch a route over a range of departure dates for a price (or points) threshold. Watches
+live in data/watchlist.db. Each cycle collapses every active watch into the distinct
+(scraper, route, date) jobs they cover, so a hundred users watching DEL-DXB in December cost one
+scrape per date, not a hundred. Jobs whose stored results are still fresh (because a user searched
+or the crawler refreshed them) are not scraped again.
+
+After the scrapes, one SQL join of the watches against the result store (data/results.db) checks
+every threshold at once. A watch gets an alert the first time a fare on one of its dates meets
+its threshold, and again whenever that date gets cheaper (or earns more points).
+
+    python -m shared.watchlist add me@example.com etihad DEL AUH 2025-12-18 2025-12-25 --max-price 25000
+    python -m shared.watchlist run
+"""
+
+import argparse
+import json
+import sqlite3
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from shared.paths import data_path
+from shared.crawler import SCRAPERS, Crawler, Job
+from shared.serviceability import should_scrape
+from shared.circuit_breaker import breaker_allows
+
+
+CYCLE_SECONDS = 30 * 60
+# Longest date range one watch may cover (each date is a scrape job)
+MAX_WATCH_DAYS = 31
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS watches (
+    id INTEGER PRIMARY KEY,
+    owner TEXT NOT NULL,
+    scraper TEXT NOT NULL,
+    airline TEXT NOT NULL,
+    origin TEXT NOT NULL,
+    destination TEXT NOT NULL,
+    date_from TEXT NOT NULL,
+    date_to TEXT NOT NULL,
+    max_price_paise INTEGER,
+    min_points INTEGER,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_watches_owner ON watches (owner);
+CREATE INDEX IF NOT EXISTS idx_watches_route ON watches (airline, origin, destination, date_to);
+CREATE TABLE IF NOT EXISTS alerts (
+    id INTEGER PRIMARY KEY,
+    watch_id INTEGER NOT NULL,
+    departure_date TEXT NOT NULL,
+    flight_number TEXT NOT NULL,
+    fare_family TEXT NOT NULL,
+    price_paise INTEGER,
+    points INTEGER,
+    captured_at TEXT NOT NULL,
+    alerted_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_alerts_watch ON alerts (watch_id, departure_date);
+"""
+
+# Watch thresholds against the stored results, all watches in one pass. Per watch and date, the
+# best matching fare: cheapest for price watches, most points for points-only watches.
+MATCHES = """
+SELECT watch_id, departure_date, flight_number, fare_family, price_paise, points, captured_at FROM (
+    SELECT w.id AS watch_id, r.departure_date, r.flight_number, r.fare_family, r.price_paise, r.points,
+           r.captured_at,
+           ROW_NUMBER() OVER (
+               PARTITION BY w.id, r.departure_date
+               ORDER BY CASE WHEN w.max_price_paise IS NULL THEN -r.points ELSE r.price_paise END
+           ) AS rank
+    FROM watches w
+    JOIN store.results r
+      ON r.airline = w.airline AND r.origin = w.origin AND r.destination = w.destination
+     AND r.departure_date BETWEEN MAX(w.date_from, :today) AND w.date_to
+    WHERE (w.max_price_paise IS NULL OR r.price_paise <= w.max_price_paise)
+      AND (w.min_points IS NULL OR r.points >= w.min_points)
+)
+WHERE rank = 1
+"""
+
+
+def _dates(date_from, date_to):
+    day = date.fromisoformat(date_from)
+    while day <= date.fromisoformat(date_to):
+        yield day.isoformat()
+        day += timedelta(days=1)
+
+
+class Watchlist:
+    """Watches, the scrape jobs they collapse to, and their alerts in SQLite"""
+
+    def __init__(self, path=None, crawler=None):
+        self.path = path or data_path('watchlist.db')
+        self.crawler = crawler or Crawler()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # Watches
+
+    def add(self, owner, scraper, origin, destination, date_from, date_to, max_price=None, min_points=None):
+        """Store a watch and return its id. max_price: rupees. Raises ValueError for an invalid watch."""
+        if scraper not in SCRAPERS:
+            raise ValueError(f"unknown scraper: {scraper} (use {', '.join(SCRAPERS)})")
+        if max_price is None and min_points is None:
+            raise ValueError("a watch needs --max-price and/or --min-points")
+        first, last = date.fromisoformat(date_from), date.fromisoformat(date_to)
+        if last < first:
+            raise ValueError("date_to is before date_from")
+        if (last - first).days >= MAX_WATCH_DAYS:
+            raise ValueError(f"a watch covers at most {MAX_WATCH_DAYS} days")
+        if last < date.today():
+            raise ValueError("the watched dates are in the past")
+        with self._connect() as conn:
+            return conn.execute(
+                "INSERT INTO watches (owner, scraper, airline, origin, destination, date_from, date_to, "
+                "max_price_paise, min_points, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (owner, scraper, SCRAPERS[scraper][0], origin.upper(), destination.upper(), date_from, date_to,
+                 int(round(max_price * 100)) if max_price is not None else None, min_points,
+                 datetime.now().isoformat(timespec='seconds'))
+            ).lastrowid
+
+    def remove(self, watch_id, owner=None):
+        """Delete a watch and its alerts; False if there is no such watch (for this owner)"""
+        with self._connect() as conn:
+            query, params = "DELETE FROM watches WHERE id = ?", [watch_id]
+            if owner:
+                query += " AND owner = ?"
+                params.append(owner)
+            if conn.execute(query, params).rowcount == 0:
+                return False
+            conn.execute("DELETE FROM alerts WHERE watch_id = ?", (watch_id,))
+        return True
+
+    def watches(self, owner=None):
+        """Watches (with their alerts, newest first), active ones first"""
+        with self._connect() as conn:
+            query, params = "SELECT * FROM watches", []
+            if owner:
+                query += " WHERE owner = ?"
+                params.append(owner)
+            watches = [dict(row) for row in conn.execute(
+                query + " ORDER BY date_to < ?, date_from, id", (*params, date.today().isoformat()))]
+            alerts = {}
+            if watches:
+                ids = [watch['id'] for watch in watches]
+                for row in conn.execute(f"SELECT * FROM alerts WHERE watch_id IN ({', '.join('?' * len(ids))}) "
+                                        "ORDER BY alerted_at DESC, id DESC", ids):
+                    alerts.setdefault(row['watch_id'], []).append(dict(row))
+        for watch in watches:
+            watch['alerts'] = alerts.get(watch['id'], [])
+        return watches
+
+    # Cycle
+
+    def jobs(self, today=None):
+        """
+        The distinct (scraper, origin, destination, date) jobs covering every active watch,
+        soonest departure first, and the number of watch-dates they replace
+        """
+        today = (today or date.today()).isoformat()
+        with self._connect() as conn:
+            rows = conn.execute("SELECT scraper, origin, destination, date_from, date_to FROM watches "
+                                "WHERE date_to >= ?", (today,)).fetchall()
+        jobs, watched = set(), 0
+        for row in rows:
+            for day in _dates(max(row['date_from'], today), row['date_to']):
+                jobs.add((day, row['scraper'], row['origin'], row['destination']))
+                watched += 1
+        return [(scraper, origin, destination, day) for day, scraper, origin, destination in sorted(jobs)], watched
+
+    def refresh(self, jobs, max_jobs=None, sleep=time.sleep):
+        """Scrape the jobs without fresh stored results (waiting out per-airline intervals); returns the count"""
+        scraped = 0
+        for scraper, origin, destination, day in jobs:
+            if max_jobs is not None and scraped >= max_jobs:
+                break
+            if self.crawler.fresh_results(scraper, origin, destination, day):
+                continue
+            job = Job(scraper, origin, destination, day, 0, 0, 0)
+            scrape, reason = should_scrape(job.airline, origin, destination)
+            if not scrape:
+                print(f"  Skipping {job}: {reason}")
+                continue
+            allowed, reason = breaker_allows(job.airline, 'browser')
+            if not allowed:
+                print(f"  Skipping {job}: circuit breaker open ({reason})")
+                continue
+            sleep(self.crawler.wait_seconds(job.airline))
+            print(f"  Scraping {job}")
+            print(f"    {self.crawler.crawl(job)}")
+            scraped += 1
+        return scraped
+
+    def evaluate(self, today=None):
+        """Match every watch against the stored results in one query; store and return the new alerts"""
+        today = (today or date.today()).isoformat()
+        alerted_at = datetime.now().isoformat(timespec='seconds')
+        with self._connect() as conn:
+            conn.execute("ATTACH DATABASE ? AS store", (self.crawler.results.path,))
+            matches = conn.execute(MATCHES, {'today': today}).fetchall()
+            best = {(row['watch_id'], row['departure_date']): (row['price'], row['points']) for row in conn.execute(
+                "SELECT watch_id, departure_date, MIN(price_paise) AS price, MAX(points) AS points FROM alerts "
+                "GROUP BY watch_id, departure_date")}
+            alerts = []
+            for match in matches:
+                previous = best.get((match['watch_id'], match['departure_date']))
+                if previous and not _improves(match, *previous):
+                    continue
+                alerts.append({**dict(match), 'alerted_at': alerted_at})
+            conn.executemany(
+                "INSERT INTO alerts (watch_id, departure_date, flight_number, fare_family, price_paise, points, "
+                "captured_at, alerted_at) VALUES (:watch_id, :departure_date, :flight_number, :fare_family, "
+                ":price_paise, :points, :captured_at, :alerted_at)", alerts
+            )
+        return alerts
+
+    def cycle(self, max_jobs=None, sleep=time.sleep):
+        """One pass: collapse watches into jobs, refresh stale ones, fan results out as alerts"""
+        jobs, watched = self.jobs()
+        print(f"{watched} watched date(s) -> {len(jobs)} job(s)")
+        self.refresh(jobs, max_jobs, sleep)
+        alerts = self.evaluate()
+        for alert in alerts:
+            price = f"₹{alert['price_paise'] / 100:,.0f}" if alert['price_paise'] is not None else ''
+            points = f"{alert['points']:,} pts" if alert['points'] is not None else ''
+            print(f"  Alert for watch {alert['watch_id']}: {alert['flight_number']} {alert['departure_date']} "
+                  f"{alert['fare_family']} {price} {points}")
+        return alerts
+
+    def run(self, once=False, max_jobs=None, sleep=time.sleep):
+        while True:
+            self.cycle(max_jobs, sleep)
+            if once:
+                return
+            sleep(CYCLE_SECONDS)
+
+
+def _improves(match, price_paise, points):
+    """True if the match beats the best fare already alerted for its watch and date"""
+    if match['price_paise'] is not None and (price_paise is None or match['price_paise'] < price_paise):
+        return True
+    return match['points'] is not None and (points is None or match['points'] > points)
+
+
+def main():
+    """Manage watches and run the watch cycle"""
+    parser = argparse.ArgumentParser(description="Price watches over routes and date ranges")
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    add_parser = subparsers.add_parser('add', help="Watch a route and date range")
+    add_parser.add_argument('owner')
+    add_parser.add_argument('scraper', choices=list(SCRAPERS))
+    add_parser.add_argument('origin')
+    add_parser.add_argument('destination')
+    add_parser.add_argument('date_from', help="YYYY-MM-DD")
+    add_parser.add_argument('date_to', help="YYYY-MM-DD")
+    add_parser.add_argument('--max-price', type=float, help="Alert at or below this fare (rupees)")
+    add_parser.add_argument('--min-points', type=int, help="Alert at or above this many points")
+    list_parser = subparsers.add_parser('list', help="Watches and their alerts")
+    list_parser.add_argument('--owner')
+    remove_parser = subparsers.add_parser('remove', help="Delete a watch")
+    remove_parser.add_argument('id', type=int)
+    remove_parser.add_argument('--owner', help="Only if the watch belongs to this owner")
+    subparsers.add_parser('jobs', help="The scrape jobs the active watches collapse to")
+    run_parser = subparsers.add_parser('run', help="Run watch cycles (daemon)")
+    run_parser.add_argument('--once', action='store_true', help="One cycle, then exit")
+    run_parser.add_argument('--max-jobs', type=int, help="Scrape at most this many jobs per cycle")
+    for subparser in (add_parser, list_parser, remove_parser):
+        subparser.add_argument('--json', action='store_true', help="Print JSON only")
+    args = parser.parse_args()
+
+    watchlist = Watchlist()
+    as_json = getattr(args, 'json', False)
+    try:
+        if args.command == 'add':
+            watch_id = watchlist.add(args.owner, args.scraper, args.origin, args.destination, args.date_from,
+                                     args.date_to, args.max_price, args.min_points)
+            result = {"success": True, "id": watch_id}
+            message = f"Watch {watch_id} added"
+        elif args.command == 'remove':
+            if not watchlist.remove(args.id, args.owner):
+                raise ValueError(f"no watch {args.id}")
+            result = {"success": True}
+            message = f"Watch {args.id} removed"
+        elif args.command == 'list':
+            watches = watchlist.watches(args.owner)
+            if as_json:
+                print(json.dumps({"success": True, "watches": watches}))
+                return
+            for watch in watches:
+                threshold = ' / '.join(filter(None, (
+                    f"≤ ₹{watch['max_price_paise'] / 100:,.0f}" if watch['max_price_paise'] is not None else None,
+                    f"≥ {watch['min_points']:,} pts" if watch['min_points'] is not None else None)))
+                print(f"  {watch['id']:>4}  {watch['owner']:<24} {watch['scraper']:<23} {watch['origin']}-"
+                      f"{watch['destination']}  {watch['date_from']}..{watch['date_to']}  {threshold}  "
+                      f"{len(watch['alerts'])} alert(s)")
+            return
+        elif args.command == 'jobs':
+            jobs, watched = watchlist.jobs()
+            print(f"{watched} watched date(s) -> {len(jobs)} job(s)")
+            for job in jobs:
+                print(f"  {' '.join(job)}")
+            return
+        else:
+            try:
+                watchlist.run(once=args.once, max_jobs=args.max_jobs)
+            except KeyboardInterrupt:
+                print("Watchlist stopped")
+            return
+    except ValueError as e:
+        if as_json:
+            sys.stderr.write(json.dumps({"error": str(e)}) + "\n")
+        else:
+            print(f"Error: {e}")
+        sys.exit(1)
+
+    print(json.dumps(result) if as_json else message)
+
+
+if __name__ == "__main__":
+    main()